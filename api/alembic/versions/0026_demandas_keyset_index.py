@@ -0,0 +1,24 @@
+"""indice composto (criado_em, id) para paginacao por cursor em demandas
+
+Revision ID: 0026_demandas_keyset
+Revises: 0025_icone_atividades
+Create Date: 2026-06-10
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '0026_demandas_keyset'
+down_revision: Union[str, None] = '0025_icone_atividades'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_demandas_criado_em_id', 'demandas', ['criado_em', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_demandas_criado_em_id', table_name='demandas')
@@ -0,0 +1,45 @@
+"""sequence para codigo de demandas (DEM-000001) gerado no proprio INSERT
+
+Revision ID: 0027_demandas_codigo_seq
+Revises: 0026_demandas_keyset
+Create Date: 2026-06-12
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '0027_demandas_codigo_seq'
+down_revision: Union[str, None] = '0026_demandas_keyset'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE SEQUENCE IF NOT EXISTS demandas_codigo_seq AS bigint START WITH 1 MINVALUE 1')
+    op.execute(
+        r"""
+        SELECT setval(
+            'demandas_codigo_seq',
+            COALESCE(MAX(CAST(substring(codigo FROM '^DEM-(\d+)$') AS bigint)), 0) + 1,
+            false
+        )
+        FROM demandas;
+        """
+    )
+    # nextval é avaliado uma única vez; o lpad só completa com zeros até 6 dígitos, sem truncar.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION proximo_codigo_demanda() RETURNS text
+        LANGUAGE sql VOLATILE AS $$
+            SELECT 'DEM-' || lpad(valor::text, greatest(6, length(valor::text)), '0')
+            FROM nextval('demandas_codigo_seq') AS valor
+        $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP FUNCTION IF EXISTS proximo_codigo_demanda()')
+    op.execute('DROP SEQUENCE IF EXISTS demandas_codigo_seq')
@@ -0,0 +1,25 @@
+"""adicionar checksum_sha256 em demanda_anexos
+
+Revision ID: 0028_anexo_checksum
+Revises: 0027_demandas_codigo_seq
+Create Date: 2026-06-15
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0028_anexo_checksum'
+down_revision: Union[str, None] = '0027_demandas_codigo_seq'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('demanda_anexos', sa.Column('checksum_sha256', sa.String(64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('demanda_anexos', 'checksum_sha256')
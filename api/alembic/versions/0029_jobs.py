@@ -0,0 +1,56 @@
+"""tabela de jobs em segundo plano
+
+Revision ID: 0029_jobs
+Revises: 0028_anexo_checksum
+Create Date: 2026-06-22
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0029_jobs'
+down_revision: Union[str, None] = '0028_anexo_checksum'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=80), nullable=False),
+        sa.Column(
+            'status',
+            sa.Enum('pendente', 'executando', 'concluido', 'falhou', name='job_status_enum', native_enum=False),
+            server_default='pendente',
+            nullable=False,
+        ),
+        sa.Column('parametros', sa.JSON(), nullable=True),
+        sa.Column('resultado', sa.JSON(), nullable=True),
+        sa.Column('erro', sa.Text(), nullable=True),
+        sa.Column('progresso', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('tentativas', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('idempotency_key', sa.String(length=120), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['usuarios.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key'),
+    )
+    op.create_index(op.f('ix_jobs_id'), 'jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_jobs_tipo'), 'jobs', ['tipo'], unique=False)
+    op.create_index(op.f('ix_jobs_status'), 'jobs', ['status'], unique=False)
+    op.create_index(op.f('ix_jobs_created_by'), 'jobs', ['created_by'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_jobs_created_by'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_status'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_tipo'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_id'), table_name='jobs')
+    op.drop_table('jobs')
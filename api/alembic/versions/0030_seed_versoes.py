@@ -0,0 +1,30 @@
+"""marcador de versao dos seeds de startup
+
+Revision ID: 0030_seed_versoes
+Revises: 0029_jobs
+Create Date: 2026-06-29
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0030_seed_versoes'
+down_revision: Union[str, None] = '0029_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'seed_versoes',
+        sa.Column('versao', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('aplicado_em', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('versao'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('seed_versoes')
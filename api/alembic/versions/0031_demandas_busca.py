@@ -0,0 +1,56 @@
+"""busca textual em demandas: tsvector gerado (portugues + unaccent) e indices trigram
+
+Revision ID: 0031_demandas_busca
+Revises: 0030_seed_versoes
+Create Date: 2026-07-06
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '0031_demandas_busca'
+down_revision: Union[str, None] = '0030_seed_versoes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Configuração própria: stemming em português sobre o texto já sem acentos.
+    # Com o regconfig fixo, to_tsvector é IMMUTABLE e pode alimentar uma coluna gerada.
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'demandas_pt') THEN
+                CREATE TEXT SEARCH CONFIGURATION public.demandas_pt (COPY = pg_catalog.portuguese);
+                ALTER TEXT SEARCH CONFIGURATION public.demandas_pt
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+            END IF;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        ALTER TABLE demandas ADD COLUMN busca_vetor tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('public.demandas_pt'::regconfig, coalesce(codigo, '')), 'A')
+            || setweight(to_tsvector('public.demandas_pt'::regconfig, coalesce(titulo, '')), 'A')
+            || setweight(to_tsvector('public.demandas_pt'::regconfig, coalesce(descricao, '')), 'B')
+        ) STORED
+        """
+    )
+    op.create_index('ix_demandas_busca_vetor', 'demandas', ['busca_vetor'], postgresql_using='gin')
+    op.execute('CREATE INDEX ix_demandas_codigo_trgm ON demandas USING gin (codigo gin_trgm_ops)')
+    op.execute('CREATE INDEX ix_demandas_titulo_trgm ON demandas USING gin (titulo gin_trgm_ops)')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_demandas_titulo_trgm', table_name='demandas')
+    op.drop_index('ix_demandas_codigo_trgm', table_name='demandas')
+    op.drop_index('ix_demandas_busca_vetor', table_name='demandas')
+    op.drop_column('demandas', 'busca_vetor')
+    op.execute('DROP TEXT SEARCH CONFIGURATION IF EXISTS public.demandas_pt')
@@ -0,0 +1,43 @@
+"""busca textual em documentos de evidencia: tsvector gerado e indice trigram no titulo
+
+Revision ID: 0032_documentos_evidencia_busca
+Revises: 0031_demandas_busca
+Create Date: 2026-07-08
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '0032_documentos_evidencia_busca'
+down_revision: Union[str, None] = '0031_demandas_busca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Reaproveita a configuração public.demandas_pt (português + unaccent) criada na 0031.
+    # Só os primeiros 100 mil caracteres do conteúdo: um tsvector não passa de 1 MB e o INSERT
+    # de um documento maior falharia (app.db.busca.LIMITE_CONTEUDO_BUSCA usa o mesmo valor).
+    op.execute(
+        """
+        ALTER TABLE documentos_evidencia ADD COLUMN busca_vetor tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('public.demandas_pt'::regconfig, coalesce(titulo, '')), 'A')
+            || setweight(to_tsvector('public.demandas_pt'::regconfig, left(coalesce(conteudo, ''), 100000)), 'B')
+        ) STORED
+        """
+    )
+    op.create_index(
+        'ix_documentos_evidencia_busca_vetor',
+        'documentos_evidencia',
+        ['busca_vetor'],
+        postgresql_using='gin',
+    )
+    op.execute('CREATE INDEX ix_documentos_evidencia_titulo_trgm ON documentos_evidencia USING gin (titulo gin_trgm_ops)')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documentos_evidencia_titulo_trgm', table_name='documentos_evidencia')
+    op.drop_index('ix_documentos_evidencia_busca_vetor', table_name='documentos_evidencia')
+    op.drop_column('documentos_evidencia', 'busca_vetor')
@@ -0,0 +1,39 @@
+"""indices compostos e parciais para listagem, RBAC e home de demandas
+
+Revision ID: 0033_demandas_indices_parciais
+Revises: 0032_documentos_evidencia_busca
+Create Date: 2026-07-13
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = '0033_demandas_indices_parciais'
+down_revision: Union[str, None] = '0032_documentos_evidencia_busca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Mesmo texto de PREDICADO_DEMANDA_RAIZ / PREDICADO_DEMANDA_RAIZ_ABERTA em app.models.demanda_gestao.
+RAIZ = 'parent_demanda_id IS NULL'
+RAIZ_ABERTA = "parent_demanda_id IS NULL AND status NOT IN ('concluida', 'cancelada')"
+
+INDICES = (
+    ('ix_demandas_raiz_criado_em', ['criado_em', 'id'], RAIZ),
+    ('ix_demandas_raiz_responsavel_criado_em', ['responsavel_id', 'criado_em', 'id'], RAIZ),
+    ('ix_demandas_raiz_solicitante_criado_em', ['solicitante_id', 'criado_em', 'id'], RAIZ),
+    ('ix_demandas_abertas_prazo', ['prazo'], RAIZ_ABERTA),
+    ('ix_demandas_abertas_responsavel_prazo', ['responsavel_id', 'prazo'], RAIZ_ABERTA),
+)
+
+
+def upgrade() -> None:
+    for nome, colunas, predicado in INDICES:
+        op.create_index(nome, 'demandas', colunas, postgresql_where=sa.text(predicado))
+
+
+def downgrade() -> None:
+    for nome, _colunas, _predicado in reversed(INDICES):
+        op.drop_index(nome, table_name='demandas')
@@ -0,0 +1,31 @@
+"""contador de versao por tabela para ETags dos catalogos
+
+Revision ID: 0034_versoes_tabelas
+Revises: 0033_demandas_indices_parciais
+Create Date: 2026-07-15
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0034_versoes_tabelas'
+down_revision: Union[str, None] = '0033_demandas_indices_parciais'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'versoes_tabelas',
+        sa.Column('tabela', sa.String(length=64), nullable=False),
+        sa.Column('versao', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('atualizado_em', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('tabela'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('versoes_tabelas')
@@ -0,0 +1,25 @@
+"""heartbeat dos jobs em execucao
+
+Revision ID: 0035_jobs_heartbeat
+Revises: 0034_versoes_tabelas
+Create Date: 2026-07-20
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0035_jobs_heartbeat'
+down_revision: Union[str, None] = '0034_versoes_tabelas'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('jobs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('jobs', 'heartbeat_at')
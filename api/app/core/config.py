@@ -9,9 +9,26 @@ class Settings(BaseSettings):
 
     APP_NAME: str = 'Gestao de Demandas'
     DATABASE_URL: str = 'postgresql+psycopg://fsc:fsc@db:5432/fsc_db'
+    # Réplica de leitura opcional para relatórios e listagens (vazio = tudo no primário).
+    DATABASE_READ_URL: str = ''
+    # Após uma escrita, as leituras do mesmo usuário ficam no primário por este tempo (segundos).
+    DB_READ_STICKY_SECONDS: float = 5
+    # Pool do SQLAlchemy; com DB_USE_NULLPOOL o pooling fica a cargo do pgbouncer/Supavisor.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_TIMEOUT_SECONDS: float = 10
+    DB_POOL_USE_LIFO: bool = True
+    DB_POOL_PRE_PING: bool = True
+    DB_USE_NULLPOOL: bool = False
+    # Timeouts aplicados em cada conexão nova, ou em cada transação com DB_USE_NULLPOOL (ms; 0 desativa).
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS: int = 60000
     JWT_SECRET: str = 'trocar_isto'
     JWT_ALGORITHM: str = 'HS256'
     JWT_EXPIRE_MINUTES: int = 480
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    AUTH_PRINCIPAL_CACHE_MAX_ENTRIES: int = 1024
 
     S3_ENDPOINT: str = 'http://minio:9000'
     S3_ACCESS_KEY: str = 'minio'
@@ -19,10 +36,32 @@ class Settings(BaseSettings):
     S3_BUCKET: str = 'demandas-anexos'
     S3_REGION: str = 'us-east-1'
     S3_STRICT_STARTUP: bool = False
+    S3_BOOTSTRAP_BACKOFF_INICIAL_SECONDS: float = 1
+    S3_BOOTSTRAP_BACKOFF_MAX_SECONDS: float = 60
+    # Endpoint usado nas URLs pré-assinadas quando o navegador não alcança S3_ENDPOINT (ex.: MinIO no compose).
+    S3_PUBLIC_ENDPOINT: str = ''
+    S3_PRESIGN_EXPIRES_SECONDS: int = 900
+    S3_MAX_POOL_CONNECTIONS: int = 20
+    S3_CONNECT_TIMEOUT_SECONDS: float = 5
+    S3_READ_TIMEOUT_SECONDS: float = 60
+    S3_MAX_ATTEMPTS: int = 3
 
     CORS_ORIGINS: str = 'http://localhost:5173'
 
     ADMIN_INITIAL_PASSWORD: str = 'admin123'
+    JOBS_MAX_WORKERS: int = 2
+    JOBS_MAX_TENTATIVAS: int = 3
+    # Intervalo do heartbeat de jobs em execução e tempo sem heartbeat para reenfileirá-los.
+    JOBS_HEARTBEAT_SECONDS: int = 15
+    JOBS_HEARTBEAT_TIMEOUT_SECONDS: int = 90
+    DASHBOARD_CACHE_TTL_SECONDS: int = 60
+    HEALTH_CACHE_TTL_SECONDS: float = 5
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = 2
+    # Profiler de consultas: Server-Timing, alerta de N+1 acima do limite (0 desativa) e /api/admin/perf.
+    PERF_PROFILER_ENABLED: bool = True
+    PERF_LIMITE_CONSULTAS_REQUISICAO: int = 50
+    PERF_JANELA_AMOSTRAS: int = 500
+    PERF_MAX_CONSULTAS_LENTAS: int = 20
     MAX_UPLOAD_SIZE_MB: int = 50
     ALLOWED_UPLOAD_EXTENSIONS: str = (
         'pdf,jpg,jpeg,png,gif,bmp,webp,'
@@ -40,7 +79,7 @@ class Settings(BaseSettings):
             )
         return v
 
-    @field_validator('DATABASE_URL')
+    @field_validator('DATABASE_URL', 'DATABASE_READ_URL')
     @classmethod
     def normalize_database_url(cls, v: str) -> str:
         url = v.strip()
@@ -1,11 +1,11 @@
 ﻿from fastapi import Depends, HTTPException, status
 
-from app.core.security import get_current_user
-from app.models.user import RoleEnum, User
+from app.core.security import UsuarioAutenticado, get_current_principal
+from app.models.user import RoleEnum
 
 
 def require_roles(*roles: RoleEnum):
-    def dependency(current_user: User = Depends(get_current_user)) -> User:
+    def dependency(current_user: UsuarioAutenticado = Depends(get_current_principal)) -> UsuarioAutenticado:
         if current_user.role not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 from typing import Optional
 
@@ -9,14 +10,30 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
-from app.db.session import get_db
-from app.models.user import User
+from app.db.session import INFO_USUARIO_ID, get_db
+from app.models.user import RoleEnum, User
+from app.services.metrics import DURACAO_HASH_SENHA
+from app.services.principal_cache import principal_cache
 
 settings = get_settings()
 pwd_context = CryptContext(schemes=['pbkdf2_sha256'], deprecated='auto')
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/api/auth/login')
 
 
+@dataclass(frozen=True, slots=True)
+class UsuarioAutenticado:
+    """Recorte do usuário suficiente para autorização; não é uma entidade da sessão."""
+
+    id: int
+    nome: str
+    role: RoleEnum
+    is_locked: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> 'UsuarioAutenticado':
+        return cls(id=user.id, nome=user.nome, role=user.role, is_locked=user.is_locked)
+
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -39,11 +56,15 @@ def authenticate_user(db: Session, email: str, password: str) -> User:
     if user.is_locked:
         raise HTTPException(status_code=403, detail="Usuário bloqueado por excesso de tentativas.")
 
-    if not verify_password(password, user.password_hash):
+    with DURACAO_HASH_SENHA.cronometrar():
+        senha_valida = verify_password(password, user.password_hash)
+    if not senha_valida:
         user.failed_login_attempts += 1
         if user.failed_login_attempts >= 5:
             user.is_locked = True
         db.commit()
+        if user.is_locked:
+            principal_cache.invalidate(user.id)
         raise HTTPException(status_code=401, detail="Email ou senha inválidos.")
     
     # Reset attempts on success
@@ -54,31 +75,66 @@ def authenticate_user(db: Session, email: str, password: str) -> User:
     return user
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail='Token inválido ou expirado.',
         headers={'WWW-Authenticate': 'Bearer'},
     )
 
+
+def _decodificar_user_id(token: str) -> int:
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
         user_id = payload.get('sub')
         if user_id is None:
-            raise credentials_exception
-        user_id_int = int(user_id)
+            raise _credentials_exception()
+        return int(user_id)
     except JWTError as exc:
-        raise credentials_exception from exc
+        raise _credentials_exception() from exc
     except (TypeError, ValueError) as exc:
-        raise credentials_exception from exc
+        raise _credentials_exception() from exc
+
+
+def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> UsuarioAutenticado:
+    """Usuário autenticado para rotas que só precisam de id/role/nome; usa o cache de principals."""
+    user_id = _decodificar_user_id(token)
+    # A mesma sessão é entregue à rota; o id permite associar as escritas dela ao usuário.
+    db.info[INFO_USUARIO_ID] = user_id
+
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        row = db.execute(
+            select(User.id, User.nome, User.role, User.is_locked).where(User.id == user_id)
+        ).first()
+        if row is None:
+            raise _credentials_exception()
+        principal = UsuarioAutenticado(id=row.id, nome=row.nome, role=row.role, is_locked=row.is_locked)
+        principal_cache.set(principal)
+
+    if principal.is_locked:
+        raise HTTPException(status_code=403, detail="Usuário bloqueado.")
+
+    return principal
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> User:
+    """Usuário completo da sessão, para rotas que leem ou alteram o próprio cadastro."""
+    user_id = _decodificar_user_id(token)
+    db.info[INFO_USUARIO_ID] = user_id
 
-    user = db.scalar(select(User).where(User.id == user_id_int))
+    user = db.scalar(select(User).where(User.id == user_id))
     if user is None:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+
+    principal_cache.set(UsuarioAutenticado.from_user(user))
+
     if user.is_locked:
         raise HTTPException(status_code=403, detail="Usuário bloqueado.")
         
@@ -0,0 +1,14 @@
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import Insert
+
+
+def insert_ignorando_conflitos(db: Session, tabela) -> Insert:
+    """INSERT ... ON CONFLICT DO NOTHING no dialeto da sessão (PostgreSQL em produção, SQLite nos testes)."""
+    dialeto = db.get_bind().dialect.name
+    if dialeto == 'postgresql':
+        return postgresql.insert(tabela).on_conflict_do_nothing()
+    if dialeto == 'sqlite':
+        return sqlite.insert(tabela).on_conflict_do_nothing()
+    return insert(tabela)
@@ -0,0 +1,71 @@
+import html
+import re
+
+from sqlalchemy import cast, func, literal, literal_column
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
+from sqlalchemy.sql.elements import ColumnElement
+
+# Configuração de busca criada na migração 0031: stemming em português sobre o texto sem acentos.
+CONFIG_BUSCA = 'public.demandas_pt'
+
+# Só o começo do conteúdo é indexado e destacado: um tsvector não passa de 1 MB (documentos
+# maiores falhariam no INSERT) e o ts_headline custa proporcional ao texto. A migração 0032
+# repete este valor na coluna gerada.
+LIMITE_CONTEUDO_BUSCA = 100_000
+
+MARCA_INICIO = '<mark>'
+MARCA_FIM = '</mark>'
+OPCOES_TRECHO = f'StartSel={MARCA_INICIO}, StopSel={MARCA_FIM}, MaxFragments=2, MaxWords=25, MinWords=8'
+
+_MARCAS = re.compile(f'({re.escape(MARCA_INICIO)}|{re.escape(MARCA_FIM)})')
+
+
+def escapar_like(termo: str) -> str:
+    """Escapa curingas de LIKE; usar com `escape='\\\\'`."""
+    return termo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def vetor_busca(tabela: str) -> ColumnElement:
+    # Coluna gerada `busca_vetor` das tabelas com busca textual; existe só no PostgreSQL.
+    return literal_column(f'{tabela}.busca_vetor', type_=TSVECTOR)
+
+
+def consulta_busca(termo: str) -> ColumnElement:
+    return func.websearch_to_tsquery(cast(literal(CONFIG_BUSCA), REGCONFIG), termo)
+
+
+def trecho_busca(texto: ColumnElement, consulta: ColumnElement) -> ColumnElement:
+    return func.ts_headline(
+        cast(literal(CONFIG_BUSCA), REGCONFIG),
+        func.left(func.coalesce(texto, ''), LIMITE_CONTEUDO_BUSCA),
+        consulta,
+        OPCOES_TRECHO,
+    )
+
+
+def sanitizar_trecho(trecho: str | None) -> str | None:
+    """Escapa o HTML do documento mantendo só as marcas de destaque geradas pela busca."""
+    if not trecho:
+        return None
+    partes = _MARCAS.split(trecho)
+    return ''.join(parte if parte in (MARCA_INICIO, MARCA_FIM) else html.escape(parte) for parte in partes)
+
+
+def destacar_trecho(texto: str | None, termo: str, contexto: int = 80) -> str | None:
+    """Equivalente simples do ts_headline para dialetos sem busca textual (SQLite nos testes)."""
+    if not texto:
+        return None
+    posicao = texto.lower().find(termo.lower())
+    if posicao < 0:
+        return None
+    inicio = max(posicao - contexto, 0)
+    fim = min(posicao + len(termo) + contexto, len(texto))
+    return (
+        ('…' if inicio else '')
+        + html.escape(texto[inicio:posicao])
+        + MARCA_INICIO
+        + html.escape(texto[posicao : posicao + len(termo)])
+        + MARCA_FIM
+        + html.escape(texto[posicao + len(termo) : fim])
+        + ('…' if fim < len(texto) else '')
+    )
@@ -1,15 +1,151 @@
-﻿from collections.abc import Generator
+import time
+from collections.abc import AsyncGenerator, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 from app.core.config import get_settings
+from app.services.metrics import ESPERA_POOL_DB
 
 settings = get_settings()
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+# Chave em Session.info com o id do usuário da requisição, gravada na autenticação.
+INFO_USUARIO_ID = 'usuario_id'
+
+
+def _timeouts() -> dict[str, int]:
+    timeouts = {
+        'statement_timeout': int(settings.DB_STATEMENT_TIMEOUT_MS),
+        'idle_in_transaction_session_timeout': int(settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS),
+    }
+    return {nome: valor for nome, valor in timeouts.items() if valor > 0}
+
+
+def _aplicar_timeouts(dbapi_connection, _connection_record) -> None:
+    timeouts = _timeouts()
+    if not timeouts:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for nome, valor in timeouts.items():
+            cursor.execute(f'SET {nome} = {valor}')
+    finally:
+        cursor.close()
+    # Os SETs não podem ficar pendentes numa transação que o pool descartaria no rollback.
+    dbapi_connection.commit()
+
+
+def _aplicar_timeouts_na_transacao(conn) -> None:
+    # No modo transação do pgbouncer/Supavisor cada transação pode cair num backend diferente:
+    # um SET de sessão vazaria para outros clientes, então vale só até o fim desta transação.
+    timeouts = _timeouts()
+    if timeouts:
+        conn.exec_driver_sql(
+            'SELECT ' + ', '.join(f"set_config('{nome}', '{valor}', true)" for nome, valor in timeouts.items())
+        )
+
+
+def _configurar_timeouts(engine: Engine) -> None:
+    if engine.dialect.name != 'postgresql':
+        return
+    if settings.DB_USE_NULLPOOL:
+        event.listen(engine, 'begin', _aplicar_timeouts_na_transacao)
+    else:
+        event.listen(engine, 'connect', _aplicar_timeouts)
+
+
+class _CheckoutMedido:
+    # Tempo de connect() do pool: fila de espera, criação de conexão nova e pre-ping.
+    rotulo_metricas = ''
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            ESPERA_POOL_DB.observar(time.perf_counter() - inicio, self.rotulo_metricas)
+
+
+class QueuePoolMedido(_CheckoutMedido, QueuePool):
+    rotulo_metricas = 'sync'
+
+
+class AsyncAdaptedQueuePoolMedido(_CheckoutMedido, AsyncAdaptedQueuePool):
+    rotulo_metricas = 'async'
+
+
+def criar_engine(url: str) -> Engine:
+    if url.startswith('sqlite'):
+        return create_engine(url, pool_pre_ping=True)
+
+    engine = create_engine(url, **_opcoes_pool(QueuePoolMedido))
+    _configurar_timeouts(engine)
+    return engine
+
+
+def _opcoes_pool(poolclass: type) -> dict:
+    if settings.DB_USE_NULLPOOL:
+        # Statements preparados pelo psycopg ficam no backend, que no modo transação do pooler
+        # é de outro cliente na próxima vez ("prepared statement already exists").
+        return {'poolclass': NullPool, 'connect_args': {'prepare_threshold': None}}
+    return {
+        'poolclass': poolclass,
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_recycle': settings.DB_POOL_RECYCLE_SECONDS,
+        'pool_timeout': settings.DB_POOL_TIMEOUT_SECONDS,
+        'pool_use_lifo': settings.DB_POOL_USE_LIFO,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+    }
+
+
+def url_async(url: str) -> str:
+    # psycopg3 atende sync e async com o mesmo prefixo; o SQLite precisa do driver aiosqlite.
+    if url.startswith('sqlite+aiosqlite'):
+        return url
+    if url.startswith('sqlite'):
+        return 'sqlite+aiosqlite' + url[url.index(':'):]
+    return url
+
+
+def criar_engine_async(url: str) -> AsyncEngine:
+    """Engine assíncrono das rotas de leitura mais acessadas, com o mesmo pool e timeouts do síncrono."""
+    url = url_async(url)
+    if url.startswith('sqlite'):
+        return create_async_engine(url, pool_pre_ping=True)
+
+    engine = create_async_engine(url, **_opcoes_pool(AsyncAdaptedQueuePoolMedido))
+    _configurar_timeouts(engine.sync_engine)
+    return engine
+
+
+def estatisticas_pool(engine: Engine) -> dict:
+    pool = engine.pool
+    # Nome da classe do SQLAlchemy, sem as subclasses medidas definidas aqui.
+    tipo = next(classe.__name__ for classe in type(pool).__mro__ if classe.__module__.startswith('sqlalchemy'))
+    if not isinstance(pool, QueuePool):
+        return {'tipo': tipo}
+    return {
+        'tipo': tipo,
+        'tamanho': pool.size(),
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'em_uso': pool.checkedout(),
+        'ociosas': pool.checkedin(),
+        'overflow': pool.overflow(),
+        'timeout_segundos': pool.timeout(),
+    }
+
+
+engine = criar_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
+# Sem DATABASE_READ_URL os engines de leitura são os próprios engines do primário.
+read_engine = criar_engine(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else engine
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False, expire_on_commit=False)
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -17,3 +153,19 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async_engine = criar_engine_async(settings.DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+async_read_engine = criar_engine_async(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else async_engine
+AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
+
+
+def replica_configurada() -> bool:
+    return read_engine is not engine
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,235 +1,46 @@
-﻿import logging
-import time
-from contextlib import asynccontextmanager
-from datetime import date
+﻿from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import select, text
-
-logger = logging.getLogger(__name__)
 
 from app.core.config import get_settings
-from app.core.security import hash_password
-from app.db.session import SessionLocal
-from app.models.fsc import (
-    AuditoriaAno,
-    ConfiguracaoSistema,
-    Criterio,
-    EvidenceType,
-    Indicador,
-    ProgramaCertificacao,
-    StatusConformidadeEnum,
-)
-from app.models.user import RoleEnum, User
-from app.routers import auth, demanda_analises, demanda_gestao, fsc, projects, reports
-from app.services.s3_storage import ensure_bucket_exists
+from app.db.session import SessionLocal, async_engine, async_read_engine, read_engine, replica_configurada
+from app.routers import admin, auth, demanda_analises, demanda_gestao, fsc, jobs, projects, reports
+from app.services.health import health_checker
+from app.services.jobs import job_runner
+from app.services.metrics import CONTENT_TYPE_PROMETHEUS, MetricasMiddleware, registro
+from app.services.query_profiler import PerfilConsultasMiddleware
+from app.services.seeds import executar_seeds, medir_fase
+from app.services.storage_bootstrap import storage_status
 
 settings = get_settings()
 
 
-def _seed_programas_certificacao() -> None:
-    programas_padrao = [
-        ('FSC', 'FSC', 'Forest Stewardship Council'),
-        ('PEFC', 'PEFC', 'Programme for the Endorsement of Forest Certification'),
-        ('ONCA_PINTADA', 'Onça Pintada', 'Certificação e monitoramento para onça pintada'),
-        ('CARBONO', 'Carbono', 'Programas e auditorias para carbono florestal'),
-    ]
-
-    with SessionLocal() as db:
-        existentes = {codigo for codigo in db.scalars(select(ProgramaCertificacao.codigo)).all()}
-        for codigo, nome, descricao in programas_padrao:
-            if codigo == 'PEFC' and 'PFC' in existentes and 'PEFC' not in existentes:
-                # Será normalizado de PFC -> PEFC na rotina seguinte.
-                continue
-            if codigo in existentes:
-                continue
-            db.add(ProgramaCertificacao(codigo=codigo, nome=nome, descricao=descricao))
-            existentes.add(codigo)
-        db.commit()
-
-
-def _normalizar_programas_certificacao() -> None:
-    padrao_por_codigo = {
-        'FSC': ('FSC', 'Forest Stewardship Council'),
-        'PEFC': ('PEFC', 'Programme for the Endorsement of Forest Certification'),
-        'PFC': ('PEFC', 'Programme for the Endorsement of Forest Certification'),
-        'ONCA_PINTADA': ('Onça Pintada', 'Certificação e monitoramento para onça pintada'),
-        'CARBONO': ('Carbono', 'Programas e auditorias para carbono florestal'),
-    }
-
-    with SessionLocal() as db:
-        programas = list(db.scalars(select(ProgramaCertificacao)).all())
-        tem_pefc = any(programa.codigo == 'PEFC' for programa in programas)
-        alterou = False
-        for programa in programas:
-            padrao = padrao_por_codigo.get(programa.codigo)
-            if not padrao:
-                continue
-
-            if programa.codigo == 'PFC' and tem_pefc:
-                # Mantém legado quando já existe PEFC para evitar conflito de unicidade.
-                continue
-
-            nome, descricao = padrao
-            if programa.codigo == 'PFC' and not tem_pefc:
-                programa.codigo = 'PEFC'
-                alterou = True
-            if programa.nome != nome:
-                programa.nome = nome
-                alterou = True
-            if programa.descricao != descricao:
-                programa.descricao = descricao
-                alterou = True
-
-        if alterou:
-            db.commit()
-
-
-def _seed_auditorias_iniciais() -> None:
-    ano_atual = date.today().year
-    with SessionLocal() as db:
-        programas = list(db.scalars(select(ProgramaCertificacao)).all())
-        alterou = False
-        for programa in programas:
-            possui_auditoria = db.scalar(
-                select(AuditoriaAno.id).where(AuditoriaAno.programa_id == programa.id).limit(1)
-            )
-            if possui_auditoria:
-                continue
-            db.add(
-                AuditoriaAno(
-                    programa_id=programa.id,
-                    year=ano_atual,
-                    tipo='Certificação',
-                )
-            )
-            alterou = True
-
-        if alterou:
-            db.commit()
-
-
-def _seed_evidence_types() -> None:
-    tipos_padrao = [
-        ('Foto', 'Registro fotográfico de campo.'),
-        ('Mapa', 'Mapas temáticos e georreferenciados.'),
-        ('Licença/Autorização', 'Licenças, autorizações e documentos legais.'),
-        ('Procedimento', 'Procedimentos operacionais e instruções de trabalho.'),
-        ('Relatório', 'Relatórios técnicos e de auditoria.'),
-        ('Registro', 'Registros operacionais e evidências documentais.'),
-        ('Ata/Consulta', 'Atas de reunião e consultas a partes interessadas.'),
-        ('Monitoramento', 'Dados e relatórios de monitoramento.'),
-    ]
-
-    with SessionLocal() as db:
-        indicadores = list(db.scalars(select(Indicador).order_by(Indicador.id)).all())
-        if not indicadores:
-            return
-        existentes = {
-            (int(programa_id), int(criterio_id), int(indicador_id), str(nome).lower())
-            for programa_id, criterio_id, indicador_id, nome in db.execute(
-                select(
-                    EvidenceType.programa_id,
-                    EvidenceType.criterio_id,
-                    EvidenceType.indicador_id,
-                    EvidenceType.nome,
-                ).where(
-                    EvidenceType.programa_id.is_not(None),
-                    EvidenceType.criterio_id.is_not(None),
-                    EvidenceType.indicador_id.is_not(None),
-                )
-            ).all()
-        }
-        alterou = False
-
-        criterio_por_id = {
-            criterio.id: criterio
-            for criterio in db.scalars(select(Criterio).where(Criterio.id.in_([i.criterio_id for i in indicadores]))).all()
-        }
-        for nome, descricao in tipos_padrao:
-            for indicador in indicadores:
-                criterio = criterio_por_id.get(indicador.criterio_id)
-                if not criterio:
-                    continue
-                chave = (indicador.programa_id, criterio.id, indicador.id, nome.lower())
-                if chave in existentes:
-                    continue
-                db.add(
-                    EvidenceType(
-                        programa_id=indicador.programa_id,
-                        criterio_id=criterio.id,
-                        indicador_id=indicador.id,
-                        nome=nome,
-                        descricao=descricao,
-                        status_conformidade=StatusConformidadeEnum.conforme,
-                    )
-                )
-                existentes.add(chave)
-                alterou = True
-        if alterou:
-            db.commit()
-
-
-def _seed_admin_user() -> None:
-    with SessionLocal() as db:
-        admin = db.scalar(select(User).where(User.email == 'admin@local'))
-        if admin:
-            if admin.needs_password_change:
-                admin.password_hash = hash_password(settings.ADMIN_INITIAL_PASSWORD)
-                admin.is_locked = False
-                admin.failed_login_attempts = 0
-                db.commit()
-            return
-        db.add(
-            User(
-                nome='Administrador',
-                email='admin@local',
-                role=RoleEnum.ADMIN,
-                password_hash=hash_password(settings.ADMIN_INITIAL_PASSWORD),
-                needs_password_change=True,
-            )
-        )
-        db.commit()
-
-
-def _seed_configuracao_sistema() -> None:
-    with SessionLocal() as db:
-        existente = db.scalar(select(ConfiguracaoSistema).limit(1))
-        if existente:
-            return
-        db.add(ConfiguracaoSistema(nome_empresa='Empresa'))
-        db.commit()
-
-
-def _setup_storage_with_retry() -> None:
-    tentativas = 10
-    for tentativa in range(1, tentativas + 1):
-        try:
-            ensure_bucket_exists()
-            return
-        except Exception as exc:
-            if tentativa == tentativas:
-                if settings.S3_STRICT_STARTUP:
-                    raise
-                logger.warning(
-                    'Não foi possível validar/criar bucket de evidências no startup. '
-                    'O upload de arquivos pode falhar até ajustar S3. Erro: %s', exc
-                )
-                return
-            time.sleep(2)
+def _iniciar_storage() -> None:
+    if not settings.S3_STRICT_STARTUP:
+        storage_status.iniciar_em_segundo_plano()
+        return
+    if not storage_status.verificar_com_backoff(max_tentativas=10):
+        raise RuntimeError(f'Bucket de evidências inacessível no startup: {storage_status.ultimo_erro}')
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    _setup_storage_with_retry()
-    _seed_programas_certificacao()
-    _normalizar_programas_certificacao()
-    _seed_auditorias_iniciais()
-    _seed_evidence_types()
-    _seed_admin_user()
-    _seed_configuracao_sistema()
+    with medir_fase('storage'):
+        _iniciar_storage()
+    with medir_fase('seeds'), SessionLocal() as db:
+        executar_seeds(db)
+    with medir_fase('recuperação de jobs'):
+        job_runner.recuperar()
+    job_runner.iniciar_varredura()
     yield
+    job_runner.encerrar()
+    storage_status.encerrar()
+    await async_engine.dispose()
+    if replica_configurada():
+        read_engine.dispose()
+        await async_read_engine.dispose()
 
 
 app = FastAPI(title=settings.APP_NAME, version='1.0.0', lifespan=lifespan)
@@ -240,7 +51,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=['Server-Timing'],
 )
+app.add_middleware(PerfilConsultasMiddleware)
+app.add_middleware(MetricasMiddleware)
 
 app.include_router(auth.router)
 app.include_router(fsc.router)
@@ -248,6 +62,8 @@ app.include_router(projects.router)
 app.include_router(reports.router)
 app.include_router(demanda_analises.router)
 app.include_router(demanda_gestao.router)
+app.include_router(jobs.router)
+app.include_router(admin.router)
 
 
 @app.get('/')
@@ -255,32 +71,34 @@ def root() -> dict[str, str]:
     return {'mensagem': 'API de gestao de projetos em execucao. Acesse /docs para documentacao.'}
 
 
-@app.get('/api/health')
-def health(response: Response) -> dict:
-    resultado: dict = {'status': 'ok', 'db': 'ok', 's3': 'ok'}
+@app.get('/api/live')
+def live() -> dict[str, str]:
+    # Liveness: só confirma que o processo responde; não toca banco nem storage.
+    return {'status': 'ok'}
 
-    try:
-        with SessionLocal() as db:
-            db.execute(text('SELECT 1'))
-    except Exception as exc:
-        logger.error('Health check — falha no banco: %s', exc)
-        resultado['db'] = 'error'
-        resultado['status'] = 'degraded'
 
-    try:
-        from app.services.s3_storage import get_s3_client
-        get_s3_client().head_bucket(Bucket=settings.S3_BUCKET)
-    except Exception as exc:
-        logger.warning('Health check — falha no S3: %s', exc)
-        resultado['s3'] = 'error'
-        resultado['status'] = 'degraded'
+@app.get('/api/ready')
+@app.get('/api/health')
+def ready(response: Response) -> dict:
+    probes = health_checker.verificar()
+    resultado: dict = {'status': 'ok', **probes, 'storage': storage_status.resumo()}
 
-    if resultado['status'] != 'ok':
+    if probes['db']['status'] != 'ok':
+        # Sem banco a API não atende nada; storage ou réplica fora só degradam parte das rotas.
+        resultado['status'] = 'not_ready'
         response.status_code = 503
+    elif any(probe['status'] != 'ok' for nome, probe in probes.items() if nome != 'db') or not storage_status.pronto:
+        resultado['status'] = 'degraded'
 
     return resultado
 
 
+@app.get('/metrics', include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    # Formato texto do Prometheus, com valores acumulados desde o início do processo.
+    return PlainTextResponse(registro.expor(), media_type=CONTENT_TYPE_PROMETHEUS)
+
+
 @app.get('/api/version')
 def version() -> dict[str, str]:
     return {'version': app.version, 'app': app.title}
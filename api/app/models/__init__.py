@@ -36,7 +36,10 @@ from app.models.project import (
     TarefaProjeto,
     TarefaStatusEnum,
 )
+from app.models.job import Job, JobStatusEnum
+from app.models.seed import SeedVersao
 from app.models.user import RoleEnum, User
+from app.models.versao_tabela import VersaoTabela
 from app.models.demanda_gestao import (
     Demanda,
     DemandaAnalise,
@@ -89,6 +92,10 @@ __all__ = [
     'StatusNotificacaoEnum',
     'AuditLog',
     'AcaoAuditEnum',
+    'Job',
+    'JobStatusEnum',
+    'SeedVersao',
+    'VersaoTabela',
     'Projeto',
     'TarefaProjeto',
     'AtividadeSetorConfig',
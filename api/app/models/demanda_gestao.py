@@ -1,7 +1,7 @@
 import enum
 from datetime import date, datetime, timezone
 
-from sqlalchemy import Date, DateTime, Enum, ForeignKey, Integer, String, Text, func
+from sqlalchemy import Date, DateTime, Enum, ForeignKey, Index, Integer, String, Text, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
@@ -25,6 +25,16 @@ class DemandaPrioridade(str, enum.Enum):
     critica = 'critica'
 
 
+# Predicados dos índices parciais (migração 0033). As consultas precisam repetir o mesmo
+# texto, com os status como literais, para que o planner consiga usar esses índices.
+PREDICADO_DEMANDA_RAIZ = 'parent_demanda_id IS NULL'
+PREDICADO_DEMANDA_RAIZ_ABERTA = "parent_demanda_id IS NULL AND status NOT IN ('concluida', 'cancelada')"
+
+
+def _indice_parcial(nome: str, *colunas: str, predicado: str) -> Index:
+    return Index(nome, *colunas, postgresql_where=text(predicado), sqlite_where=text(predicado))
+
+
 class DemandaAnaliseMetodo(str, enum.Enum):
     cinco_porques = '5_PORQUES'
     quatro_w_dois_h = '4W2H'
@@ -46,6 +56,24 @@ class DemandaAnaliseStatus(str, enum.Enum):
 
 class Demanda(Base):
     __tablename__ = 'demandas'
+    # No PostgreSQL a tabela também tem a coluna gerada busca_vetor (tsvector) e índices
+    # GIN/trigram da migração 0031; ficam fora do modelo para o SQLite dos testes.
+    __table_args__ = (
+        Index('ix_demandas_criado_em_id', 'criado_em', 'id'),
+        # Listagem e "recentes": demandas raiz por criado_em, com e sem o recorte de RBAC.
+        _indice_parcial('ix_demandas_raiz_criado_em', 'criado_em', 'id', predicado=PREDICADO_DEMANDA_RAIZ),
+        _indice_parcial(
+            'ix_demandas_raiz_responsavel_criado_em', 'responsavel_id', 'criado_em', 'id', predicado=PREDICADO_DEMANDA_RAIZ
+        ),
+        _indice_parcial(
+            'ix_demandas_raiz_solicitante_criado_em', 'solicitante_id', 'criado_em', 'id', predicado=PREDICADO_DEMANDA_RAIZ
+        ),
+        # Home: atrasadas (prazo < hoje) e "minhas demandas" entre as raiz ainda abertas.
+        _indice_parcial('ix_demandas_abertas_prazo', 'prazo', predicado=PREDICADO_DEMANDA_RAIZ_ABERTA),
+        _indice_parcial(
+            'ix_demandas_abertas_responsavel_prazo', 'responsavel_id', 'prazo', predicado=PREDICADO_DEMANDA_RAIZ_ABERTA
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     codigo: Mapped[str] = mapped_column(String(20), unique=True, index=True, nullable=False)
@@ -199,6 +227,7 @@ class DemandaAnexo(Base):
     nome_arquivo: Mapped[str] = mapped_column(String(255), nullable=False)
     content_type: Mapped[str] = mapped_column(String(100), nullable=True)
     tamanho: Mapped[int] = mapped_column(nullable=True)
+    checksum_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
     storage_key: Mapped[str] = mapped_column(String(512), nullable=False)
     observacoes: Mapped[str | None] = mapped_column(Text, nullable=True)
     criado_em: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,40 @@
+import enum
+from datetime import datetime
+
+from sqlalchemy import DateTime, Enum, ForeignKey, Integer, JSON, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class JobStatusEnum(str, enum.Enum):
+    pendente = 'pendente'
+    executando = 'executando'
+    concluido = 'concluido'
+    falhou = 'falhou'
+
+
+class Job(Base):
+    __tablename__ = 'jobs'
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    tipo: Mapped[str] = mapped_column(String(80), nullable=False, index=True)
+    status: Mapped[JobStatusEnum] = mapped_column(
+        Enum(JobStatusEnum, name='job_status_enum', native_enum=False),
+        nullable=False,
+        default=JobStatusEnum.pendente,
+        server_default=JobStatusEnum.pendente.value,
+        index=True,
+    )
+    parametros: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    resultado: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    erro: Mapped[str | None] = mapped_column(Text, nullable=True)
+    progresso: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    tentativas: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    idempotency_key: Mapped[str | None] = mapped_column(String(120), nullable=True, unique=True)
+    created_by: Mapped[int | None] = mapped_column(ForeignKey('usuarios.id', ondelete='SET NULL'), nullable=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Renovado enquanto o job roda; sem renovação recente o job é considerado abandonado.
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
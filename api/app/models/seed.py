@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class SeedVersao(Base):
+    __tablename__ = 'seed_versoes'
+
+    versao: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    aplicado_em: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
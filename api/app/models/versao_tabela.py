@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class VersaoTabela(Base):
+    """Contador de alterações por tabela, incrementado no commit (ver app.services.versoes_tabelas)."""
+
+    __tablename__ = 'versoes_tabelas'
+
+    tabela: Mapped[str] = mapped_column(String(64), primary_key=True)
+    versao: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default='0')
+    atualizado_em: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
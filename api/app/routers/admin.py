@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, status
+
+from app.core.rbac import require_roles
+from app.core.security import UsuarioAutenticado
+from app.db.session import async_engine, async_read_engine, engine, estatisticas_pool, read_engine, replica_configurada
+from app.models.user import RoleEnum
+from app.services.query_profiler import perfil_consultas
+from app.services.s3_storage import estatisticas_clientes_s3
+
+router = APIRouter(prefix='/api/admin', tags=['Administração'])
+
+
+@router.get('/storage')
+def estatisticas_storage(
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
+) -> dict:
+    return {'clientes_s3': estatisticas_clientes_s3()}
+
+
+@router.get('/db-pool')
+def estatisticas_db_pool(
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
+) -> dict:
+    pools = {'principal': estatisticas_pool(engine), 'async': estatisticas_pool(async_engine.sync_engine)}
+    if replica_configurada():
+        pools['leitura'] = estatisticas_pool(read_engine)
+        pools['leitura_async'] = estatisticas_pool(async_read_engine.sync_engine)
+    return pools
+
+
+@router.get('/perf')
+def estatisticas_perf(
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
+) -> dict:
+    return perfil_consultas.resumo()
+
+
+@router.delete('/perf', status_code=status.HTTP_204_NO_CONTENT)
+def limpar_perf(
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
+) -> None:
+    perfil_consultas.clear()
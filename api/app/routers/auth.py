@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 
 from app.core.rbac import require_roles
 from app.core.security import (
+    UsuarioAutenticado,
     authenticate_user,
     create_access_token,
     get_current_user,
@@ -14,6 +15,7 @@ from app.db.session import get_db
 from app.models.user import RoleEnum, User
 from app.schemas.auth import AlterarSenhaRequest, MensagemAuthOut, TokenResponse
 from app.schemas.user import UserCreate, UserOut
+from app.services.principal_cache import principal_cache
 
 router = APIRouter(prefix='/api/auth', tags=['Autenticação'])
 
@@ -52,7 +54,7 @@ async def login(request: Request, db: Session = Depends(get_db)) -> TokenRespons
 def register(
     payload: UserCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
 ) -> UserOut:
     existing = db.scalar(select(User).where(User.email == payload.email))
     if existing:
@@ -79,8 +81,11 @@ def me(current_user: User = Depends(get_current_user)) -> UserOut:
 def alterar_senha(
     payload: AlterarSenhaRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN)),
+    principal: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
 ) -> MensagemAuthOut:
+    current_user = db.get(User, principal.id)
+    if current_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Usuário não encontrado.')
     if not verify_password(payload.senha_atual, current_user.password_hash):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Senha atual invalida.')
 
@@ -99,7 +104,7 @@ def alterar_senha(
 @router.get('/users', response_model=list[UserOut])
 def listar_usuarios(
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
 ) -> list[UserOut]:
     return list(db.scalars(select(User).order_by(User.nome)).all())
 
@@ -109,7 +114,7 @@ def atualizar_usuario(
     user_id: int,
     payload: 'UserUpdate',
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
 ) -> UserOut:
     from app.schemas.user import UserUpdate
     from app.core.security import hash_password as _hash
@@ -125,6 +130,7 @@ def atualizar_usuario(
         setattr(user, field, value)
 
     db.commit()
+    principal_cache.invalidate(user.id)
     db.refresh(user)
     return user
 
@@ -133,7 +139,7 @@ def atualizar_usuario(
 def remover_usuario(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
 ) -> MensagemAuthOut:
     if user_id == current_user.id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Não é possível remover seu próprio usuário.')
@@ -142,6 +148,7 @@ def remover_usuario(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Usuário não encontrado.')
     db.delete(user)
     db.commit()
+    principal_cache.invalidate(user_id)
     return MensagemAuthOut(mensagem=f'Usuário {user.email} removido com sucesso.')
 
 
@@ -149,7 +156,7 @@ def remover_usuario(
 def unlock_user(
     user_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
 ) -> MensagemAuthOut:
     user = db.scalar(select(User).where(User.id == user_id))
     if not user:
@@ -159,4 +166,5 @@ def unlock_user(
     user.is_locked = False
     user.failed_login_attempts = 0
     db.commit()
+    principal_cache.invalidate(user.id)
     return MensagemAuthOut(mensagem=f'Usuário {user.email} desbloqueado com sucesso.')
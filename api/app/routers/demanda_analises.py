@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.orm import Session, selectinload
 
-from app.core.security import get_current_user
+from app.core.security import UsuarioAutenticado, get_current_principal
 from app.db.session import get_db
 from app.models.demanda_gestao import (
     Demanda,
@@ -54,7 +54,7 @@ def _buscar_analise(db: Session, analise_id: int) -> DemandaAnalise:
     return analise
 
 
-def _verificar_acesso_demanda(demanda: Demanda, current_user: User) -> None:
+def _verificar_acesso_demanda(demanda: Demanda, current_user: UsuarioAutenticado) -> None:
     if current_user.role in (RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR):
         return
     if current_user.role == RoleEnum.RESPONSAVEL and demanda.responsavel_id == current_user.id:
@@ -64,7 +64,7 @@ def _verificar_acesso_demanda(demanda: Demanda, current_user: User) -> None:
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Acesso negado.')
 
 
-def _verificar_permissao_edicao_analise(analise: DemandaAnalise, demanda: Demanda, current_user: User) -> None:
+def _verificar_permissao_edicao_analise(analise: DemandaAnalise, demanda: Demanda, current_user: UsuarioAutenticado) -> None:
     if current_user.role in (RoleEnum.ADMIN, RoleEnum.GESTOR):
         return
     if analise.responsavel_id == current_user.id:
@@ -87,7 +87,7 @@ def _verificar_responsavel_existente(db: Session, responsavel_id: int | None) ->
 
 
 def _resolver_responsavel_id(
-    current_user: User,
+    current_user: UsuarioAutenticado,
     responsavel_id_informado: int | None,
     responsavel_id_atual: int | None = None,
 ) -> int | None:
@@ -105,7 +105,7 @@ def _resolver_responsavel_id(
     return responsavel_id_informado
 
 
-def _validar_transicao_status(status_destino: DemandaAnaliseStatus, current_user: User) -> None:
+def _validar_transicao_status(status_destino: DemandaAnaliseStatus, current_user: UsuarioAutenticado) -> None:
     if status_destino in (DemandaAnaliseStatus.concluido, DemandaAnaliseStatus.cancelado) and current_user.role not in (
         RoleEnum.ADMIN,
         RoleEnum.GESTOR,
@@ -152,7 +152,7 @@ def _substituir_campos(analise: DemandaAnalise, method_field_rows: list[dict[str
 def listar_analises_demanda(
     demanda_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> List[DemandaAnaliseRead]:
     demanda = _buscar_demanda(db, demanda_id)
     _verificar_acesso_demanda(demanda, current_user)
@@ -171,7 +171,7 @@ def criar_analise_demanda(
     demanda_id: int,
     body: DemandaAnaliseCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaAnaliseRead:
     demanda = _buscar_demanda(db, demanda_id)
     _verificar_acesso_demanda(demanda, current_user)
@@ -206,7 +206,7 @@ def criar_analise_demanda(
 def obter_analise_demanda(
     analise_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaAnaliseRead:
     analise = _buscar_analise(db, analise_id)
     demanda = _buscar_demanda(db, analise.demanda_id)
@@ -219,7 +219,7 @@ def atualizar_analise_demanda(
     analise_id: int,
     body: DemandaAnaliseUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaAnaliseRead:
     analise = _buscar_analise(db, analise_id)
     demanda = _buscar_demanda(db, analise.demanda_id)
@@ -259,7 +259,7 @@ def alterar_status_analise_demanda(
     analise_id: int,
     body: DemandaAnaliseStatusUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaAnaliseRead:
     analise = _buscar_analise(db, analise_id)
     demanda = _buscar_demanda(db, analise.demanda_id)
@@ -284,7 +284,7 @@ def alterar_status_analise_demanda(
 def excluir_analise_demanda(
     analise_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> MensagemOut:
     analise = _buscar_analise(db, analise_id)
     demanda = _buscar_demanda(db, analise.demanda_id)
@@ -1,14 +1,21 @@
+import base64
+import json
 from datetime import date, datetime, timedelta
-from typing import List, Optional
+from pathlib import Path
+from typing import List, Optional, Union
 from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, Form, HTTPException, Query, Response, status, UploadFile, File
-from sqlalchemy import and_, func, or_, select, desc
-from sqlalchemy.orm import Session, selectinload
+from fastapi import APIRouter, Depends, Form, Header, HTTPException, Query, Request, Response, status, UploadFile, File
+from fastapi.responses import RedirectResponse
+from sqlalchemy import Float, and_, bindparam, case, func, literal, or_, select, desc, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, selectinload
 
 from app.core.config import get_settings
-from app.core.security import get_current_user
-from app.db.session import get_db
+from app.core.rbac import require_roles
+from app.core.security import UsuarioAutenticado, get_current_principal
+from app.db.busca import consulta_busca, escapar_like, vetor_busca
+from app.db.session import get_async_db, get_db
 from app.models.demanda_gestao import (
     Demanda,
     DemandaStatus,
@@ -24,23 +31,46 @@ from app.schemas.demanda_gestao import (
     DemandaStatusUpdate,
     DemandaRead,
     DemandaListItem,
+    DemandaListPage,
     DemandaComentarioCreate,
     DemandaComentarioRead,
     DemandaEventoRead,
     DemandaAnexoRead,
+    DemandaAnexoUploadFinalizacao,
+    DemandaAnexoUploadSolicitacao,
+    DashboardCacheStatsOut,
     GestaoDashboardOut,
     ItemContagem,
     ItemContagemPct,
     HomeDataOut,
 )
-from app.services.s3_storage import baixar_arquivo_s3, upload_fileobj, validate_upload
+from app.schemas.storage import UploadPreAssinadoOut
+from app.services.dashboard_cache import dashboard_cache
+from app.services.http_cache import responder_com_etag
+from app.services.read_routing import get_async_read_db, get_read_db
+from app.services.s3_storage import (
+    consultar_upload_direto,
+    gerar_upload_pre_assinado,
+    redirecionar_download,
+    remover_objeto,
+    resposta_streaming_s3,
+    upload_stream,
+    validate_upload,
+    validate_upload_extension,
+)
+from app.services.storage_bootstrap import exigir_storage_pronto
 
 settings = get_settings()
 
 router = APIRouter(prefix='/api/gestao-demandas', tags=['Demandas'])
 
+STATUS_FINALIZADOS = (DemandaStatus.concluida, DemandaStatus.cancelada)
+
+LIMITE_PADRAO_PAGINA = 50
+LIMITE_MAXIMO_PAGINA = 200
+
 
-def _verificar_acesso(demanda: Demanda, current_user: User) -> None:
+def _verificar_acesso(demanda: Demanda, current_user: UsuarioAutenticado) -> None:
     if current_user.role in (RoleEnum.ADMIN, RoleEnum.GESTOR):
         return
     if current_user.role == RoleEnum.RESPONSAVEL and demanda.responsavel_id == current_user.id:
@@ -52,7 +82,14 @@ def _verificar_acesso(demanda: Demanda, current_user: User) -> None:
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Acesso negado.')
 
 
-def _aplicar_filtro_usuario(query, current_user: User):
+def _filtro_demanda_aberta():
+    # Status renderizados como literais para casar com o predicado dos índices parciais de demandas abertas.
+    return Demanda.status.not_in(
+        bindparam('status_finalizados', list(STATUS_FINALIZADOS), expanding=True, literal_execute=True)
+    )
+
+
+def _aplicar_filtro_usuario(query, current_user: UsuarioAutenticado):
     if current_user.role == RoleEnum.RESPONSAVEL:
         return query.where(Demanda.responsavel_id == current_user.id)
     if current_user.role == RoleEnum.SOLICITANTE:
@@ -60,6 +97,15 @@ def _aplicar_filtro_usuario(query, current_user: User):
     return query
 
 
+def _escopo_usuario(current_user: UsuarioAutenticado) -> tuple:
+    # Mesmo recorte aplicado por _aplicar_filtro_usuario; usado como chave dos snapshots do dashboard.
+    if current_user.role == RoleEnum.RESPONSAVEL:
+        return ('responsavel', current_user.id)
+    if current_user.role == RoleEnum.SOLICITANTE:
+        return ('solicitante', current_user.id)
+    return ('todas',)
+
+
 def _normalizar_media_dias(valor: object) -> Optional[float]:
     if valor is None:
         return None
@@ -99,8 +145,13 @@ def _buscar_anexo(db: Session, demanda_id: int, anexo_id: int) -> DemandaAnexo:
     return anexo
 
 
-def _gerar_codigo(db: Session) -> str:
-    # Busca o último código
+def _gerar_codigo(db: Session):
+    # No PostgreSQL o código sai da sequence demandas_codigo_seq (migração 0027) dentro do
+    # próprio INSERT, sem leitura prévia e sem colisão entre requisições concorrentes.
+    if db.get_bind().dialect.name == 'postgresql':
+        return func.proximo_codigo_demanda()
+
+    # Demais dialetos (SQLite nos testes): busca o último código
     ultimo = db.scalar(select(Demanda.codigo).order_by(desc(Demanda.id)).limit(1))
     if not ultimo:
         return "DEM-000001"
@@ -127,6 +178,23 @@ def _buscar_demanda_com_relacoes(db: Session, demanda_id: int) -> Optional[Deman
     )
 
 
+def _versao_detalhe_demanda(db: Session, demanda: Demanda) -> tuple:
+    # O detalhe traz a demanda pai, as subdemandas e nomes de usuários; todas entram na versão.
+    # A data entra porque o `atraso` das subdemandas é calculado a partir de hoje.
+    relacionadas = [Demanda.id == demanda.id, Demanda.parent_demanda_id == demanda.id]
+    if demanda.parent_demanda_id is not None:
+        relacionadas.append(Demanda.id == demanda.parent_demanda_id)
+    total, ultima_alteracao = db.execute(
+        select(func.count(Demanda.id), func.max(Demanda.atualizado_em)).where(or_(*relacionadas))
+    ).one()
+    # usuarios não tem coluna de alteração (e last_login muda a cada login): entram os nomes exibidos.
+    envolvidos = select(Demanda.solicitante_id).where(or_(*relacionadas)).union(
+        select(Demanda.responsavel_id).where(or_(*relacionadas))
+    )
+    usuarios = tuple(db.execute(select(User.id, User.nome).where(User.id.in_(envolvidos)).order_by(User.id)).all())
+    return (date.today(), total, ultima_alteracao, usuarios)
+
+
 def _validar_parent_demanda(
     db: Session,
     parent_demanda_id: Optional[int],
@@ -145,7 +213,73 @@ def _validar_parent_demanda(
     return parent_demanda
 
 
-def _serializar_demanda_list_item(item: Demanda) -> DemandaListItem:
+def _codificar_cursor(item: Demanda, relevancia: Optional[float] = None) -> str:
+    dados: dict = {'c': item.criado_em.isoformat(), 'i': item.id}
+    if relevancia is not None:
+        dados['r'] = relevancia
+    payload = json.dumps(dados, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor: str) -> tuple[datetime, int, Optional[float]]:
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        relevancia = payload.get('r')
+        return (
+            datetime.fromisoformat(payload['c']),
+            int(payload['i']),
+            float(relevancia) if relevancia is not None else None,
+        )
+    except (ValueError, TypeError, KeyError, AttributeError) as exc:
+        raise HTTPException(status_code=400, detail='Cursor de paginacao invalido.') from exc
+
+
+def _aplicar_busca(query, busca: str, dialeto: str):
+    """Filtra pela busca textual; retorna a query e a expressão de relevância (None fora do PostgreSQL).
+
+    No PostgreSQL usa o tsvector gerado (português, sem acentos) para título e descrição e os
+    índices trigram para trechos de código/título; códigos que começam pelo termo vêm primeiro.
+    Nos demais dialetos (SQLite nos testes) mantém o ILIKE nas três colunas, sem ranking.
+    """
+    padrao = f'%{escapar_like(busca)}%'
+    if dialeto != 'postgresql':
+        return query.where(
+            or_(
+                Demanda.titulo.ilike(padrao, escape='\\'),
+                Demanda.codigo.ilike(padrao, escape='\\'),
+                Demanda.descricao.ilike(padrao, escape='\\'),
+            )
+        ), None
+
+    vetor = vetor_busca('demandas')
+    consulta = consulta_busca(busca)
+    relevancia = (
+        func.ts_rank_cd(vetor, consulta)
+        + case((Demanda.codigo.ilike(f'{escapar_like(busca)}%', escape='\\'), literal(1.0, Float)), else_=literal(0.0, Float))
+    ).label('relevancia')
+    query = query.where(
+        or_(
+            vetor.op('@@')(consulta),
+            Demanda.codigo.ilike(padrao, escape='\\'),
+            Demanda.titulo.ilike(padrao, escape='\\'),
+        )
+    )
+    return query, relevancia
+
+
+def _total_subdemandas_subquery():
+    subdemanda = aliased(Demanda)
+    return (
+        select(func.count(subdemanda.id))
+        .where(subdemanda.parent_demanda_id == Demanda.id)
+        .correlate(Demanda)
+        .scalar_subquery()
+        .label('total_subdemandas')
+    )
+
+
+def _serializar_demanda_list_item(item: Demanda, total_subdemandas: int = 0) -> DemandaListItem:
     hoje = date.today()
     atraso = None
     if item.prazo and item.prazo < hoje and item.status not in [DemandaStatus.concluida, DemandaStatus.cancelada]:
@@ -162,7 +296,7 @@ def _serializar_demanda_list_item(item: Demanda) -> DemandaListItem:
         status=item.status,
         prazo=item.prazo,
         atraso=atraso,
-        total_subdemandas=len(item.subdemandas) if hasattr(item, 'subdemandas') and item.subdemandas is not None else 0,
+        total_subdemandas=total_subdemandas or 0,
     )
 
 
@@ -171,6 +305,7 @@ def _serializar_demanda_read(item: Demanda) -> DemandaRead:
     res.solicitante_nome = item.solicitante.nome if item.solicitante else None
     res.responsavel_nome = item.responsavel.nome if item.responsavel else None
     res.parent_titulo = item.parent_demanda.titulo if item.parent_demanda else None
+    # Subdemandas não podem ter filhas (ver _validar_parent_demanda), então o total é sempre 0.
     res.subdemandas = [
         _serializar_demanda_list_item(subdemanda)
         for subdemanda in sorted(item.subdemandas, key=lambda sub: sub.criado_em, reverse=True)
@@ -178,8 +313,8 @@ def _serializar_demanda_read(item: Demanda) -> DemandaRead:
     return res
 
 
-@router.get('', response_model=List[DemandaListItem])
-def listar_demandas(
+@router.get('', response_model=Union[DemandaListPage, List[DemandaListItem]])
+async def listar_demandas(
     status: Optional[DemandaStatus] = Query(None),
     prioridade: Optional[DemandaPrioridade] = Query(None),
     responsavel_id: Optional[int] = Query(None),
@@ -189,13 +324,15 @@ def listar_demandas(
     atrasadas: Optional[bool] = Query(None),
     busca: Optional[str] = Query(None),
     incluir_subdemandas: bool = Query(False),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> List[DemandaListItem]:
-    query = select(Demanda).options(
+    limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO_PAGINA),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
+) -> Union[DemandaListPage, List[DemandaListItem]]:
+    # Total de subdemandas vem de um COUNT correlacionado, sem hidratar a coleção.
+    query = select(Demanda, _total_subdemandas_subquery()).options(
         selectinload(Demanda.solicitante),
         selectinload(Demanda.responsavel),
-        selectinload(Demanda.subdemandas),
     )
 
     # Filtro por RBAC
@@ -226,29 +363,56 @@ def listar_demandas(
         hoje = date.today()
         query = query.where(
             Demanda.prazo < hoje,
-            Demanda.status.notin_([DemandaStatus.concluida, DemandaStatus.cancelada])
+            _filtro_demanda_aberta()
         )
 
+    relevancia = None
     if busca:
-        query = query.where(
-            or_(
-                Demanda.titulo.ilike(f"%{busca}%"),
-                Demanda.codigo.ilike(f"%{busca}%"),
-                Demanda.descricao.ilike(f"%{busca}%")
-            )
-        )
+        query, relevancia = _aplicar_busca(query, busca, db.get_bind().dialect.name)
 
-    query = query.order_by(desc(Demanda.criado_em))
-    
-    db_items = db.scalars(query).all()
-    return [_serializar_demanda_list_item(item) for item in db_items]
+    if relevancia is not None:
+        query = query.add_columns(relevancia).order_by(desc(relevancia), desc(Demanda.criado_em), desc(Demanda.id))
+    else:
+        query = query.order_by(desc(Demanda.criado_em), desc(Demanda.id))
+
+    # Sem limit/cursor mantém a listagem completa usada pelas telas atuais.
+    if limit is None and cursor is None:
+        rows = (await db.execute(query)).all()
+        return [_serializar_demanda_list_item(row[0], row[1]) for row in rows]
+
+    # Paginação por cursor (keyset) em (criado_em, id), coberta por ix_demandas_criado_em_id;
+    # com busca ranqueada a relevância entra na frente da chave.
+    tamanho_pagina = limit or LIMITE_PADRAO_PAGINA
+    if cursor:
+        cursor_criado_em, cursor_id, cursor_relevancia = _decodificar_cursor(cursor)
+        if relevancia is not None:
+            if cursor_relevancia is None:
+                raise HTTPException(status_code=400, detail='Cursor de paginacao invalido.')
+            query = query.where(
+                tuple_(relevancia, Demanda.criado_em, Demanda.id)
+                < tuple_(cursor_relevancia, cursor_criado_em, cursor_id)
+            )
+        else:
+            query = query.where(tuple_(Demanda.criado_em, Demanda.id) < tuple_(cursor_criado_em, cursor_id))
+
+    rows = (await db.execute(query.limit(tamanho_pagina + 1))).all()
+    tem_proxima = len(rows) > tamanho_pagina
+    rows = rows[:tamanho_pagina]
+    next_cursor = None
+    if tem_proxima:
+        ultima = rows[-1]
+        next_cursor = _codificar_cursor(ultima[0], ultima[2] if relevancia is not None else None)
+    return DemandaListPage(
+        itens=[_serializar_demanda_list_item(row[0], row[1]) for row in rows],
+        next_cursor=next_cursor,
+    )
 
 
 @router.post('', response_model=DemandaRead, status_code=status.HTTP_201_CREATED)
 def criar_demanda(
     body: DemandaCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaRead:
     # Apenas admin, gestor ou solicitante podem criar
     if current_user.role not in (RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.SOLICITANTE):
@@ -276,6 +440,7 @@ def criar_demanda(
     _registrar_evento(db, demanda.id, "criacao", current_user.id)
     
     db.commit()
+    dashboard_cache.invalidate()
     demanda = _buscar_demanda_com_relacoes(db, demanda.id)
     if not demanda:
         raise HTTPException(status_code=404, detail='Demanda nÃ£o encontrada.')
@@ -285,16 +450,22 @@ def criar_demanda(
 @router.get('/{demanda_id}', response_model=DemandaRead)
 def obter_demanda(
     demanda_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaRead:
-    demanda = _buscar_demanda_com_relacoes(db, demanda_id)
+    demanda = db.get(Demanda, demanda_id)
     if not demanda:
         raise HTTPException(status_code=404, detail='Demanda não encontrada.')
     
     _verificar_acesso(demanda, current_user)
-    
-    return _serializar_demanda_read(demanda)
+
+    nao_modificado = responder_com_etag(request, response, *_versao_detalhe_demanda(db, demanda))
+    if nao_modificado:
+        return nao_modificado
+
+    return _serializar_demanda_read(_buscar_demanda_com_relacoes(db, demanda_id))
 
 
 @router.put('/{demanda_id}', response_model=DemandaRead)
@@ -302,7 +473,7 @@ def atualizar_demanda(
     demanda_id: int,
     body: DemandaUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaRead:
     demanda = _buscar_demanda_com_relacoes(db, demanda_id)
     if not demanda:
@@ -338,6 +509,7 @@ def atualizar_demanda(
             setattr(demanda, campo, valor_novo)
             
     db.commit()
+    dashboard_cache.invalidate()
     demanda = _buscar_demanda_com_relacoes(db, demanda.id)
     if not demanda:
         raise HTTPException(status_code=404, detail='Demanda nÃ£o encontrada.')
@@ -349,7 +521,7 @@ def alterar_status(
     demanda_id: int,
     body: DemandaStatusUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaRead:
     demanda = db.get(Demanda, demanda_id)
     if not demanda:
@@ -383,6 +555,7 @@ def alterar_status(
     )
     
     db.commit()
+    dashboard_cache.invalidate()
     db.refresh(demanda)
     
     res = DemandaRead.model_validate(demanda)
@@ -395,7 +568,7 @@ def alterar_status(
 def excluir_demanda(
     demanda_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ):
     if current_user.role not in (RoleEnum.ADMIN, RoleEnum.GESTOR):
         raise HTTPException(status_code=403, detail='Permissão insuficiente.')
@@ -406,13 +579,14 @@ def excluir_demanda(
     
     db.delete(demanda)
     db.commit()
+    dashboard_cache.invalidate()
 
 
 @router.get('/{demanda_id}/comentarios', response_model=List[DemandaComentarioRead])
 def listar_comentarios(
     demanda_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> List[DemandaComentarioRead]:
     demanda = db.get(Demanda, demanda_id)
     if not demanda:
@@ -439,7 +613,7 @@ def criar_comentario(
     demanda_id: int,
     body: DemandaComentarioCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaComentarioRead:
     demanda = db.get(Demanda, demanda_id)
     if not demanda:
@@ -466,8 +640,8 @@ def criar_comentario(
 @router.get('/{demanda_id}/eventos', response_model=List[DemandaEventoRead])
 def listar_eventos(
     demanda_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> List[DemandaEventoRead]:
     demanda = db.get(Demanda, demanda_id)
     if not demanda:
@@ -489,33 +663,31 @@ def listar_eventos(
     return res
 
 
-@router.post('/{demanda_id}/anexos', response_model=DemandaAnexoRead)
-async def upload_anexo(
+@router.post('/{demanda_id}/anexos', response_model=DemandaAnexoRead, dependencies=[Depends(exigir_storage_pronto)])
+def upload_anexo(
     demanda_id: int,
     file: UploadFile = File(...),
     observacoes: Optional[str] = Form(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaAnexoRead:
     demanda = db.get(Demanda, demanda_id)
     if not demanda:
         raise HTTPException(status_code=404, detail='Demanda não encontrada.')
     _verificar_acesso(demanda, current_user)
     
-    # Upload para S3
-    import io
-    content = await file.read()
-
     try:
-        validate_upload(file.filename or '', len(content), file.content_type)
+        validate_upload_extension(file.filename or '')
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
     key = f"demandas/{demanda_id}/{datetime.now().timestamp()}_{file.filename}"
 
+    # Upload para S3 em partes; o tamanho máximo é conferido durante o envio
     try:
-        file_obj = io.BytesIO(content)
-        upload_fileobj(file_obj, key, file.content_type)
+        enviado = upload_stream(file.file, key, file.content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro no upload: {str(e)}")
         
@@ -524,7 +696,8 @@ async def upload_anexo(
         usuario_id=current_user.id,
         nome_arquivo=file.filename,
         content_type=file.content_type,
-        tamanho=len(content),
+        tamanho=enviado.tamanho,
+        checksum_sha256=enviado.sha256,
         storage_key=key,
         observacoes=observacoes
     )
@@ -540,11 +713,94 @@ async def upload_anexo(
     return item
 
 
+@router.post(
+    '/{demanda_id}/anexos/presign',
+    response_model=UploadPreAssinadoOut,
+    dependencies=[Depends(exigir_storage_pronto)],
+)
+def solicitar_upload_anexo(
+    demanda_id: int,
+    body: DemandaAnexoUploadSolicitacao,
+    db: Session = Depends(get_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
+) -> UploadPreAssinadoOut:
+    demanda = db.get(Demanda, demanda_id)
+    if not demanda:
+        raise HTTPException(status_code=404, detail='Demanda não encontrada.')
+    _verificar_acesso(demanda, current_user)
+
+    try:
+        validate_upload(body.nome_arquivo, body.tamanho, body.content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    key = f"demandas/{demanda_id}/{datetime.now().timestamp()}_{body.nome_arquivo}"
+    try:
+        post = gerar_upload_pre_assinado(key, body.content_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao preparar upload: {str(e)}")
+
+    return UploadPreAssinadoOut(
+        url=post['url'],
+        fields=post['fields'],
+        storage_key=key,
+        expira_em_segundos=settings.S3_PRESIGN_EXPIRES_SECONDS,
+    )
+
+
+@router.post('/{demanda_id}/anexos/finalizar', response_model=DemandaAnexoRead)
+def finalizar_upload_anexo(
+    demanda_id: int,
+    body: DemandaAnexoUploadFinalizacao,
+    db: Session = Depends(get_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
+) -> DemandaAnexoRead:
+    demanda = db.get(Demanda, demanda_id)
+    if not demanda:
+        raise HTTPException(status_code=404, detail='Demanda não encontrada.')
+    _verificar_acesso(demanda, current_user)
+
+    if not body.storage_key.startswith(f'demandas/{demanda_id}/'):
+        raise HTTPException(status_code=400, detail='Arquivo não pertence a esta demanda.')
+    if db.scalar(select(DemandaAnexo.id).where(DemandaAnexo.storage_key == body.storage_key)):
+        raise HTTPException(status_code=409, detail='Upload já finalizado.')
+
+    objeto = consultar_upload_direto(body.storage_key)
+
+    # A extensão que vale é a do objeto gravado; o nome informado só é usado no download.
+    try:
+        validate_upload(Path(body.storage_key).name, objeto.tamanho, objeto.content_type)
+        validate_upload_extension(body.nome_arquivo)
+    except ValueError as e:
+        remover_objeto(body.storage_key)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    anexo = DemandaAnexo(
+        demanda_id=demanda_id,
+        usuario_id=current_user.id,
+        nome_arquivo=body.nome_arquivo,
+        content_type=objeto.content_type,
+        tamanho=objeto.tamanho,
+        storage_key=body.storage_key,
+        observacoes=body.observacoes,
+    )
+    db.add(anexo)
+
+    _registrar_evento(db, demanda_id, "upload_anexo", current_user.id, valor_novo=body.nome_arquivo)
+
+    db.commit()
+    db.refresh(anexo)
+
+    item = DemandaAnexoRead.model_validate(anexo)
+    item.usuario_nome = current_user.nome
+    return item
+
+
 @router.get('/{demanda_id}/anexos', response_model=List[DemandaAnexoRead])
 def listar_anexos(
     demanda_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> List[DemandaAnexoRead]:
     demanda = db.get(Demanda, demanda_id)
     if not demanda:
@@ -571,8 +827,10 @@ def listar_anexos(
 def baixar_anexo(
     demanda_id: int,
     anexo_id: int,
+    range_header: Optional[str] = Header(None, alias='Range'),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> Response:
     demanda = db.get(Demanda, demanda_id)
     if not demanda:
@@ -582,149 +840,207 @@ def baixar_anexo(
     anexo = _buscar_anexo(db, demanda_id, anexo_id)
     s3_uri = f's3://{settings.S3_BUCKET}/{anexo.storage_key}'
 
-    try:
-        conteudo, content_type = baixar_arquivo_s3(s3_uri)
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f'Erro ao baixar anexo: {exc}') from exc
-
     nome_arquivo = anexo.nome_arquivo or f'anexo-{anexo.id}'
     nome_codificado = quote(nome_arquivo)
     headers = {'Content-Disposition': f"attachment; filename*=UTF-8''{nome_codificado}"}
-    return Response(content=conteudo, media_type=content_type or 'application/octet-stream', headers=headers)
+    try:
+        return resposta_streaming_s3(s3_uri, range_header, if_none_match, headers)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f'Erro ao baixar anexo: {exc}') from exc
 
 
-@router.get('/dashboard/resumo', response_model=GestaoDashboardOut)
-def obter_dashboard_resumo(
+@router.get('/{demanda_id}/anexos/{anexo_id}/download-url')
+def redirecionar_download_anexo(
+    demanda_id: int,
+    anexo_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> GestaoDashboardOut:
-    # Lógica de dashboard conforme item 8
-    
-    query_base = select(Demanda)
-    if current_user.role == RoleEnum.RESPONSAVEL:
-        query_base = query_base.where(Demanda.responsavel_id == current_user.id)
-    elif current_user.role == RoleEnum.SOLICITANTE:
-        query_base = query_base.where(Demanda.solicitante_id == current_user.id)
-        
-    total_abertas = db.scalar(
-        _aplicar_filtro_usuario(select(func.count(Demanda.id)), current_user)
-        .where(
-            Demanda.parent_demanda_id.is_(None),
-            Demanda.status.notin_([DemandaStatus.concluida, DemandaStatus.cancelada]),
-        )
-    ) or 0
-    
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
+) -> RedirectResponse:
+    demanda = db.get(Demanda, demanda_id)
+    if not demanda:
+        raise HTTPException(status_code=404, detail='Demanda não encontrada.')
+    _verificar_acesso(demanda, current_user)
+
+    anexo = _buscar_anexo(db, demanda_id, anexo_id)
+    return redirecionar_download(
+        f's3://{settings.S3_BUCKET}/{anexo.storage_key}', nome_arquivo=anexo.nome_arquivo or f'anexo-{anexo.id}'
+    )
+
+
+def _colunas_metricas_dashboard(db: AsyncSession, hoje: date) -> list:
+    aberta = Demanda.status.notin_(STATUS_FINALIZADOS)
+    concluida = Demanda.status == DemandaStatus.concluida
+    if db.get_bind().dialect.name == 'sqlite':
+        dias_conclusao = func.julianday(Demanda.data_conclusao) - func.julianday(Demanda.data_abertura)
+    else:
+        dias_conclusao = Demanda.data_conclusao - Demanda.data_abertura
+
+    return [
+        func.count(Demanda.id).label('total'),
+        func.sum(case((aberta, 1), else_=0)).label('abertas'),
+        func.sum(case((and_(aberta, Demanda.prazo < hoje), 1), else_=0)).label('atrasadas'),
+        func.sum(
+            case((and_(concluida, Demanda.data_conclusao >= hoje.replace(day=1)), 1), else_=0)
+        ).label('concluidas_mes'),
+        func.sum(case((concluida, 1), else_=0)).label('concluidas'),
+        func.sum(
+            case((and_(concluida, Demanda.data_conclusao <= Demanda.prazo), 1), else_=0)
+        ).label('concluidas_no_prazo'),
+        func.sum(case((concluida, dias_conclusao), else_=None)).label('soma_dias_conclusao'),
+        func.count(case((concluida, dias_conclusao), else_=None)).label('qtd_dias_conclusao'),
+    ]
+
+
+async def _consultar_metricas_dashboard(db: AsyncSession, current_user: UsuarioAutenticado) -> dict:
+    """Agrega todas as métricas do dashboard em uma única consulta.
+
+    No PostgreSQL usa GROUPING SETS ((), status, prioridade, responsável); nos demais
+    dialetos (SQLite nos testes) agrupa pela combinação das três chaves e consolida em Python.
+    """
     hoje = date.today()
-    total_atrasadas = db.scalar(
-        _aplicar_filtro_usuario(select(func.count(Demanda.id)), current_user)
-        .where(
-            Demanda.parent_demanda_id.is_(None),
-            Demanda.prazo < hoje,
-            Demanda.status.notin_([DemandaStatus.concluida, DemandaStatus.cancelada])
-        )
-    ) or 0
-    
-    primeiro_dia_mes = hoje.replace(day=1)
-    total_concluidas_mes = db.scalar(
-        _aplicar_filtro_usuario(select(func.count(Demanda.id)), current_user)
-        .where(
-            Demanda.parent_demanda_id.is_(None),
-            Demanda.status == DemandaStatus.concluida,
-            Demanda.data_conclusao >= primeiro_dia_mes
+    usa_grouping_sets = db.get_bind().dialect.name == 'postgresql'
+    query = (
+        _aplicar_filtro_usuario(
+            select(
+                Demanda.status,
+                Demanda.prioridade,
+                User.nome,
+                func.grouping(Demanda.status, Demanda.prioridade, User.nome).label('conjunto')
+                if usa_grouping_sets
+                else literal(0).label('conjunto'),
+                *_colunas_metricas_dashboard(db, hoje),
+            ),
+            current_user,
         )
-    ) or 0
-    
-    # Totais por status
-    status_rows = db.execute(
-        _aplicar_filtro_usuario(select(Demanda.status, func.count(Demanda.id)), current_user)
+        .outerjoin(User, Demanda.responsavel_id == User.id)
         .where(Demanda.parent_demanda_id.is_(None))
-        .group_by(Demanda.status)
-    ).all()
-    total_geral = sum(r[1] for r in status_rows) or 1
+    )
+    if usa_grouping_sets:
+        query = query.group_by(
+            func.grouping_sets(tuple_(), Demanda.status, Demanda.prioridade, User.nome)
+        )
+    else:
+        query = query.group_by(Demanda.status, Demanda.prioridade, User.nome)
+
+    campos_totais = (
+        'total', 'abertas', 'atrasadas', 'concluidas_mes', 'concluidas',
+        'concluidas_no_prazo', 'soma_dias_conclusao', 'qtd_dias_conclusao',
+    )
+    totais: dict[str, float] = dict.fromkeys(campos_totais, 0)
+    por_status: dict[DemandaStatus, int] = {}
+    por_prioridade: dict[DemandaPrioridade, int] = {}
+    por_responsavel: dict[str, int] = {}
+
+    for row in (await db.execute(query)).all():
+        # Bits de GROUPING(status, prioridade, nome): 0b011 = só status, 0b101 = só prioridade,
+        # 0b110 = só responsável, 0b111 = total geral. No fallback toda linha conta para tudo.
+        conjunto = row.conjunto
+        if not usa_grouping_sets or conjunto == 0b111:
+            for campo in campos_totais:
+                totais[campo] += getattr(row, campo) or 0
+        if not usa_grouping_sets or conjunto == 0b011:
+            por_status[row.status] = por_status.get(row.status, 0) + row.total
+        if not usa_grouping_sets or conjunto == 0b101:
+            por_prioridade[row.prioridade] = por_prioridade.get(row.prioridade, 0) + row.total
+        if (not usa_grouping_sets or conjunto == 0b110) and row.nome is not None:
+            por_responsavel[row.nome] = por_responsavel.get(row.nome, 0) + row.total
+
+    totais['por_status'] = por_status
+    totais['por_prioridade'] = por_prioridade
+    totais['por_responsavel'] = por_responsavel
+    return totais
+
+
+@router.get('/dashboard/resumo', response_model=GestaoDashboardOut)
+async def obter_dashboard_resumo(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
+) -> GestaoDashboardOut:
+    # Lógica de dashboard conforme item 8
+    chave_cache = ('resumo', date.today(), *_escopo_usuario(current_user))
+    snapshot = dashboard_cache.get(chave_cache)
+    if snapshot is not None:
+        return snapshot
+
+    metricas = await _consultar_metricas_dashboard(db, current_user)
+
+    total_geral = metricas['total'] or 1
     total_por_status = [
-        ItemContagemPct(label=r[0].value, valor=r[1], pct=round(r[1]*100/total_geral, 1))
-        for r in status_rows
+        ItemContagemPct(label=status_item.value, valor=qtd, pct=round(qtd * 100 / total_geral, 1))
+        for status_item in DemandaStatus
+        if (qtd := metricas['por_status'].get(status_item))
     ]
-    
-    # Totais por prioridade
-    prio_rows = db.execute(
-        _aplicar_filtro_usuario(select(Demanda.prioridade, func.count(Demanda.id)), current_user)
-        .where(Demanda.parent_demanda_id.is_(None))
-        .group_by(Demanda.prioridade)
-    ).all()
     total_por_prioridade = [
-        ItemContagemPct(label=r[0].value, valor=r[1], pct=round(r[1]*100/total_geral, 1))
-        for r in prio_rows
+        ItemContagemPct(label=prioridade.value, valor=qtd, pct=round(qtd * 100 / total_geral, 1))
+        for prioridade in DemandaPrioridade
+        if (qtd := metricas['por_prioridade'].get(prioridade))
     ]
-    
-    # Totais por responsável
-    resp_rows = db.execute(
-        _aplicar_filtro_usuario(select(User.nome, func.count(Demanda.id)), current_user)
-        .join(User, Demanda.responsavel_id == User.id)
-        .where(Demanda.parent_demanda_id.is_(None))
-        .group_by(User.nome)
-    ).all()
-    total_por_responsavel = [ItemContagem(label=r[0], valor=r[1]) for r in resp_rows]
-    
-    # Tempo médio de conclusão
-    tempo_medio = db.scalar(
-        _aplicar_filtro_usuario(select(func.avg(Demanda.data_conclusao - Demanda.data_abertura)), current_user)
-        .where(Demanda.parent_demanda_id.is_(None), Demanda.status == DemandaStatus.concluida)
-    )
-    
+    total_por_responsavel = [
+        ItemContagem(label=nome, valor=qtd) for nome, qtd in metricas['por_responsavel'].items()
+    ]
+
+    tempo_medio = None
+    if metricas['qtd_dias_conclusao']:
+        tempo_medio = metricas['soma_dias_conclusao'] / metricas['qtd_dias_conclusao']
+
     # SLA cumprido %
-    total_concluidas = db.scalar(
-        _aplicar_filtro_usuario(select(func.count(Demanda.id)), current_user)
-        .where(Demanda.parent_demanda_id.is_(None), Demanda.status == DemandaStatus.concluida)
-    ) or 0
-    if total_concluidas > 0:
-        concluidas_no_prazo = db.scalar(
-            _aplicar_filtro_usuario(select(func.count(Demanda.id)), current_user)
-            .where(
-                Demanda.parent_demanda_id.is_(None),
-                Demanda.status == DemandaStatus.concluida,
-                Demanda.data_conclusao <= Demanda.prazo
-            )
-        ) or 0
-        sla_percent = round(concluidas_no_prazo * 100 / total_concluidas, 1)
+    if metricas['concluidas'] > 0:
+        sla_percent = round(metricas['concluidas_no_prazo'] * 100 / metricas['concluidas'], 1)
     else:
         sla_percent = 100.0
-        
-    return GestaoDashboardOut(
-        total_abertas=total_abertas,
-        total_atrasadas=total_atrasadas,
-        total_concluidas_mes=total_concluidas_mes,
+
+    resumo = GestaoDashboardOut(
+        total_abertas=metricas['abertas'],
+        total_atrasadas=metricas['atrasadas'],
+        total_concluidas_mes=metricas['concluidas_mes'],
         total_por_status=total_por_status,
         total_por_prioridade=total_por_prioridade,
         total_por_responsavel=total_por_responsavel,
         tempo_medio_conclusao=_normalizar_media_dias(tempo_medio),
         sla_cumprido_percentual=sla_percent
     )
+    dashboard_cache.set(chave_cache, resumo)
+    return resumo
+
+
+@router.get('/dashboard/cache', response_model=DashboardCacheStatsOut)
+def obter_estatisticas_cache_dashboard(
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
+) -> DashboardCacheStatsOut:
+    return DashboardCacheStatsOut(**dashboard_cache.stats())
 
 
 @router.get('/dashboard/home', response_model=HomeDataOut)
 @router.get('/home', response_model=HomeDataOut)
-def obter_home(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def obter_home(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> HomeDataOut:
+    # "Minhas demandas" depende do usuário, então o snapshot da home inclui o id além do escopo.
+    chave_cache = ('home', date.today(), *_escopo_usuario(current_user), current_user.id)
+    snapshot = dashboard_cache.get(chave_cache)
+    if snapshot is not None:
+        return snapshot
+
     # 1. Obter resumo (Dashboard)
-    resumo = obter_dashboard_resumo(db, current_user)
+    resumo = await obter_dashboard_resumo(db, current_user)
     
     _opts = [selectinload(Demanda.solicitante), selectinload(Demanda.responsavel)]
 
     # 2. Demandas Atrasadas (Top 5)
     hoje = date.today()
-    atrasadas_db = db.scalars(
-        select(Demanda)
-        .options(*_opts)
-        .where(
-            Demanda.parent_demanda_id.is_(None),
-            Demanda.prazo < hoje,
-            Demanda.status.notin_([DemandaStatus.concluida, DemandaStatus.cancelada])
+    atrasadas_db = (
+        await db.scalars(
+            select(Demanda)
+            .options(*_opts)
+            .where(
+                Demanda.parent_demanda_id.is_(None),
+                Demanda.prazo < hoje,
+                _filtro_demanda_aberta()
+            )
+            .order_by(Demanda.prazo.asc())
+            .limit(5)
         )
-        .order_by(Demanda.prazo.asc())
-        .limit(5)
     ).all()
 
     atrasadas = []
@@ -736,16 +1052,18 @@ def obter_home(
         atrasadas.append(item)
 
     # 3. Minhas Demandas (Top 5 em andamento)
-    minhas_db = db.scalars(
-        select(Demanda)
-        .options(*_opts)
-        .where(
-            Demanda.parent_demanda_id.is_(None),
-            Demanda.responsavel_id == current_user.id,
-            Demanda.status.notin_([DemandaStatus.concluida, DemandaStatus.cancelada])
+    minhas_db = (
+        await db.scalars(
+            select(Demanda)
+            .options(*_opts)
+            .where(
+                Demanda.parent_demanda_id.is_(None),
+                Demanda.responsavel_id == current_user.id,
+                _filtro_demanda_aberta()
+            )
+            .order_by(Demanda.prioridade.desc(), Demanda.prazo.asc())
+            .limit(5)
         )
-        .order_by(Demanda.prioridade.desc(), Demanda.prazo.asc())
-        .limit(5)
     ).all()
 
     minhas_demandas = []
@@ -758,12 +1076,14 @@ def obter_home(
         minhas_demandas.append(item)
 
     # 4. Demandas Recentes (Top 5 criadas)
-    recentes_db = db.scalars(
-        select(Demanda)
-        .options(*_opts)
-        .where(Demanda.parent_demanda_id.is_(None))
-        .order_by(desc(Demanda.criado_em))
-        .limit(5)
+    recentes_db = (
+        await db.scalars(
+            select(Demanda)
+            .options(*_opts)
+            .where(Demanda.parent_demanda_id.is_(None))
+            .order_by(desc(Demanda.criado_em))
+            .limit(5)
+        )
     ).all()
 
     recentes = []
@@ -773,9 +1093,11 @@ def obter_home(
         item.responsavel_nome = d.responsavel.nome if d.responsavel else None
         recentes.append(item)
         
-    return HomeDataOut(
+    home = HomeDataOut(
         resumo=resumo,
         atrasadas=atrasadas,
         minhas_demandas=minhas_demandas,
         recentes=recentes
     )
+    dashboard_cache.set(chave_cache, home)
+    return home
@@ -3,13 +3,16 @@ from datetime import UTC, date, datetime
 from pathlib import Path
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Request, Response, UploadFile, status
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import RedirectResponse
 from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session, joinedload
 
+from app.core.config import get_settings
 from app.core.rbac import require_roles
-from app.core.security import get_current_user, hash_password, verify_password
+from app.core.security import UsuarioAutenticado, get_current_principal, hash_password, verify_password
+from app.db.busca import consulta_busca, destacar_trecho, escapar_like, sanitizar_trecho, trecho_busca, vetor_busca
 from app.db.session import get_db
 from app.models.auditlog import AcaoAuditEnum, AuditLog
 from app.models.fsc import (
@@ -36,6 +39,7 @@ from app.models.fsc import (
     StatusMonitoramentoCriterioEnum,
     StatusNotificacaoEnum,
 )
+from app.models.job import Job
 from app.models.user import RoleEnum, User
 from app.schemas.fsc import (
     AnaliseNcCreate,
@@ -79,6 +83,10 @@ from app.schemas.fsc import (
     EvidenceTypeUpdate,
     EvidenciaCreate,
     EvidenciaOut,
+    EvidenciaUploadFinalizacao,
+    EvidenciaUploadSolicitacao,
+    HierarquiaCacheStatsOut,
+    HierarquiaProgramaOut,
     IndicadorCreate,
     IndicadorOut,
     IndicadorUpdate,
@@ -91,9 +99,29 @@ from app.schemas.fsc import (
     PrincipioUpdate,
     ResponsavelCreate,
 )
+from app.schemas.job import JobOut
+from app.schemas.storage import UploadPreAssinadoOut
 from app.schemas.user import UserOut
 from app.services.audit_logger import registrar_log
-from app.services.s3_storage import baixar_arquivo_s3, upload_fileobj, validate_upload
+from app.services.hierarquia_cache import hierarquia_cache
+from app.services.http_cache import responder_com_etag
+from app.services.job_handlers import TIPO_GERAR_AVALIACOES, TIPO_TIPOS_EVIDENCIA_PADRAO
+from app.services.jobs import enfileirar_job
+from app.services.read_routing import get_read_db
+from app.services.s3_storage import (
+    consultar_upload_direto,
+    gerar_upload_pre_assinado,
+    redirecionar_download,
+    remover_objeto,
+    resposta_streaming_s3,
+    upload_stream,
+    validate_upload,
+    validate_upload_extension,
+)
+from app.services.storage_bootstrap import exigir_storage_pronto
+from app.services.versoes_tabelas import obter_versoes
+
+settings = get_settings()
 
 router = APIRouter(prefix='/api', tags=['Certificações'])
 
@@ -255,6 +283,46 @@ def _buscar_evidencia(db: Session, evidencia_id: int) -> Evidencia:
     return evidencia
 
 
+def _chave_arquivo_evidencia(avaliacao: AvaliacaoIndicador, nome_arquivo: str) -> str:
+    suffix = Path(nome_arquivo).suffix
+    return f'auditoria_{avaliacao.auditoria_ano_id}/avaliacao_{avaliacao.id}/{uuid4().hex}{suffix}'
+
+
+def _registrar_evidencia_arquivo(
+    db: Session,
+    avaliacao: AvaliacaoIndicador,
+    tipo_evidencia_id: int | None,
+    url_or_path: str,
+    observacoes: str | None,
+    current_user: UsuarioAutenticado,
+    extras_log: dict | None = None,
+) -> Evidencia:
+    evidencia = Evidencia(
+        programa_id=avaliacao.programa_id,
+        avaliacao_id=avaliacao.id,
+        tipo_evidencia_id=tipo_evidencia_id,
+        kind=EvidenciaKindEnum.arquivo,
+        url_or_path=url_or_path,
+        observacoes=observacoes,
+        created_by=current_user.id,
+    )
+    db.add(evidencia)
+    db.flush()
+    registrar_log(
+        db,
+        entidade='evidencia',
+        entidade_id=evidencia.id,
+        acao=AcaoAuditEnum.CREATE,
+        created_by=current_user.id,
+        new_value={**_dump_model(evidencia), **(extras_log or {})},
+        programa_id=avaliacao.programa_id,
+        auditoria_ano_id=avaliacao.auditoria_ano_id,
+    )
+    db.commit()
+    db.refresh(evidencia)
+    return evidencia
+
+
 def _buscar_documento_evidencia(db: Session, documento_id: int) -> DocumentoEvidencia:
     documento = db.get(DocumentoEvidencia, documento_id)
     if not documento:
@@ -300,7 +368,13 @@ def _validar_vinculo_tipo_evidencia(
     programa_id: int,
     criterio_id: int,
     indicador_id: int,
-) -> tuple[Criterio, Indicador]:
+) -> None:
+    hierarquia = hierarquia_cache.obter(db, programa_id)
+    if hierarquia is not None:
+        indicador_cache = hierarquia.indicador(indicador_id)
+        if indicador_cache is not None and indicador_cache.criterio_id == criterio_id and hierarquia.criterio(criterio_id):
+            return
+    # Vínculo inválido (ou hierarquia fora do cache): refaz a checagem no banco para o erro certo.
     _buscar_programa(db, programa_id)
     criterio = _buscar_criterio(db, criterio_id)
     indicador = _buscar_indicador(db, indicador_id)
@@ -312,7 +386,6 @@ def _validar_vinculo_tipo_evidencia(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='O indicador informado não pertence ao critério informado.',
         )
-    return criterio, indicador
 
 
 def _validar_tipo_evidencia_compativel_com_avaliacao(
@@ -326,7 +399,10 @@ def _validar_tipo_evidencia_compativel_com_avaliacao(
             detail='Tipo de evidência inválido: ele precisa estar vinculado a programa, critério e indicador.',
         )
 
-    indicador_avaliacao = avaliacao.indicador or _buscar_indicador(db, avaliacao.indicator_id)
+    hierarquia = hierarquia_cache.obter(db, avaliacao.programa_id)
+    indicador_avaliacao = (hierarquia and hierarquia.indicador(avaliacao.indicator_id)) or _buscar_indicador(
+        db, avaliacao.indicator_id
+    )
     if tipo.programa_id != avaliacao.programa_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -506,13 +582,28 @@ def _validar_mesmo_programa(programa_a: int, programa_b: int, contexto: str) ->
         )
 
 
-def _validar_senha_sistema(senha_sistema: str | None, current_user: User) -> None:
+def _enfileirar_job(
+    db: Session,
+    tipo: str,
+    parametros: dict,
+    current_user: UsuarioAutenticado,
+    idempotency_key: str | None,
+) -> Job:
+    try:
+        job, _ = enfileirar_job(db, tipo, parametros, current_user.id, idempotency_key)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    return job
+
+
+def _validar_senha_sistema(db: Session, senha_sistema: str | None, current_user: UsuarioAutenticado) -> None:
     if not senha_sistema:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Informe a senha do sistema para confirmar esta ação.',
         )
-    if not verify_password(senha_sistema, current_user.password_hash):
+    password_hash = db.scalar(select(User.password_hash).where(User.id == current_user.id))
+    if not password_hash or not verify_password(senha_sistema, password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Senha do sistema inválida.',
@@ -523,7 +614,7 @@ def _validar_senha_sistema(senha_sistema: str | None, current_user: User) -> Non
 def obter_configuracoes_sistema(
     request: Request,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> ConfiguracaoSistemaOut:
     configuracao = _obter_ou_criar_configuracao(db)
     db.commit()
@@ -536,7 +627,7 @@ def atualizar_configuracoes_sistema(
     request: Request,
     payload: ConfiguracaoSistemaUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> ConfiguracaoSistemaOut:
     data = payload.model_dump(exclude_unset=True)
     if not data:
@@ -574,6 +665,7 @@ def atualizar_configuracoes_sistema(
 
 @router.get('/configuracoes/logo')
 def obter_logo_empresa(
+    if_none_match: str | None = Header(default=None),
     db: Session = Depends(get_db),
 ) -> Response:
     configuracao = _obter_ou_criar_configuracao(db)
@@ -586,23 +678,26 @@ def obter_logo_empresa(
         )
 
     try:
-        conteudo, content_type = baixar_arquivo_s3(configuracao.logo_url)
+        # no-cache: o navegador revalida via ETag a cada uso e recebe 304 quando a logo não mudou.
+        return resposta_streaming_s3(
+            configuracao.logo_url,
+            if_none_match=if_none_match,
+            headers={'Cache-Control': 'no-cache'},
+        )
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Não foi possível carregar a logo.') from exc
 
-    return Response(
-        content=conteudo,
-        media_type=content_type or 'application/octet-stream',
-        headers={'Cache-Control': 'no-store'},
-    )
-
 
-@router.post('/configuracoes/logo-upload', response_model=ConfiguracaoSistemaOut)
+@router.post(
+    '/configuracoes/logo-upload',
+    response_model=ConfiguracaoSistemaOut,
+    dependencies=[Depends(exigir_storage_pronto)],
+)
 def upload_logo_empresa(
     request: Request,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> ConfiguracaoSistemaOut:
     if not file.filename:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Arquivo de logo inválido.')
@@ -614,7 +709,10 @@ def upload_logo_empresa(
 
     suffix = Path(file.filename).suffix
     key = f'configuracoes/logo_empresa_{uuid4().hex}{suffix}'
-    configuracao.logo_url = upload_fileobj(file.file, key, file.content_type)
+    try:
+        configuracao.logo_url = upload_stream(file.file, key, file.content_type).uri
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     configuracao.updated_by = current_user.id
 
     registrar_log(
@@ -633,9 +731,14 @@ def upload_logo_empresa(
 
 @router.get('/programas-certificacao', response_model=list[ProgramaCertificacaoOut])
 def listar_programas_certificacao(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[ProgramaCertificacaoOut]:
+    nao_modificado = responder_com_etag(request, response, *obter_versoes(db, 'programas_certificacao'))
+    if nao_modificado:
+        return nao_modificado
     return list(db.scalars(select(ProgramaCertificacao).order_by(ProgramaCertificacao.id)).all())
 
 
@@ -643,7 +746,7 @@ def listar_programas_certificacao(
 def criar_programa_certificacao(
     payload: ProgramaCertificacaoCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
 ) -> ProgramaCertificacaoOut:
     existente_codigo = db.scalar(
         select(ProgramaCertificacao).where(func.lower(ProgramaCertificacao.codigo) == payload.codigo.lower())
@@ -678,7 +781,7 @@ def atualizar_programa_certificacao(
     programa_id: int,
     payload: ProgramaCertificacaoUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
 ) -> ProgramaCertificacaoOut:
     programa = _buscar_programa(db, programa_id)
     data = payload.model_dump(exclude_unset=True)
@@ -719,11 +822,30 @@ def atualizar_programa_certificacao(
     return programa
 
 
+@router.get('/programas-certificacao/{programa_id}/hierarquia', response_model=HierarquiaProgramaOut)
+def obter_hierarquia_programa(
+    programa_id: int,
+    db: Session = Depends(get_db),
+    _: UsuarioAutenticado = Depends(get_current_principal),
+) -> HierarquiaProgramaOut:
+    hierarquia = hierarquia_cache.obter(db, programa_id)
+    if hierarquia is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Programa de certificação não encontrado.')
+    return HierarquiaProgramaOut(programa_id=programa_id, principios=hierarquia.arvore())
+
+
+@router.get('/hierarquia/cache', response_model=HierarquiaCacheStatsOut)
+def obter_estatisticas_cache_hierarquia(
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
+) -> HierarquiaCacheStatsOut:
+    return HierarquiaCacheStatsOut(**hierarquia_cache.stats())
+
+
 @router.delete('/programas-certificacao/{programa_id}', response_model=MensagemOut)
 def remover_programa_certificacao(
     programa_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN)),
 ) -> MensagemOut:
     programa = _buscar_programa(db, programa_id)
     uso = db.scalar(
@@ -751,10 +873,15 @@ def remover_programa_certificacao(
 
 @router.get('/principios', response_model=list[PrincipioOut])
 def listar_principios(
+    request: Request,
+    response: Response,
     programa_id: int | None = Query(default=None),
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[PrincipioOut]:
+    nao_modificado = responder_com_etag(request, response, *obter_versoes(db, 'principios'))
+    if nao_modificado:
+        return nao_modificado
     query = select(Principio).order_by(Principio.id)
     if programa_id:
         query = query.where(Principio.programa_id == programa_id)
@@ -765,7 +892,7 @@ def listar_principios(
 def criar_principio(
     payload: PrincipioCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> PrincipioOut:
     _buscar_programa(db, payload.programa_id)
     principio = Principio(**payload.model_dump())
@@ -789,7 +916,7 @@ def criar_principio(
 def obter_principio(
     principio_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> PrincipioOut:
     return _buscar_principio(db, principio_id)
 
@@ -799,7 +926,7 @@ def atualizar_principio(
     principio_id: int,
     payload: PrincipioUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> PrincipioOut:
     principio = _buscar_principio(db, principio_id)
     data = payload.model_dump(exclude_unset=True)
@@ -829,7 +956,7 @@ def atualizar_principio(
 def remover_principio(
     principio_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> MensagemOut:
     principio = _buscar_principio(db, principio_id)
     old_value = _dump_model(principio)
@@ -849,11 +976,16 @@ def remover_principio(
 
 @router.get('/criterios', response_model=list[CriterioOut])
 def listar_criterios(
+    request: Request,
+    response: Response,
     programa_id: int | None = Query(default=None),
     principio_id: int | None = Query(default=None),
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[CriterioOut]:
+    nao_modificado = responder_com_etag(request, response, *obter_versoes(db, 'criterios'))
+    if nao_modificado:
+        return nao_modificado
     query = select(Criterio).order_by(Criterio.id)
     if programa_id:
         query = query.where(Criterio.programa_id == programa_id)
@@ -866,7 +998,7 @@ def listar_criterios(
 def criar_criterio(
     payload: CriterioCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> CriterioOut:
     _buscar_programa(db, payload.programa_id)
     principio = _buscar_principio(db, payload.principio_id)
@@ -892,7 +1024,7 @@ def criar_criterio(
 def obter_criterio(
     criterio_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> CriterioOut:
     return _buscar_criterio(db, criterio_id)
 
@@ -902,7 +1034,7 @@ def atualizar_criterio(
     criterio_id: int,
     payload: CriterioUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> CriterioOut:
     criterio = _buscar_criterio(db, criterio_id)
     data = payload.model_dump(exclude_unset=True)
@@ -933,7 +1065,7 @@ def atualizar_criterio(
 def remover_criterio(
     criterio_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> MensagemOut:
     criterio = _buscar_criterio(db, criterio_id)
     old_value = _dump_model(criterio)
@@ -952,12 +1084,24 @@ def remover_criterio(
 
 @router.get('/indicadores', response_model=list[IndicadorOut])
 def listar_indicadores(
+    request: Request,
+    response: Response,
     programa_id: int | None = Query(default=None),
     criterio_id: int | None = Query(default=None),
     q: str | None = Query(default=None, description='Busca por código/título/descrição'),
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[IndicadorOut]:
+    nao_modificado = responder_com_etag(request, response, *obter_versoes(db, 'indicadores'))
+    if nao_modificado:
+        return nao_modificado
+    if programa_id and not (q and q.strip()):
+        # Caso comum do front (indicadores de um programa): sai da hierarquia em memória.
+        hierarquia = hierarquia_cache.obter(db, programa_id)
+        if hierarquia is None:
+            return []
+        return [item for item in hierarquia.indicadores if not criterio_id or item.criterio_id == criterio_id]
+
     query = select(Indicador).order_by(Indicador.id)
     if programa_id:
         query = query.where(Indicador.programa_id == programa_id)
@@ -979,7 +1123,7 @@ def listar_indicadores(
 def criar_indicador(
     payload: IndicadorCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> IndicadorOut:
     _buscar_programa(db, payload.programa_id)
     criterio = _buscar_criterio(db, payload.criterio_id)
@@ -1005,7 +1149,7 @@ def criar_indicador(
 def obter_indicador(
     indicador_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> IndicadorOut:
     return _buscar_indicador(db, indicador_id)
 
@@ -1015,7 +1159,7 @@ def atualizar_indicador(
     indicador_id: int,
     payload: IndicadorUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> IndicadorOut:
     indicador = _buscar_indicador(db, indicador_id)
     data = payload.model_dump(exclude_unset=True)
@@ -1046,7 +1190,7 @@ def atualizar_indicador(
 def remover_indicador(
     indicador_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> MensagemOut:
     indicador = _buscar_indicador(db, indicador_id)
     old_value = _dump_model(indicador)
@@ -1067,8 +1211,8 @@ def remover_indicador(
 @router.get('/auditorias', response_model=list[AuditoriaOut])
 def listar_auditorias(
     programa_id: int | None = Query(default=None),
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[AuditoriaOut]:
     query = select(AuditoriaAno).order_by(AuditoriaAno.year.desc())
     if programa_id:
@@ -1080,7 +1224,7 @@ def listar_auditorias(
 def criar_auditoria(
     payload: AuditoriaCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> AuditoriaOut:
     _buscar_programa(db, payload.programa_id)
     _validar_datas_auditoria(payload.data_inicio, payload.data_fim)
@@ -1115,7 +1259,7 @@ def criar_auditoria(
 def obter_auditoria(
     auditoria_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> AuditoriaOut:
     return _buscar_auditoria(db, auditoria_id)
 
@@ -1125,12 +1269,12 @@ def atualizar_auditoria(
     auditoria_id: int,
     payload: AuditoriaUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> AuditoriaOut:
     auditoria = _buscar_auditoria(db, auditoria_id)
     data = payload.model_dump(exclude_unset=True)
     senha_sistema = data.pop('senha_sistema', None)
-    _validar_senha_sistema(senha_sistema, current_user)
+    _validar_senha_sistema(db, senha_sistema, current_user)
 
     data_inicio = data.get('data_inicio', auditoria.data_inicio)
     data_fim = data.get('data_fim', auditoria.data_fim)
@@ -1175,9 +1319,9 @@ def remover_auditoria(
     auditoria_id: int,
     payload: ConfirmacaoSenhaRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> MensagemOut:
-    _validar_senha_sistema(payload.senha_sistema, current_user)
+    _validar_senha_sistema(db, payload.senha_sistema, current_user)
     auditoria = _buscar_auditoria(db, auditoria_id)
     old_value = _dump_model(auditoria)
     db.delete(auditoria)
@@ -1195,51 +1339,20 @@ def remover_auditoria(
     return MensagemOut(mensagem='Auditoria removida com sucesso.')
 
 
-@router.post('/auditorias/{auditoria_id}/gerar-avaliacoes', response_model=MensagemOut)
+@router.post(
+    '/auditorias/{auditoria_id}/gerar-avaliacoes',
+    response_model=JobOut,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 def gerar_avaliacoes_para_auditoria(
     auditoria_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
-) -> MensagemOut:
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    idempotency_key: str | None = Header(default=None, alias='Idempotency-Key', max_length=120),
+) -> JobOut:
     auditoria = _buscar_auditoria(db, auditoria_id)
-    indicadores = list(
-        db.scalars(select(Indicador).where(Indicador.programa_id == auditoria.programa_id)).all()
-    )
-    criadas = 0
-    for indicador in indicadores:
-        existente = db.scalar(
-            select(AvaliacaoIndicador).where(
-                AvaliacaoIndicador.indicator_id == indicador.id,
-                AvaliacaoIndicador.auditoria_ano_id == auditoria.id,
-            )
-        )
-        if existente:
-            continue
-        avaliacao = AvaliacaoIndicador(
-            programa_id=auditoria.programa_id,
-            indicator_id=indicador.id,
-            auditoria_ano_id=auditoria.id,
-            status_conformidade=StatusConformidadeEnum.conforme,
-            observacoes=None,
-            assessed_at=datetime.now(UTC),
-        )
-        db.add(avaliacao)
-        db.flush()
-        registrar_log(
-            db,
-            entidade='avaliacao',
-            entidade_id=avaliacao.id,
-            acao=AcaoAuditEnum.CREATE,
-            created_by=current_user.id,
-            new_value=_dump_model(avaliacao),
-            programa_id=auditoria.programa_id,
-            auditoria_ano_id=auditoria.id,
-        )
-        criadas += 1
-    db.commit()
-    return MensagemOut(
-        mensagem=f'Avaliações geradas para Auditoria {auditoria.year}. Total de novas avaliações: {criadas}.'
-    )
+    return _enfileirar_job(db, TIPO_GERAR_AVALIACOES, {'auditoria_id': auditoria.id}, current_user, idempotency_key)
+
 
 @router.get('/avaliacoes', response_model=list[AvaliacaoOut])
 def listar_avaliacoes(
@@ -1247,8 +1360,8 @@ def listar_avaliacoes(
     auditoria_id: int | None = Query(default=None, alias='auditoria_id'),
     indicator_id: int | None = Query(default=None),
     status_conformidade: StatusConformidadeEnum | None = Query(default=None),
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[AvaliacaoOut]:
     query = select(AvaliacaoIndicador).order_by(AvaliacaoIndicador.id)
     if programa_id:
@@ -1266,7 +1379,7 @@ def listar_avaliacoes(
 def criar_avaliacao(
     payload: AvaliacaoCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> AvaliacaoOut:
     indicador = _buscar_indicador(db, payload.indicator_id)
     auditoria = _buscar_auditoria(db, payload.auditoria_ano_id)
@@ -1310,10 +1423,16 @@ def criar_avaliacao(
 @router.get('/avaliacoes/{avaliacao_id}', response_model=AvaliacaoOut)
 def obter_avaliacao(
     avaliacao_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> AvaliacaoOut:
-    return _buscar_avaliacao(db, avaliacao_id)
+    avaliacao = _buscar_avaliacao(db, avaliacao_id)
+    nao_modificado = responder_com_etag(request, response, avaliacao.updated_at)
+    if nao_modificado:
+        return nao_modificado
+    return avaliacao
 
 
 @router.put('/avaliacoes/{avaliacao_id}', response_model=AvaliacaoOut)
@@ -1321,7 +1440,7 @@ def atualizar_avaliacao(
     avaliacao_id: int,
     payload: AvaliacaoUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> AvaliacaoOut:
     avaliacao = _buscar_avaliacao(db, avaliacao_id)
     data = payload.model_dump(exclude_unset=True)
@@ -1378,7 +1497,7 @@ def patch_avaliacao(
     avaliacao_id: int,
     payload: AvaliacaoPatch,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> AvaliacaoOut:
     avaliacao = _buscar_avaliacao(db, avaliacao_id)
     data = payload.model_dump(exclude_unset=True)
@@ -1414,7 +1533,7 @@ def patch_avaliacao(
 def remover_avaliacao(
     avaliacao_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> MensagemOut:
     avaliacao = _buscar_avaliacao(db, avaliacao_id)
     old_value = _dump_model(avaliacao)
@@ -1437,20 +1556,55 @@ def remover_avaliacao(
 @router.get('/avaliacoes/{avaliacao_id}/detalhe', response_model=AvaliacaoDetalheOut)
 def detalhar_avaliacao(
     avaliacao_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> AvaliacaoDetalheOut:
+    # O detalhe junta a hierarquia do indicador, evidências, demandas e os logs da auditoria.
+    avaliacao = _buscar_avaliacao(db, avaliacao_id)
+    ultimo_log = db.scalar(
+        select(func.max(AuditLog.id)).where(
+            AuditLog.auditoria_ano_id == avaliacao.auditoria_ano_id,
+            AuditLog.programa_id == avaliacao.programa_id,
+        )
+    )
+    # Evidências só são criadas ou removidas; quantidade e maior id bastam para detectar as duas.
+    evidencias = db.execute(
+        select(func.count(Evidencia.id), func.max(Evidencia.id)).where(Evidencia.avaliacao_id == avaliacao.id)
+    ).one()
+    demandas = db.execute(
+        select(func.count(DemandaFSC.id), func.max(DemandaFSC.id), func.max(DemandaFSC.updated_at)).where(
+            DemandaFSC.avaliacao_id == avaliacao.id
+        )
+    ).one()
+    nao_modificado = responder_com_etag(
+        request,
+        response,
+        avaliacao.updated_at,
+        ultimo_log,
+        *evidencias,
+        *demandas,
+        *obter_versoes(db, 'indicadores', 'criterios', 'principios'),
+    )
+    if nao_modificado:
+        return nao_modificado
+
     avaliacao = db.scalar(
         select(AvaliacaoIndicador)
         .where(AvaliacaoIndicador.id == avaliacao_id)
         .options(
-            joinedload(AvaliacaoIndicador.indicador).joinedload(Indicador.criterio).joinedload(Criterio.principio),
             joinedload(AvaliacaoIndicador.evidencias),
             joinedload(AvaliacaoIndicador.demandas),
         )
     )
-    if not avaliacao:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Avaliação não encontrada.')
+    hierarquia = hierarquia_cache.obter(db, avaliacao.programa_id)
+    caminho = hierarquia.caminho_indicador(avaliacao.indicator_id) if hierarquia else None
+    if caminho is None:
+        # Indicador fora do programa da avaliação: lê a hierarquia direto do banco.
+        indicador = _buscar_indicador(db, avaliacao.indicator_id)
+        caminho = (indicador, indicador.criterio, indicador.criterio.principio)
+    indicador, criterio, principio = caminho
 
     logs = list(
         db.scalars(
@@ -1463,9 +1617,6 @@ def detalhar_avaliacao(
             .limit(30)
         ).all()
     )
-    indicador = avaliacao.indicador
-    criterio = indicador.criterio
-    principio = criterio.principio
     return AvaliacaoDetalheOut(
         avaliacao=avaliacao,
         indicador=indicador,
@@ -1482,7 +1633,7 @@ def listar_tipos_evidencia(
     criterio_id: int | None = Query(default=None),
     indicator_id: int | None = Query(default=None),
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[EvidenceTypeOut]:
     query = select(EvidenceType).where(
         EvidenceType.programa_id.is_not(None),
@@ -1502,7 +1653,7 @@ def listar_tipos_evidencia(
 def criar_tipo_evidencia(
     payload: EvidenceTypeCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> EvidenceTypeOut:
     _validar_vinculo_tipo_evidencia(db, payload.programa_id, payload.criterio_id, payload.indicador_id)
     existente = db.scalar(
@@ -1536,11 +1687,23 @@ def criar_tipo_evidencia(
     return tipo
 
 
+@router.post('/tipos-evidencia/gerar-padrao', response_model=JobOut, status_code=status.HTTP_202_ACCEPTED)
+def solicitar_tipos_evidencia_padrao(
+    programa_id: int | None = Query(default=None),
+    db: Session = Depends(get_db),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    idempotency_key: str | None = Header(default=None, alias='Idempotency-Key', max_length=120),
+) -> JobOut:
+    if programa_id is not None:
+        _buscar_programa(db, programa_id)
+    return _enfileirar_job(db, TIPO_TIPOS_EVIDENCIA_PADRAO, {'programa_id': programa_id}, current_user, idempotency_key)
+
+
 @router.get('/tipos-evidencia/{tipo_id}', response_model=EvidenceTypeOut)
 def obter_tipo_evidencia(
     tipo_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> EvidenceTypeOut:
     return _buscar_tipo_evidencia(db, tipo_id)
 
@@ -1550,7 +1713,7 @@ def atualizar_tipo_evidencia(
     tipo_id: int,
     payload: EvidenceTypeUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> EvidenceTypeOut:
     tipo = _buscar_tipo_evidencia(db, tipo_id)
     data = payload.model_dump(exclude_unset=True)
@@ -1604,7 +1767,7 @@ def atualizar_tipo_evidencia(
 def remover_tipo_evidencia(
     tipo_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> MensagemOut:
     tipo = _buscar_tipo_evidencia(db, tipo_id)
     old_value = _dump_model(tipo)
@@ -1627,8 +1790,8 @@ def listar_evidencias(
     programa_id: int | None = Query(default=None),
     avaliacao_id: int | None = Query(default=None),
     auditoria_id: int | None = Query(default=None),
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[EvidenciaOut]:
     if avaliacao_id is None and auditoria_id is None:
         raise HTTPException(
@@ -1649,7 +1812,7 @@ def listar_evidencias(
 def criar_evidencia(
     payload: EvidenciaCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
 ) -> EvidenciaOut:
     if payload.kind == EvidenciaKindEnum.arquivo:
         raise HTTPException(
@@ -1680,71 +1843,136 @@ def criar_evidencia(
     return evidencia
 
 
-@router.post('/evidencias/upload', response_model=EvidenciaOut, status_code=status.HTTP_201_CREATED)
+@router.post(
+    '/evidencias/upload',
+    response_model=EvidenciaOut,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(exigir_storage_pronto)],
+)
 def upload_evidencia(
     avaliacao_id: int = Form(...),
     tipo_evidencia_id: int | None = Form(default=None),
     observacoes: str | None = Form(default=None),
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
 ) -> EvidenciaOut:
     avaliacao = _buscar_avaliacao(db, avaliacao_id)
     if tipo_evidencia_id is not None:
         tipo = _buscar_tipo_evidencia(db, tipo_evidencia_id)
         _validar_tipo_evidencia_compativel_com_avaliacao(db, tipo, avaliacao)
 
-    conteudo = file.file.read()
     try:
-        validate_upload(file.filename or 'arquivo', len(conteudo), file.content_type)
+        validate_upload_extension(file.filename or 'arquivo')
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
-    suffix = Path(file.filename or 'arquivo').suffix
-    key = f'auditoria_{avaliacao.auditoria_ano_id}/avaliacao_{avaliacao.id}/{uuid4().hex}{suffix}'
-    import io
-    url_or_path = upload_fileobj(io.BytesIO(conteudo), key, file.content_type)
+    key = _chave_arquivo_evidencia(avaliacao, file.filename or 'arquivo')
+    try:
+        enviado = upload_stream(file.file, key, file.content_type)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
-    evidencia = Evidencia(
-        programa_id=avaliacao.programa_id,
-        avaliacao_id=avaliacao.id,
-        tipo_evidencia_id=tipo_evidencia_id,
-        kind=EvidenciaKindEnum.arquivo,
-        url_or_path=url_or_path,
-        observacoes=observacoes,
-        created_by=current_user.id,
+    return _registrar_evidencia_arquivo(
+        db,
+        avaliacao,
+        tipo_evidencia_id,
+        enviado.uri,
+        observacoes,
+        current_user,
+        extras_log={'tamanho': enviado.tamanho, 'sha256': enviado.sha256},
     )
-    db.add(evidencia)
-    db.flush()
-    registrar_log(
+
+
+@router.post('/evidencias/presign', response_model=UploadPreAssinadoOut, dependencies=[Depends(exigir_storage_pronto)])
+def solicitar_upload_evidencia(
+    payload: EvidenciaUploadSolicitacao,
+    db: Session = Depends(get_db),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
+) -> UploadPreAssinadoOut:
+    avaliacao = _buscar_avaliacao(db, payload.avaliacao_id)
+    if payload.tipo_evidencia_id is not None:
+        tipo = _buscar_tipo_evidencia(db, payload.tipo_evidencia_id)
+        _validar_tipo_evidencia_compativel_com_avaliacao(db, tipo, avaliacao)
+
+    try:
+        validate_upload(payload.nome_arquivo, payload.tamanho, payload.content_type)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    key = _chave_arquivo_evidencia(avaliacao, payload.nome_arquivo)
+    post = gerar_upload_pre_assinado(key, payload.content_type)
+    return UploadPreAssinadoOut(
+        url=post['url'],
+        fields=post['fields'],
+        storage_key=key,
+        expira_em_segundos=settings.S3_PRESIGN_EXPIRES_SECONDS,
+    )
+
+
+@router.post('/evidencias/finalizar', response_model=EvidenciaOut, status_code=status.HTTP_201_CREATED)
+def finalizar_upload_evidencia(
+    payload: EvidenciaUploadFinalizacao,
+    db: Session = Depends(get_db),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
+) -> EvidenciaOut:
+    avaliacao = _buscar_avaliacao(db, payload.avaliacao_id)
+    if payload.tipo_evidencia_id is not None:
+        tipo = _buscar_tipo_evidencia(db, payload.tipo_evidencia_id)
+        _validar_tipo_evidencia_compativel_com_avaliacao(db, tipo, avaliacao)
+
+    prefixo = f'auditoria_{avaliacao.auditoria_ano_id}/avaliacao_{avaliacao.id}/'
+    if not payload.storage_key.startswith(prefixo):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Arquivo não pertence a esta avaliação.')
+    url_or_path = f's3://{settings.S3_BUCKET}/{payload.storage_key}'
+    if db.scalar(select(Evidencia.id).where(Evidencia.url_or_path == url_or_path)):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Upload já finalizado.')
+
+    objeto = consultar_upload_direto(payload.storage_key)
+    try:
+        validate_upload(payload.storage_key, objeto.tamanho, objeto.content_type)
+    except ValueError as exc:
+        remover_objeto(payload.storage_key)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    return _registrar_evidencia_arquivo(
         db,
-        entidade='evidencia',
-        entidade_id=evidencia.id,
-        acao=AcaoAuditEnum.CREATE,
-        created_by=current_user.id,
-        new_value=_dump_model(evidencia),
-        programa_id=avaliacao.programa_id,
-        auditoria_ano_id=avaliacao.auditoria_ano_id,
+        avaliacao,
+        payload.tipo_evidencia_id,
+        url_or_path,
+        payload.observacoes,
+        current_user,
+        extras_log={'tamanho': objeto.tamanho, 'etag': objeto.etag},
     )
-    db.commit()
-    db.refresh(evidencia)
-    return evidencia
 
 
 @router.get('/evidencias/{evidencia_id}', response_model=EvidenciaOut)
 def obter_evidencia(
     evidencia_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> EvidenciaOut:
     return _buscar_evidencia(db, evidencia_id)
 
 
+@router.get('/evidencias/{evidencia_id}/download-url')
+def redirecionar_download_evidencia(
+    evidencia_id: int,
+    db: Session = Depends(get_db),
+    _: UsuarioAutenticado = Depends(get_current_principal),
+) -> RedirectResponse:
+    evidencia = _buscar_evidencia(db, evidencia_id)
+    # Links e textos são conteúdo do usuário: redirecionar para eles seria um open redirect.
+    if evidencia.kind != EvidenciaKindEnum.arquivo:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Evidência não possui arquivo para download.')
+    return redirecionar_download(evidencia.url_or_path, nome_arquivo=Path(evidencia.url_or_path).name)
+
+
 @router.delete('/evidencias/{evidencia_id}', response_model=MensagemOut)
 def remover_evidencia(
     evidencia_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> MensagemOut:
     evidencia = _buscar_evidencia(db, evidencia_id)
     if current_user.role == RoleEnum.RESPONSAVEL and evidencia.created_by != current_user.id:
@@ -1769,6 +1997,19 @@ def remover_evidencia(
     return MensagemOut(mensagem='Evidência removida com sucesso.')
 
 
+LIMITE_BUSCA_DOCUMENTOS = 50
+LIMITE_MAXIMO_BUSCA_DOCUMENTOS = 200
+
+
+def _documento_com_trecho(
+    documento: DocumentoEvidencia, trecho: str | None, relevancia: float | None
+) -> DocumentoEvidenciaOut:
+    saida = DocumentoEvidenciaOut.model_validate(documento)
+    saida.trecho = trecho
+    saida.relevancia = relevancia
+    return saida
+
+
 @router.get('/documentos-evidencia', response_model=list[DocumentoEvidenciaOut])
 def listar_documentos_evidencia(
     programa_id: int | None = Query(default=None),
@@ -1777,8 +2018,11 @@ def listar_documentos_evidencia(
     status_documento: StatusDocumentoEnum | None = Query(default=None),
     responsavel_id: int | None = Query(default=None),
     q: str | None = Query(default=None),
+    # Paginação dos resultados da busca (só com q).
+    limit: int = Query(default=LIMITE_BUSCA_DOCUMENTOS, ge=1, le=LIMITE_MAXIMO_BUSCA_DOCUMENTOS),
+    offset: int = Query(default=0, ge=0),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[DocumentoEvidenciaOut]:
     query = select(DocumentoEvidencia).order_by(DocumentoEvidencia.updated_at.desc(), DocumentoEvidencia.id.desc())
     if programa_id:
@@ -1798,22 +2042,56 @@ def listar_documentos_evidencia(
                 DocumentoEvidencia.created_by == current_user.id,
             )
         )
-    if q and q.strip():
-        termo = f"%{q.strip().lower()}%"
+    if not (q and q.strip()):
+        return list(db.scalars(query).all())
+
+    termo = q.strip()
+    padrao = f'%{escapar_like(termo.lower())}%'
+    if db.get_bind().dialect.name != 'postgresql':
+        # SQLite nos testes: LIKE nas duas colunas, sem ranking, e trecho montado em Python.
         query = query.where(
             or_(
-                func.lower(DocumentoEvidencia.titulo).like(termo),
-                func.lower(func.coalesce(DocumentoEvidencia.conteudo, '')).like(termo),
+                func.lower(DocumentoEvidencia.titulo).like(padrao, escape='\\'),
+                func.lower(func.coalesce(DocumentoEvidencia.conteudo, '')).like(padrao, escape='\\'),
             )
         )
-    return list(db.scalars(query).all())
+        return [
+            _documento_com_trecho(documento, destacar_trecho(documento.conteudo, termo), None)
+            for documento in db.scalars(query.limit(limit).offset(offset)).all()
+        ]
+
+    # tsvector gerado (GIN) para título e conteúdo; o trigram do título cobre trechos de palavras.
+    vetor = vetor_busca('documentos_evidencia')
+    consulta = consulta_busca(termo)
+    relevancia = func.ts_rank_cd(vetor, consulta).label('relevancia')
+    pagina = db.execute(
+        query.add_columns(relevancia)
+        .where(or_(vetor.op('@@')(consulta), DocumentoEvidencia.titulo.ilike(padrao, escape='\\')))
+        .order_by(None)
+        .order_by(relevancia.desc(), DocumentoEvidencia.updated_at.desc(), DocumentoEvidencia.id.desc())
+        .limit(limit)
+        .offset(offset)
+    ).all()
+    if not pagina:
+        return []
+    # ts_headline relê o texto de cada documento: roda só para os da página.
+    trechos = dict(
+        db.execute(
+            select(DocumentoEvidencia.id, trecho_busca(DocumentoEvidencia.conteudo, consulta)).where(
+                DocumentoEvidencia.id.in_([item.id for item, _ in pagina])
+            )
+        ).all()
+    )
+    return [
+        _documento_com_trecho(item, sanitizar_trecho(trechos.get(item.id)), float(rank)) for item, rank in pagina
+    ]
 
 
 @router.post('/documentos-evidencia', response_model=DocumentoEvidenciaOut, status_code=status.HTTP_201_CREATED)
 def criar_documento_evidencia(
     payload: DocumentoEvidenciaCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
 ) -> DocumentoEvidenciaOut:
     evidencia = _buscar_evidencia(db, payload.evidencia_id)
     avaliacao = _buscar_avaliacao(db, evidencia.avaliacao_id)
@@ -1849,7 +2127,7 @@ def criar_documento_evidencia(
 def obter_documento_evidencia(
     documento_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DocumentoEvidenciaOut:
     documento = _buscar_documento_evidencia(db, documento_id)
     if current_user.role == RoleEnum.RESPONSAVEL and documento.responsavel_id != current_user.id and documento.created_by != current_user.id:
@@ -1865,7 +2143,7 @@ def atualizar_documento_evidencia(
     documento_id: int,
     payload: DocumentoEvidenciaUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
 ) -> DocumentoEvidenciaOut:
     documento = _buscar_documento_evidencia(db, documento_id)
     if current_user.role == RoleEnum.RESPONSAVEL and documento.created_by != current_user.id and documento.responsavel_id != current_user.id:
@@ -1919,7 +2197,7 @@ def revisar_status_documento_evidencia(
     documento_id: int,
     payload: DocumentoEvidenciaStatusPatch,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> DocumentoEvidenciaOut:
     documento = _buscar_documento_evidencia(db, documento_id)
     _validar_status_documento(payload.status_documento, payload.observacoes_revisao)
@@ -1947,7 +2225,7 @@ def revisar_status_documento_evidencia(
 def remover_documento_evidencia(
     documento_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> MensagemOut:
     documento = _buscar_documento_evidencia(db, documento_id)
     old_value = _dump_model(documento)
@@ -1974,7 +2252,7 @@ def listar_monitoramentos_criterio(
     mes_referencia: date | None = Query(default=None),
     status_monitoramento: StatusMonitoramentoCriterioEnum | None = Query(default=None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[MonitoramentoCriterioOut]:
     query = select(MonitoramentoCriterio).order_by(
         MonitoramentoCriterio.mes_referencia.desc(),
@@ -2008,7 +2286,7 @@ def listar_monitoramentos_criterio(
 def criar_monitoramento_criterio(
     payload: MonitoramentoCriterioCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> MonitoramentoCriterioOut:
     mes_referencia = _normalizar_mes_referencia(payload.mes_referencia)
     auditoria = _buscar_auditoria(db, payload.auditoria_ano_id)
@@ -2057,7 +2335,7 @@ def criar_monitoramento_criterio(
 def obter_monitoramento_criterio(
     monitoramento_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> MonitoramentoCriterioOut:
     monitoramento = _buscar_monitoramento_criterio(db, monitoramento_id)
     if current_user.role == RoleEnum.RESPONSAVEL:
@@ -2080,7 +2358,7 @@ def atualizar_monitoramento_criterio(
     monitoramento_id: int,
     payload: MonitoramentoCriterioUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> MonitoramentoCriterioOut:
     monitoramento = _buscar_monitoramento_criterio(db, monitoramento_id)
     data = payload.model_dump(exclude_unset=True)
@@ -2137,7 +2415,7 @@ def atualizar_monitoramento_criterio(
 def remover_monitoramento_criterio(
     monitoramento_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> MensagemOut:
     monitoramento = _buscar_monitoramento_criterio(db, monitoramento_id)
     old_value = _dump_model(monitoramento)
@@ -2162,7 +2440,7 @@ def listar_notificacoes_monitoramento(
     status_notificacao: StatusNotificacaoEnum | None = Query(default=None),
     responsavel_id: int | None = Query(default=None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[NotificacaoMonitoramentoOut]:
     monitoramento = _buscar_monitoramento_criterio(db, monitoramento_id)
     query = select(NotificacaoMonitoramento).where(NotificacaoMonitoramento.monitoramento_id == monitoramento.id)
@@ -2184,7 +2462,7 @@ def criar_notificacao_monitoramento(
     monitoramento_id: int,
     payload: NotificacaoMonitoramentoCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> NotificacaoMonitoramentoOut:
     monitoramento = _buscar_monitoramento_criterio(db, monitoramento_id)
     if payload.responsavel_id is not None:
@@ -2224,7 +2502,7 @@ def atualizar_notificacao_monitoramento(
     notificacao_id: int,
     payload: NotificacaoMonitoramentoUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> NotificacaoMonitoramentoOut:
     notificacao = _buscar_notificacao_monitoramento(db, notificacao_id)
     data = payload.model_dump(exclude_unset=True)
@@ -2259,7 +2537,7 @@ def patch_status_notificacao_monitoramento(
     notificacao_id: int,
     payload: NotificacaoMonitoramentoStatusPatch,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> NotificacaoMonitoramentoOut:
     notificacao = _buscar_notificacao_monitoramento(db, notificacao_id)
     if current_user.role == RoleEnum.RESPONSAVEL and notificacao.responsavel_id != current_user.id:
@@ -2292,7 +2570,7 @@ def patch_status_notificacao_monitoramento(
 def remover_notificacao_monitoramento(
     notificacao_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> MensagemOut:
     notificacao = _buscar_notificacao_monitoramento(db, notificacao_id)
     old_value = _dump_model(notificacao)
@@ -2315,7 +2593,7 @@ def remover_notificacao_monitoramento(
 def listar_resolucoes_notificacao(
     notificacao_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[ResolucaoNotificacaoOut]:
     notificacao = _buscar_notificacao_monitoramento(db, notificacao_id)
     if current_user.role == RoleEnum.RESPONSAVEL and notificacao.responsavel_id != current_user.id:
@@ -2336,7 +2614,7 @@ def criar_resolucao_notificacao(
     notificacao_id: int,
     payload: ResolucaoNotificacaoCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> ResolucaoNotificacaoOut:
     notificacao = _buscar_notificacao_monitoramento(db, notificacao_id)
     if current_user.role == RoleEnum.RESPONSAVEL and notificacao.responsavel_id != current_user.id:
@@ -2391,7 +2669,7 @@ def criar_resolucao_notificacao(
 def remover_resolucao_notificacao(
     resolucao_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> MensagemOut:
     resolucao = _buscar_resolucao_notificacao(db, resolucao_id)
     notificacao = _buscar_notificacao_monitoramento(db, resolucao.notificacao_id)
@@ -2420,7 +2698,7 @@ def listar_analises_nc(
     status_analise: StatusAnaliseNcEnum | None = Query(default=None),
     responsavel_id: int | None = Query(default=None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[AnaliseNcOut]:
     query = (
         select(AnaliseNaoConformidade)
@@ -2454,7 +2732,7 @@ def listar_analises_nc(
 def criar_analise_nc(
     payload: AnaliseNcCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> AnaliseNcOut:
     auditoria = _buscar_auditoria(db, payload.auditoria_ano_id)
     _, _, _ = _validar_vinculos_analise_nc(
@@ -2511,7 +2789,7 @@ def criar_analise_nc(
 def obter_analise_nc(
     analise_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> AnaliseNcOut:
     analise = db.scalar(
         select(AnaliseNaoConformidade)
@@ -2533,7 +2811,7 @@ def atualizar_analise_nc(
     analise_id: int,
     payload: AnaliseNcUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> AnaliseNcOut:
     analise = _buscar_analise_nc(db, analise_id)
     data = payload.model_dump(exclude_unset=True)
@@ -2577,7 +2855,7 @@ def atualizar_status_analise_nc(
     analise_id: int,
     payload: AnaliseNcStatusPatch,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> AnaliseNcOut:
     analise = db.scalar(
         select(AnaliseNaoConformidade)
@@ -2617,7 +2895,7 @@ def atualizar_status_analise_nc(
 def remover_analise_nc(
     analise_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> MensagemOut:
     analise = _buscar_analise_nc(db, analise_id)
     old_value = _dump_model(analise)
@@ -2640,7 +2918,7 @@ def remover_analise_nc(
 def listar_logs_analise_nc(
     analise_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[AuditLogOut]:
     analise = db.scalar(
         select(AnaliseNaoConformidade)
@@ -2672,8 +2950,8 @@ def listar_demandas(
     status_andamento: StatusAndamentoEnum | None = Query(default=None),
     responsavel_id: int | None = Query(default=None),
     atrasadas: bool | None = Query(default=None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[DemandaOut]:
     query = select(DemandaFSC).join(AvaliacaoIndicador, DemandaFSC.avaliacao_id == AvaliacaoIndicador.id)
     if programa_id:
@@ -2710,7 +2988,7 @@ def listar_demandas(
 def criar_demanda(
     payload: DemandaCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> DemandaOut:
     avaliacao = _buscar_avaliacao(db, payload.avaliacao_id)
     if payload.responsavel_id is not None:
@@ -2746,7 +3024,7 @@ def criar_demanda(
 def obter_demanda(
     demanda_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaOut:
     demanda = _buscar_demanda(db, demanda_id)
     if current_user.role == RoleEnum.RESPONSAVEL and demanda.responsavel_id != current_user.id:
@@ -2759,7 +3037,7 @@ def atualizar_demanda(
     demanda_id: int,
     payload: DemandaUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> DemandaOut:
     demanda = _buscar_demanda(db, demanda_id)
     data = payload.model_dump(exclude_unset=True)
@@ -2800,7 +3078,7 @@ def patch_demanda(
     demanda_id: int,
     payload: DemandaPatch,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaOut:
     demanda = _buscar_demanda(db, demanda_id)
     data = payload.model_dump(exclude_unset=True)
@@ -2855,7 +3133,7 @@ def patch_demanda(
 def remover_demanda(
     demanda_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> MensagemOut:
     demanda = _buscar_demanda(db, demanda_id)
     avaliacao = demanda.avaliacao
@@ -2885,8 +3163,8 @@ def listar_logs(
     entidade_id: int | None = Query(default=None),
     programa_id: int | None = Query(default=None),
     auditoria_id: int | None = Query(default=None),
-    db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    db: Session = Depends(get_read_db),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> list[AuditLogOut]:
     query = select(AuditLog).order_by(AuditLog.created_at.desc())
     if entidade:
@@ -2904,7 +3182,7 @@ def listar_logs(
 def listar_usuarios(
     role: RoleEnum | None = Query(default=None),
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> list[UserOut]:
     query = select(User).order_by(User.nome)
     if role:
@@ -2916,7 +3194,7 @@ def listar_usuarios(
 def criar_responsavel(
     payload: ResponsavelCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> UserOut:
     existente = db.scalar(select(User).where(func.lower(User.email) == payload.email.lower()))
     if existente:
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.security import UsuarioAutenticado, get_current_principal
+from app.db.session import get_db
+from app.models.job import Job
+from app.models.user import RoleEnum
+from app.schemas.job import JobOut
+
+router = APIRouter(prefix='/api/jobs', tags=['Jobs'])
+
+
+@router.get('/{job_id}', response_model=JobOut)
+def obter_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
+) -> JobOut:
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Job não encontrado.')
+    if current_user.role not in (RoleEnum.ADMIN, RoleEnum.GESTOR) and job.created_by != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Você não possui permissão para esta ação.')
+    return job
@@ -1,12 +1,12 @@
 from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy import func, or_, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, selectinload
 
 from app.core.rbac import require_roles
-from app.core.security import get_current_user
+from app.core.security import UsuarioAutenticado, get_current_principal
 from app.db.session import get_db
 from app.models.project import (
     AtividadeSetorConfig,
@@ -50,6 +50,9 @@ from app.schemas.project import (
     DemandaHistoricoCreate,
     DemandaHistoricoOut,
 )
+from app.services.http_cache import responder_com_etag
+from app.services.read_routing import get_read_db
+from app.services.versoes_tabelas import obter_versoes
 
 router = APIRouter(prefix='/api', tags=['Projetos'])
 
@@ -129,7 +132,7 @@ def _validar_datas(data_inicio: date | None, data_fim: date | None, contexto: st
         )
 
 
-def _validar_acesso_projeto(db: Session, projeto: Projeto, current_user: User) -> None:
+def _validar_acesso_projeto(db: Session, projeto: Projeto, current_user: UsuarioAutenticado) -> None:
     if current_user.role != RoleEnum.RESPONSAVEL:
         return
     tarefa_vinculada = db.scalar(
@@ -147,7 +150,7 @@ def _validar_acesso_projeto(db: Session, projeto: Projeto, current_user: User) -
         )
 
 
-def _validar_acesso_tarefa(tarefa: TarefaProjeto, current_user: User) -> None:
+def _validar_acesso_tarefa(tarefa: TarefaProjeto, current_user: UsuarioAutenticado) -> None:
     if current_user.role == RoleEnum.RESPONSAVEL and tarefa.responsavel_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -155,7 +158,7 @@ def _validar_acesso_tarefa(tarefa: TarefaProjeto, current_user: User) -> None:
         )
 
 
-def _validar_gestao_atividade(tarefa: TarefaProjeto, current_user: User) -> None:
+def _validar_gestao_atividade(tarefa: TarefaProjeto, current_user: UsuarioAutenticado) -> None:
     if current_user.role in (RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR):
         return
     if current_user.role == RoleEnum.RESPONSAVEL and tarefa.responsavel_id == current_user.id:
@@ -207,7 +210,7 @@ def _normalizar_datas_tarefa(data: dict, tarefa: TarefaProjeto | None = None) ->
         data['completed_at'] = None
 
 
-def _projetos_visiveis_query(current_user: User):
+def _projetos_visiveis_query(current_user: UsuarioAutenticado):
     query = select(Projeto)
     if current_user.role == RoleEnum.RESPONSAVEL:
         subquery_tarefas = select(TarefaProjeto.projeto_id).where(TarefaProjeto.responsavel_id == current_user.id)
@@ -217,10 +220,17 @@ def _projetos_visiveis_query(current_user: User):
 
 @router.get('/configuracoes/atividades-setores', response_model=list[AtividadeSetorConfigOut])
 def listar_setores_atividade_config(
+    request: Request,
+    response: Response,
     ativos_apenas: bool = Query(default=False),
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[AtividadeSetorConfigOut]:
+    nao_modificado = responder_com_etag(
+        request, response, *obter_versoes(db, 'atividades_setores_config', 'atividades_subatividades_config')
+    )
+    if nao_modificado:
+        return nao_modificado
     query = (
         select(AtividadeSetorConfig)
         .options(selectinload(AtividadeSetorConfig.subatividades))
@@ -250,7 +260,7 @@ def listar_setores_atividade_config(
 def criar_setor_atividade_config(
     payload: AtividadeSetorConfigCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> AtividadeSetorConfigOut:
     setor = AtividadeSetorConfig(
         nome=_nome_catalogo_obrigatorio(payload.nome, 'o setor'),
@@ -273,7 +283,7 @@ def atualizar_setor_atividade_config(
     setor_id: int,
     payload: AtividadeSetorConfigUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> AtividadeSetorConfigOut:
     setor = _buscar_setor_atividade_config(db, setor_id)
     data = payload.model_dump(exclude_unset=True)
@@ -296,7 +306,7 @@ def atualizar_setor_atividade_config(
 def remover_setor_atividade_config(
     setor_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> MensagemOut:
     setor = _buscar_setor_atividade_config(db, setor_id)
     db.delete(setor)
@@ -308,7 +318,7 @@ def remover_setor_atividade_config(
 def criar_subatividade_config(
     payload: AtividadeSubatividadeConfigCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> AtividadeSubatividadeConfigOut:
     _buscar_setor_atividade_config(db, payload.setor_id)
     subatividade = AtividadeSubatividadeConfig(
@@ -336,7 +346,7 @@ def atualizar_subatividade_config(
     subatividade_id: int,
     payload: AtividadeSubatividadeConfigUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> AtividadeSubatividadeConfigOut:
     subatividade = _buscar_subatividade_config(db, subatividade_id)
     data = payload.model_dump(exclude_unset=True)
@@ -364,7 +374,7 @@ def atualizar_subatividade_config(
 def remover_subatividade_config(
     subatividade_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> MensagemOut:
     subatividade = _buscar_subatividade_config(db, subatividade_id)
     db.delete(subatividade)
@@ -378,8 +388,8 @@ def listar_projetos(
     prioridade: ProjetoPrioridadeEnum | None = Query(default=None),
     gerente_id: int | None = Query(default=None),
     atrasados: bool | None = Query(default=None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[ProjetoOut]:
     query = _projetos_visiveis_query(current_user)
     if status_projeto:
@@ -403,7 +413,7 @@ def listar_projetos(
 def criar_projeto(
     payload: ProjetoCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> ProjetoOut:
     if payload.gerente_id is not None:
         _buscar_usuario(db, payload.gerente_id)
@@ -424,11 +434,16 @@ def criar_projeto(
 @router.get('/projetos/{projeto_id}', response_model=ProjetoOut)
 def obter_projeto(
     projeto_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> ProjetoOut:
     projeto = _buscar_projeto(db, projeto_id)
     _validar_acesso_projeto(db, projeto, current_user)
+    nao_modificado = responder_com_etag(request, response, projeto.updated_at)
+    if nao_modificado:
+        return nao_modificado
     return projeto
 
 
@@ -437,7 +452,7 @@ def atualizar_projeto(
     projeto_id: int,
     payload: ProjetoUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> ProjetoOut:
     projeto = _buscar_projeto(db, projeto_id)
     data = payload.model_dump(exclude_unset=True)
@@ -462,7 +477,7 @@ def atualizar_status_projeto(
     projeto_id: int,
     payload: ProjetoStatusPatch,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> ProjetoOut:
     projeto = _buscar_projeto(db, projeto_id)
     data = {'status': payload.status}
@@ -479,7 +494,7 @@ def atualizar_status_projeto(
 def remover_projeto(
     projeto_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR)),
 ) -> MensagemOut:
     projeto = _buscar_projeto(db, projeto_id)
     db.delete(projeto)
@@ -493,8 +508,8 @@ def listar_tarefas_projeto(
     status_tarefa: TarefaStatusEnum | None = Query(default=None),
     responsavel_id: int | None = Query(default=None),
     atrasadas: bool | None = Query(default=None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[TarefaProjetoOut]:
     projeto = _buscar_projeto(db, projeto_id)
     _validar_acesso_projeto(db, projeto, current_user)
@@ -522,7 +537,7 @@ def criar_tarefa_projeto(
     projeto_id: int,
     payload: TarefaProjetoCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    current_user: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> TarefaProjetoOut:
     _buscar_projeto(db, projeto_id)
     if payload.responsavel_id is not None:
@@ -558,7 +573,7 @@ def atualizar_tarefa(
     tarefa_id: int,
     payload: TarefaProjetoUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> TarefaProjetoOut:
     tarefa = _buscar_tarefa(db, tarefa_id)
     data = payload.model_dump(exclude_unset=True)
@@ -610,7 +625,7 @@ def atualizar_status_tarefa(
     tarefa_id: int,
     payload: TarefaProjetoStatusPatch,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> TarefaProjetoOut:
     tarefa = _buscar_tarefa(db, tarefa_id)
     if current_user.role == RoleEnum.RESPONSAVEL and tarefa.responsavel_id != current_user.id:
@@ -649,7 +664,7 @@ def atualizar_status_tarefa(
 def remover_tarefa(
     tarefa_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> MensagemOut:
     tarefa = _buscar_tarefa(db, tarefa_id)
     db.delete(tarefa)
@@ -662,7 +677,7 @@ def listar_atividades_subdemanda(
     tarefa_id: int,
     status_atividade: AtividadeStatusEnum | None = Query(default=None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[AtividadeSubdemandaOut]:
     tarefa = _buscar_tarefa(db, tarefa_id)
     _validar_acesso_tarefa(tarefa, current_user)
@@ -683,7 +698,7 @@ def criar_atividade_subdemanda(
     tarefa_id: int,
     payload: AtividadeSubdemandaCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> AtividadeSubdemandaOut:
     tarefa = _buscar_tarefa(db, tarefa_id)
     _validar_gestao_atividade(tarefa, current_user)
@@ -709,7 +724,7 @@ def atualizar_atividade_subdemanda(
     atividade_id: int,
     payload: AtividadeSubdemandaUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> AtividadeSubdemandaOut:
     atividade = _buscar_atividade(db, atividade_id)
     tarefa = _buscar_tarefa(db, atividade.tarefa_id)
@@ -754,7 +769,7 @@ def atualizar_status_atividade_subdemanda(
     atividade_id: int,
     payload: AtividadeSubdemandaStatusPatch,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> AtividadeSubdemandaOut:
     atividade = _buscar_atividade(db, atividade_id)
     tarefa = _buscar_tarefa(db, atividade.tarefa_id)
@@ -770,7 +785,7 @@ def atualizar_status_atividade_subdemanda(
 def remover_atividade_subdemanda(
     atividade_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> MensagemOut:
     atividade = _buscar_atividade(db, atividade_id)
     tarefa = _buscar_tarefa(db, atividade.tarefa_id)
@@ -783,7 +798,7 @@ def remover_atividade_subdemanda(
 @router.get('/projetos-dashboard/resumo', response_model=ProjetosDashboardOut)
 def resumo_dashboard_projetos(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> ProjetosDashboardOut:
     projetos = list(db.scalars(_projetos_visiveis_query(current_user)).all())
     projeto_ids = [projeto.id for projeto in projetos]
@@ -855,7 +870,7 @@ def resumo_dashboard_projetos(
 def listar_historico_demanda(
     tarefa_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> list[DemandaHistoricoOut]:
     tarefa = _buscar_tarefa(db, tarefa_id)
     _validar_acesso_tarefa(tarefa, current_user)
@@ -869,7 +884,7 @@ def adicionar_historico_demanda(
     tarefa_id: int,
     payload: DemandaHistoricoCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
 ) -> DemandaHistoricoOut:
     tarefa = _buscar_tarefa(db, tarefa_id)
     _validar_acesso_tarefa(tarefa, current_user)
@@ -2,10 +2,10 @@ from datetime import date
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import case, extract, func, or_, select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.rbac import require_roles
-from app.db.session import get_db
+from app.core.security import UsuarioAutenticado
 from app.models.fsc import (
     AuditoriaAno,
     AvaliacaoIndicador,
@@ -29,6 +29,8 @@ from app.schemas.fsc import (
     ResumoStatusItem,
     STATUS_CONFORMIDADE_LABELS,
 )
+from app.services.hierarquia_cache import hierarquia_cache
+from app.services.read_routing import get_async_read_db
 
 router = APIRouter(prefix='/api/reports', tags=['Relatórios'])
 
@@ -54,25 +56,27 @@ NOMES_MESES = {
 }
 
 
-def _buscar_auditoria(db: Session, auditoria_id: int) -> AuditoriaAno:
-    auditoria = db.get(AuditoriaAno, auditoria_id)
+async def _buscar_auditoria(db: AsyncSession, auditoria_id: int) -> AuditoriaAno:
+    auditoria = await db.get(AuditoriaAno, auditoria_id)
     if not auditoria:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Auditoria não encontrada.')
     return auditoria
 
 
 @router.get('/resumo-status', response_model=list[ResumoStatusItem])
-def resumo_status(
+async def resumo_status(
     auditoria_id: int = Query(...),
-    db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    db: AsyncSession = Depends(get_async_read_db),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> list[ResumoStatusItem]:
-    _buscar_auditoria(db, auditoria_id)
+    await _buscar_auditoria(db, auditoria_id)
 
-    rows = db.execute(
-        select(AvaliacaoIndicador.status_conformidade, func.count(AvaliacaoIndicador.id))
-        .where(AvaliacaoIndicador.auditoria_ano_id == auditoria_id)
-        .group_by(AvaliacaoIndicador.status_conformidade)
+    rows = (
+        await db.execute(
+            select(AvaliacaoIndicador.status_conformidade, func.count(AvaliacaoIndicador.id))
+            .where(AvaliacaoIndicador.auditoria_ano_id == auditoria_id)
+            .group_by(AvaliacaoIndicador.status_conformidade)
+        )
     ).all()
 
     count_by_status = {status_value: int(qtd) for status_value, qtd in rows}
@@ -89,12 +93,12 @@ def resumo_status(
 
 
 @router.get('/avaliacoes-sem-evidencias', response_model=list[AvaliacaoSemEvidenciaOut])
-def avaliacoes_sem_evidencias(
+async def avaliacoes_sem_evidencias(
     auditoria_id: int = Query(...),
-    db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    db: AsyncSession = Depends(get_async_read_db),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> list[AvaliacaoSemEvidenciaOut]:
-    _buscar_auditoria(db, auditoria_id)
+    await _buscar_auditoria(db, auditoria_id)
 
     evidencias_subq = (
         select(Evidencia.avaliacao_id.label('avaliacao_id'), func.count(Evidencia.id).label('qtd'))
@@ -102,20 +106,22 @@ def avaliacoes_sem_evidencias(
         .subquery()
     )
 
-    rows = db.execute(
-        select(
-            AvaliacaoIndicador.id,
-            AvaliacaoIndicador.indicator_id,
-            Indicador.titulo,
-            AvaliacaoIndicador.status_conformidade,
-        )
-        .join(Indicador, Indicador.id == AvaliacaoIndicador.indicator_id)
-        .outerjoin(evidencias_subq, evidencias_subq.c.avaliacao_id == AvaliacaoIndicador.id)
-        .where(
-            AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
-            func.coalesce(evidencias_subq.c.qtd, 0) == 0,
+    rows = (
+        await db.execute(
+            select(
+                AvaliacaoIndicador.id,
+                AvaliacaoIndicador.indicator_id,
+                Indicador.titulo,
+                AvaliacaoIndicador.status_conformidade,
+            )
+            .join(Indicador, Indicador.id == AvaliacaoIndicador.indicator_id)
+            .outerjoin(evidencias_subq, evidencias_subq.c.avaliacao_id == AvaliacaoIndicador.id)
+            .where(
+                AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+                func.coalesce(evidencias_subq.c.qtd, 0) == 0,
+            )
+            .order_by(Indicador.titulo)
         )
-        .order_by(Indicador.titulo)
     ).all()
 
     return [
@@ -130,80 +136,107 @@ def avaliacoes_sem_evidencias(
 
 
 @router.get('/demandas-atrasadas', response_model=list[DemandaOut])
-def demandas_atrasadas(
+async def demandas_atrasadas(
     auditoria_id: int = Query(...),
-    db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    db: AsyncSession = Depends(get_async_read_db),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> list[DemandaOut]:
-    _buscar_auditoria(db, auditoria_id)
-
-    demandas = db.scalars(
-        select(DemandaFSC)
-        .join(AvaliacaoIndicador, AvaliacaoIndicador.id == DemandaFSC.avaliacao_id)
-        .where(
-            AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
-            DemandaFSC.due_date.is_not(None),
-            DemandaFSC.due_date < date.today(),
-            DemandaFSC.status_andamento != StatusAndamentoEnum.concluida,
+    await _buscar_auditoria(db, auditoria_id)
+
+    demandas = (
+        await db.scalars(
+            select(DemandaFSC)
+            .join(AvaliacaoIndicador, AvaliacaoIndicador.id == DemandaFSC.avaliacao_id)
+            .where(
+                AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+                DemandaFSC.due_date.is_not(None),
+                DemandaFSC.due_date < date.today(),
+                DemandaFSC.status_andamento != StatusAndamentoEnum.concluida,
+            )
+            .order_by(DemandaFSC.due_date.asc(), DemandaFSC.id.desc())
         )
-        .order_by(DemandaFSC.due_date.asc(), DemandaFSC.id.desc())
     ).all()
     return list(demandas)
 
 
 @router.get('/nc-por-principio', response_model=list[NcPorPrincipioItem])
-def nc_por_principio(
+async def nc_por_principio(
     auditoria_id: int = Query(...),
-    db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    db: AsyncSession = Depends(get_async_read_db),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> list[NcPorPrincipioItem]:
-    _buscar_auditoria(db, auditoria_id)
+    await _buscar_auditoria(db, auditoria_id)
 
     nc_menor_case = case((AvaliacaoIndicador.status_conformidade == StatusConformidadeEnum.nc_menor, 1), else_=0)
     nc_maior_case = case((AvaliacaoIndicador.status_conformidade == StatusConformidadeEnum.nc_maior, 1), else_=0)
 
-    rows = db.execute(
-        select(
-            Principio.id,
-            Principio.titulo,
-            func.sum(nc_menor_case).label('nc_menor'),
-            func.sum(nc_maior_case).label('nc_maior'),
-        )
-        .join(Criterio, Criterio.principio_id == Principio.id)
-        .join(Indicador, Indicador.criterio_id == Criterio.id)
-        .join(AvaliacaoIndicador, AvaliacaoIndicador.indicator_id == Indicador.id)
-        .where(
-            AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
-            AvaliacaoIndicador.status_conformidade.in_(
-                (StatusConformidadeEnum.nc_menor, StatusConformidadeEnum.nc_maior)
-            ),
+    rows = (
+        await db.execute(
+            select(
+                AvaliacaoIndicador.programa_id,
+                AvaliacaoIndicador.indicator_id,
+                func.sum(nc_menor_case).label('nc_menor'),
+                func.sum(nc_maior_case).label('nc_maior'),
+            )
+            .where(
+                AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+                AvaliacaoIndicador.status_conformidade.in_(
+                    (StatusConformidadeEnum.nc_menor, StatusConformidadeEnum.nc_maior)
+                ),
+            )
+            .group_by(AvaliacaoIndicador.programa_id, AvaliacaoIndicador.indicator_id)
         )
-        .group_by(Principio.id, Principio.titulo)
-        .order_by(Principio.titulo)
     ).all()
 
-    result: list[NcPorPrincipioItem] = []
-    for row in rows:
-        menor = int(row[2] or 0)
-        maior = int(row[3] or 0)
-        result.append(
-            NcPorPrincipioItem(
-                principio_id=int(row[0]),
-                principio_titulo=str(row[1]),
-                nc_menor=menor,
-                nc_maior=maior,
-                total_nc=menor + maior,
+    # Indicador → princípio pela hierarquia em cache; só o que não estiver nela vai ao banco.
+    hierarquias = {}
+    for programa_id in {row[0] for row in rows}:
+        hierarquias[programa_id] = await db.run_sync(hierarquia_cache.obter, programa_id)
+    principio_do_indicador: dict[int, tuple[int, str]] = {}
+    for programa_id, indicador_id, *_ in rows:
+        hierarquia = hierarquias[programa_id]
+        caminho = hierarquia.caminho_indicador(indicador_id) if hierarquia else None
+        if caminho is not None:
+            principio_do_indicador[indicador_id] = (caminho[2].id, caminho[2].titulo)
+    faltantes = {row[1] for row in rows} - principio_do_indicador.keys()
+    if faltantes:
+        for indicador_id, principio_id, titulo in (
+            await db.execute(
+                select(Indicador.id, Principio.id, Principio.titulo)
+                .join(Criterio, Criterio.id == Indicador.criterio_id)
+                .join(Principio, Principio.id == Criterio.principio_id)
+                .where(Indicador.id.in_(faltantes))
             )
+        ).all():
+            principio_do_indicador[indicador_id] = (principio_id, titulo)
+
+    totais: dict[tuple[int, str], list[int]] = {}
+    for _, indicador_id, nc_menor, nc_maior in rows:
+        principio = principio_do_indicador.get(indicador_id)
+        if principio is None:
+            continue
+        total = totais.setdefault(principio, [0, 0])
+        total[0] += int(nc_menor or 0)
+        total[1] += int(nc_maior or 0)
+
+    return [
+        NcPorPrincipioItem(
+            principio_id=principio_id,
+            principio_titulo=titulo,
+            nc_menor=menor,
+            nc_maior=maior,
+            total_nc=menor + maior,
         )
-    return result
+        for (principio_id, titulo), (menor, maior) in sorted(totais.items(), key=lambda item: item[0][1])
+    ]
 
 
 @router.get('/resumo-conformidade-por-certificacao', response_model=list[ResumoConformidadeCertificacaoItem])
-def resumo_conformidade_por_certificacao(
+async def resumo_conformidade_por_certificacao(
     year: int = Query(..., ge=2000, le=2100),
     programa_id: int | None = Query(default=None),
-    db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
+    db: AsyncSession = Depends(get_async_read_db),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR)),
 ) -> list[ResumoConformidadeCertificacaoItem]:
     query = (
         select(
@@ -240,7 +273,7 @@ def resumo_conformidade_por_certificacao(
     if programa_id:
         query = query.where(ProgramaCertificacao.id == programa_id)
 
-    rows = db.execute(query).all()
+    rows = (await db.execute(query)).all()
     return [
         ResumoConformidadeCertificacaoItem(
             programa_id=int(row.programa_id),
@@ -257,14 +290,14 @@ def resumo_conformidade_por_certificacao(
 
 
 @router.get('/cronograma-nc', response_model=list[CronogramaGanttItem])
-def cronograma_nc(
+async def cronograma_nc(
     programa_id: int = Query(...),
     auditoria_id: int = Query(...),
     incluir_concluidas: bool = Query(default=True),
-    db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
+    db: AsyncSession = Depends(get_async_read_db),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
 ) -> list[CronogramaGanttItem]:
-    auditoria = _buscar_auditoria(db, auditoria_id)
+    auditoria = await _buscar_auditoria(db, auditoria_id)
     if auditoria.programa_id != programa_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -306,7 +339,7 @@ def cronograma_nc(
     if not incluir_concluidas:
         query = query.where(DemandaFSC.status_andamento != StatusAndamentoEnum.concluida)
 
-    rows = db.execute(query).all()
+    rows = (await db.execute(query)).all()
     resultado: list[CronogramaGanttItem] = []
     for row in rows:
         data_inicio = row.data_inicio
@@ -335,13 +368,13 @@ def cronograma_nc(
 
 
 @router.get('/monitoramento-mensal', response_model=list[MonitoramentoMensalItem])
-def monitoramento_mensal(
+async def monitoramento_mensal(
     programa_id: int = Query(...),
     auditoria_id: int = Query(...),
-    db: Session = Depends(get_db),
-    _: User = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
+    db: AsyncSession = Depends(get_async_read_db),
+    _: UsuarioAutenticado = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.GESTOR, RoleEnum.AUDITOR, RoleEnum.RESPONSAVEL)),
 ) -> list[MonitoramentoMensalItem]:
-    auditoria = _buscar_auditoria(db, auditoria_id)
+    auditoria = await _buscar_auditoria(db, auditoria_id)
     if auditoria.programa_id != programa_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -349,61 +382,69 @@ def monitoramento_mensal(
         )
 
     principios_cadastrados = int(
-        db.scalar(select(func.count(Principio.id)).where(Principio.programa_id == programa_id)) or 0
+        await db.scalar(select(func.count(Principio.id)).where(Principio.programa_id == programa_id)) or 0
     )
     criterios_cadastrados = int(
-        db.scalar(select(func.count(Criterio.id)).where(Criterio.programa_id == programa_id)) or 0
+        await db.scalar(select(func.count(Criterio.id)).where(Criterio.programa_id == programa_id)) or 0
     )
 
-    avaliacoes_mes_rows = db.execute(
-        select(extract('month', AvaliacaoIndicador.assessed_at).label('mes'), func.count(AvaliacaoIndicador.id))
-        .where(
-            AvaliacaoIndicador.programa_id == programa_id,
-            AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+    avaliacoes_mes_rows = (
+        await db.execute(
+            select(extract('month', AvaliacaoIndicador.assessed_at).label('mes'), func.count(AvaliacaoIndicador.id))
+            .where(
+                AvaliacaoIndicador.programa_id == programa_id,
+                AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+            )
+            .group_by('mes')
         )
-        .group_by('mes')
     ).all()
     avaliacoes_por_mes = {int(row[0]): int(row[1] or 0) for row in avaliacoes_mes_rows}
 
-    principios_mes_rows = db.execute(
-        select(
-            extract('month', AvaliacaoIndicador.assessed_at).label('mes'),
-            func.count(func.distinct(Principio.id)),
-        )
-        .join(Indicador, Indicador.id == AvaliacaoIndicador.indicator_id)
-        .join(Criterio, Criterio.id == Indicador.criterio_id)
-        .join(Principio, Principio.id == Criterio.principio_id)
-        .where(
-            AvaliacaoIndicador.programa_id == programa_id,
-            AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+    principios_mes_rows = (
+        await db.execute(
+            select(
+                extract('month', AvaliacaoIndicador.assessed_at).label('mes'),
+                func.count(func.distinct(Principio.id)),
+            )
+            .join(Indicador, Indicador.id == AvaliacaoIndicador.indicator_id)
+            .join(Criterio, Criterio.id == Indicador.criterio_id)
+            .join(Principio, Principio.id == Criterio.principio_id)
+            .where(
+                AvaliacaoIndicador.programa_id == programa_id,
+                AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+            )
+            .group_by('mes')
         )
-        .group_by('mes')
     ).all()
     principios_monitorados_por_mes = {int(row[0]): int(row[1] or 0) for row in principios_mes_rows}
 
-    criterios_mes_rows = db.execute(
-        select(
-            extract('month', AvaliacaoIndicador.assessed_at).label('mes'),
-            func.count(func.distinct(Criterio.id)),
-        )
-        .join(Indicador, Indicador.id == AvaliacaoIndicador.indicator_id)
-        .join(Criterio, Criterio.id == Indicador.criterio_id)
-        .where(
-            AvaliacaoIndicador.programa_id == programa_id,
-            AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+    criterios_mes_rows = (
+        await db.execute(
+            select(
+                extract('month', AvaliacaoIndicador.assessed_at).label('mes'),
+                func.count(func.distinct(Criterio.id)),
+            )
+            .join(Indicador, Indicador.id == AvaliacaoIndicador.indicator_id)
+            .join(Criterio, Criterio.id == Indicador.criterio_id)
+            .where(
+                AvaliacaoIndicador.programa_id == programa_id,
+                AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+            )
+            .group_by('mes')
         )
-        .group_by('mes')
     ).all()
     criterios_monitorados_por_mes = {int(row[0]): int(row[1] or 0) for row in criterios_mes_rows}
 
-    evidencias_mes_rows = db.execute(
-        select(extract('month', Evidencia.created_at).label('mes'), func.count(Evidencia.id))
-        .join(AvaliacaoIndicador, AvaliacaoIndicador.id == Evidencia.avaliacao_id)
-        .where(
-            AvaliacaoIndicador.programa_id == programa_id,
-            AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+    evidencias_mes_rows = (
+        await db.execute(
+            select(extract('month', Evidencia.created_at).label('mes'), func.count(Evidencia.id))
+            .join(AvaliacaoIndicador, AvaliacaoIndicador.id == Evidencia.avaliacao_id)
+            .where(
+                AvaliacaoIndicador.programa_id == programa_id,
+                AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+            )
+            .group_by('mes')
         )
-        .group_by('mes')
     ).all()
     evidencias_por_mes = {int(row[0]): int(row[1] or 0) for row in evidencias_mes_rows}
 
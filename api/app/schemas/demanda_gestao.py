@@ -49,12 +49,25 @@ class DemandaAnexoRead(BaseModel):
     nome_arquivo: str
     content_type: Optional[str]
     tamanho: Optional[int]
+    checksum_sha256: Optional[str] = None
     storage_key: str
     observacoes: Optional[str] = None
     criado_em: datetime
     usuario_nome: Optional[str] = None
 
 
+class DemandaAnexoUploadSolicitacao(BaseModel):
+    nome_arquivo: str = Field(min_length=1, max_length=255)
+    content_type: Optional[str] = None
+    tamanho: int = Field(gt=0)
+
+
+class DemandaAnexoUploadFinalizacao(BaseModel):
+    storage_key: str = Field(min_length=1, max_length=512)
+    nome_arquivo: str = Field(min_length=1, max_length=255)
+    observacoes: Optional[str] = None
+
+
 class DemandaAnaliseCampoWrite(BaseModel):
     chave: str = Field(min_length=1, max_length=100)
     valor: str | int | float | bool | None = None
@@ -182,6 +195,11 @@ class DemandaListItem(BaseModel):
     total_subdemandas: int = 0
 
 
+class DemandaListPage(BaseModel):
+    itens: List[DemandaListItem]
+    next_cursor: Optional[str] = None
+
+
 class ItemContagem(BaseModel):
     label: str
     valor: int
@@ -204,6 +222,14 @@ class GestaoDashboardOut(BaseModel):
     sla_cumprido_percentual: float
 
 
+class DashboardCacheStatsOut(BaseModel):
+    entradas: int
+    hits: int
+    misses: int
+    invalidacoes: int
+    ttl_segundos: int
+
+
 class HomeDataOut(BaseModel):
     resumo: GestaoDashboardOut
     atrasadas: List[DemandaListItem]
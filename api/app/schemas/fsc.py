@@ -195,6 +195,28 @@ class IndicadorOut(IndicadorBase):
     id: int
 
 
+class HierarquiaCriterioOut(BaseModel):
+    criterio: CriterioOut
+    indicadores: list[IndicadorOut]
+
+
+class HierarquiaPrincipioOut(BaseModel):
+    principio: PrincipioOut
+    criterios: list[HierarquiaCriterioOut]
+
+
+class HierarquiaProgramaOut(BaseModel):
+    programa_id: int
+    principios: list[HierarquiaPrincipioOut]
+
+
+class HierarquiaCacheStatsOut(BaseModel):
+    entradas: int
+    hits: int
+    misses: int
+    invalidacoes: int
+
+
 class AuditoriaBase(BaseModel):
     programa_id: int
     year: int = Field(ge=2000, le=2100)
@@ -307,6 +329,21 @@ class EvidenciaCreate(BaseModel):
     observacoes: str | None = None
 
 
+class EvidenciaUploadSolicitacao(BaseModel):
+    avaliacao_id: int
+    tipo_evidencia_id: int | None = None
+    nome_arquivo: str = Field(min_length=1, max_length=255)
+    content_type: str | None = None
+    tamanho: int = Field(gt=0)
+
+
+class EvidenciaUploadFinalizacao(BaseModel):
+    avaliacao_id: int
+    tipo_evidencia_id: int | None = None
+    storage_key: str = Field(min_length=1, max_length=512)
+    observacoes: str | None = None
+
+
 class EvidenciaOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -364,6 +401,9 @@ class DocumentoEvidenciaOut(BaseModel):
     created_by: int
     created_at: datetime
     updated_at: datetime
+    # Preenchidos só na busca (q): trecho do conteúdo com os termos entre <mark>, já escapado.
+    trecho: str | None = None
+    relevancia: float | None = None
 
 
 class MonitoramentoCriterioCreate(BaseModel):
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+from app.models.job import JobStatusEnum
+
+
+class JobOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    tipo: str
+    status: JobStatusEnum
+    progresso: int
+    parametros: dict | None
+    resultado: dict | None
+    erro: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class UploadPreAssinadoOut(BaseModel):
+    url: str
+    fields: dict[str, str]
+    storage_key: str
+    expira_em_segundos: int
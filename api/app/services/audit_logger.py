@@ -1,7 +1,31 @@
 ﻿from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session, SessionTransaction
 
 from app.models.auditlog import AcaoAuditEnum, AuditLog
+from app.services.metrics import LOGS_AUDITORIA
+
+# Chave em Session.info com os logs gravados por entidade na transação corrente; a métrica
+# só é incrementada no commit, para não contar logs de requisições desfeitas.
+INFO_LOGS_AUDITORIA = 'logs_auditoria'
+
+
+def _contar(db: Session, entidade: str, quantidade: int = 1) -> None:
+    contagem = db.info.setdefault(INFO_LOGS_AUDITORIA, {})
+    contagem[entidade] = contagem.get(entidade, 0) + quantidade
+
+
+@event.listens_for(Session, 'after_commit')
+def _registrar_logs_confirmados(session: Session) -> None:
+    for entidade, quantidade in session.info.pop(INFO_LOGS_AUDITORIA, {}).items():
+        LOGS_AUDITORIA.incrementar(entidade, valor=quantidade)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _descartar_logs(session: Session, transacao: SessionTransaction) -> None:
+    # Rollback ou close sem commit: after_commit já teria consumido a contagem.
+    if transacao.parent is None:
+        session.info.pop(INFO_LOGS_AUDITORIA, None)
 
 
 def registrar_log(
@@ -26,4 +50,36 @@ def registrar_log(
         auditoria_ano_id=auditoria_ano_id,
     )
     db.add(log)
+    _contar(db, entidade)
     return log
+
+
+def registrar_logs_em_lote(
+    db: Session,
+    entidade: str,
+    acao: AcaoAuditEnum,
+    created_by: int | None,
+    novos_valores: list[dict],
+    programa_id: int | None = None,
+    auditoria_ano_id: int | None = None,
+) -> int:
+    """Grava um log por item em um único INSERT; cada item precisa trazer a chave `id` da entidade."""
+    if not novos_valores:
+        return 0
+    db.execute(
+        insert(AuditLog),
+        [
+            {
+                'entidade': entidade,
+                'entidade_id': valor['id'],
+                'acao': acao,
+                'new_value': jsonable_encoder(valor),
+                'created_by': created_by,
+                'programa_id': programa_id,
+                'auditoria_ano_id': auditoria_ano_id,
+            }
+            for valor in novos_valores
+        ],
+    )
+    _contar(db, entidade, len(novos_valores))
+    return len(novos_valores)
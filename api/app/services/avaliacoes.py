@@ -0,0 +1,51 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, exists, insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.auditlog import AcaoAuditEnum
+from app.models.fsc import AuditoriaAno, AvaliacaoIndicador, Indicador, StatusConformidadeEnum
+from app.services.audit_logger import registrar_logs_em_lote
+
+
+def gerar_avaliacoes(db: Session, auditoria: AuditoriaAno, created_by: int | None) -> int:
+    """Cria as avaliações que faltam para os indicadores do programa da auditoria e retorna quantas foram criadas."""
+    # Um único INSERT ... SELECT cria as avaliações que faltam; a unique constraint
+    # (indicator_id, auditoria_ano_id) garante que execuções concorrentes não dupliquem linhas.
+    tabela = AvaliacaoIndicador.__table__
+    indicadores_sem_avaliacao = select(
+        literal(auditoria.programa_id),
+        Indicador.id,
+        literal(auditoria.id),
+        literal(StatusConformidadeEnum.conforme, tabela.c.status_conformidade.type),
+        literal(datetime.now(UTC), DateTime(timezone=True)),
+    ).where(
+        Indicador.programa_id == auditoria.programa_id,
+        ~exists().where(
+            AvaliacaoIndicador.indicator_id == Indicador.id,
+            AvaliacaoIndicador.auditoria_ano_id == auditoria.id,
+        ),
+    )
+    colunas = ['programa_id', 'indicator_id', 'auditoria_ano_id', 'status_conformidade', 'assessed_at']
+    if db.get_bind().dialect.name == 'postgresql':
+        stmt = (
+            pg_insert(tabela)
+            .from_select(colunas, indicadores_sem_avaliacao)
+            .on_conflict_do_nothing(constraint='uq_avaliacao_indicator_auditoria')
+        )
+    else:
+        stmt = insert(tabela).from_select(colunas, indicadores_sem_avaliacao)
+    novas = [dict(row._mapping) for row in db.execute(stmt.returning(*tabela.c))]
+
+    criadas = registrar_logs_em_lote(
+        db,
+        entidade='avaliacao',
+        acao=AcaoAuditEnum.CREATE,
+        created_by=created_by,
+        novos_valores=novas,
+        programa_id=auditoria.programa_id,
+        auditoria_ano_id=auditoria.id,
+    )
+    db.commit()
+    return criadas
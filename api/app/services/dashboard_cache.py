@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Hashable
+from threading import Lock
+from typing import Any
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class DashboardSnapshotCache:
+    """Snapshots do dashboard de demandas mantidos em memória por escopo RBAC.
+
+    Qualquer escrita em demandas invalida todos os snapshots; o TTL apenas limita a
+    defasagem entre workers, que não compartilham memória.
+    """
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._lock = Lock()
+        self._snapshots: dict[Hashable, tuple[float, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        if self.ttl_seconds <= 0:
+            return None
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._snapshots.get(key)
+            if entrada is None or entrada[0] <= agora:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entrada[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._snapshots[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'entradas': len(self._snapshots),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidacoes': self.invalidations,
+                'ttl_segundos': self.ttl_seconds,
+            }
+
+
+dashboard_cache = DashboardSnapshotCache(settings.DASHBOARD_CACHE_TTL_SECONDS)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Lock
+
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.db.session import ReadSessionLocal, SessionLocal, replica_configurada
+from app.services.s3_storage import get_s3_client
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class HealthChecker:
+    """Executa as probes de readiness em paralelo, com timeout por probe e resultado em cache.
+
+    Uma probe que estourou o timeout continua rodando na sua thread; enquanto não terminar
+    ela não é disparada de novo, para que um S3 lento não acumule threads presas.
+    """
+
+    def __init__(self, probes: dict[str, Callable[[], None]], ttl_seconds: float, timeout_seconds: float) -> None:
+        self.probes = probes
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self._executor = ThreadPoolExecutor(max_workers=len(probes), thread_name_prefix='health')
+        self._lock = Lock()
+        self._em_andamento: dict[str, Future] = {}
+        self._cache: tuple[float, dict[str, dict]] | None = None
+
+    def verificar(self) -> dict[str, dict]:
+        with self._lock:
+            agora = time.monotonic()
+            if self._cache is not None and self._cache[0] > agora:
+                return self._cache[1]
+
+            inicio = time.perf_counter()
+            futuros = {nome: self._disparar(nome) for nome in self.probes}
+            prazo = inicio + self.timeout_seconds
+            resultados = {nome: self._aguardar(futuro, prazo) for nome, futuro in futuros.items()}
+            for nome, resultado in resultados.items():
+                if resultado['status'] != 'ok':
+                    logger.warning('Health check — probe %s: %s (%s).', nome, resultado['status'], resultado['erro'])
+            self._cache = (time.monotonic() + self.ttl_seconds, resultados)
+            return resultados
+
+    def limpar_cache(self) -> None:
+        with self._lock:
+            self._cache = None
+
+    def _disparar(self, nome: str) -> Future:
+        anterior = self._em_andamento.get(nome)
+        if anterior is not None and not anterior.done():
+            return anterior
+        futuro = self._executor.submit(self._medir, self.probes[nome])
+        self._em_andamento[nome] = futuro
+        return futuro
+
+    @staticmethod
+    def _medir(probe: Callable[[], None]) -> dict:
+        inicio = time.perf_counter()
+        try:
+            probe()
+        except Exception as exc:
+            return {
+                'status': 'error',
+                'latencia_ms': round((time.perf_counter() - inicio) * 1000, 1),
+                'erro': str(exc) or exc.__class__.__name__,
+            }
+        return {'status': 'ok', 'latencia_ms': round((time.perf_counter() - inicio) * 1000, 1), 'erro': None}
+
+    def _aguardar(self, futuro: Future, prazo: float) -> dict:
+        try:
+            return futuro.result(timeout=max(prazo - time.perf_counter(), 0))
+        except FutureTimeoutError:
+            return {
+                'status': 'timeout',
+                'latencia_ms': round(self.timeout_seconds * 1000, 1),
+                'erro': f'Sem resposta em {self.timeout_seconds:g} s.',
+            }
+
+
+def _probe_db() -> None:
+    with SessionLocal() as db:
+        db.execute(text('SELECT 1'))
+
+
+def _probe_db_leitura() -> None:
+    with ReadSessionLocal() as db:
+        db.execute(text('SELECT 1'))
+
+
+def _probe_s3() -> None:
+    get_s3_client().head_bucket(Bucket=settings.S3_BUCKET)
+
+
+_probes: dict[str, Callable[[], None]] = {'db': _probe_db, 's3': _probe_s3}
+if replica_configurada():
+    _probes['db_leitura'] = _probe_db_leitura
+
+health_checker = HealthChecker(
+    _probes,
+    ttl_seconds=settings.HEALTH_CACHE_TTL_SECONDS,
+    timeout_seconds=settings.HEALTH_PROBE_TIMEOUT_SECONDS,
+)
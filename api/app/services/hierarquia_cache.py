@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from threading import Lock
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.fsc import Criterio, Indicador, Principio, ProgramaCertificacao
+from app.schemas.fsc import CriterioOut, IndicadorOut, PrincipioOut
+from app.services.versoes_tabelas import obter_versoes
+
+# Qualquer escrita nestas tabelas muda a versão de todas as hierarquias em cache.
+TABELAS_HIERARQUIA = ('programas_certificacao', 'principios', 'criterios', 'indicadores')
+
+
+@dataclass(frozen=True, slots=True)
+class HierarquiaPrograma:
+    """Princípios, critérios e indicadores de um programa em arrays paralelos ordenados por id.
+
+    `principio_do_criterio[i]` é a posição, em `principios`, do princípio do critério `i`
+    (idem `criterio_do_indicador`); -1 quando o pai não pertence ao programa. Os mapas
+    id → posição tornam qualquer subida na árvore O(1).
+    """
+
+    programa_id: int
+    versao: tuple[int, ...]
+    principios: tuple[PrincipioOut, ...]
+    criterios: tuple[CriterioOut, ...]
+    indicadores: tuple[IndicadorOut, ...]
+    principio_do_criterio: tuple[int, ...]
+    criterio_do_indicador: tuple[int, ...]
+    posicao_principio: dict[int, int]
+    posicao_criterio: dict[int, int]
+    posicao_indicador: dict[int, int]
+
+    def principio(self, principio_id: int) -> PrincipioOut | None:
+        posicao = self.posicao_principio.get(principio_id)
+        return None if posicao is None else self.principios[posicao]
+
+    def criterio(self, criterio_id: int) -> CriterioOut | None:
+        posicao = self.posicao_criterio.get(criterio_id)
+        return None if posicao is None else self.criterios[posicao]
+
+    def indicador(self, indicador_id: int) -> IndicadorOut | None:
+        posicao = self.posicao_indicador.get(indicador_id)
+        return None if posicao is None else self.indicadores[posicao]
+
+    def caminho_indicador(self, indicador_id: int) -> tuple[IndicadorOut, CriterioOut, PrincipioOut] | None:
+        """Indicador, critério e princípio, ou None se algum deles não estiver neste programa."""
+        posicao = self.posicao_indicador.get(indicador_id)
+        if posicao is None:
+            return None
+        posicao_criterio = self.criterio_do_indicador[posicao]
+        if posicao_criterio < 0:
+            return None
+        posicao_principio = self.principio_do_criterio[posicao_criterio]
+        if posicao_principio < 0:
+            return None
+        return self.indicadores[posicao], self.criterios[posicao_criterio], self.principios[posicao_principio]
+
+    def arvore(self) -> list[dict]:
+        criterios_por_principio: list[list[dict]] = [[] for _ in self.principios]
+        indicadores_por_criterio: list[list[IndicadorOut]] = [[] for _ in self.criterios]
+        for posicao, pai in enumerate(self.criterio_do_indicador):
+            if pai >= 0:
+                indicadores_por_criterio[pai].append(self.indicadores[posicao])
+        for posicao, pai in enumerate(self.principio_do_criterio):
+            if pai >= 0:
+                criterios_por_principio[pai].append(
+                    {'criterio': self.criterios[posicao], 'indicadores': indicadores_por_criterio[posicao]}
+                )
+        return [
+            {'principio': principio, 'criterios': criterios_por_principio[posicao]}
+            for posicao, principio in enumerate(self.principios)
+        ]
+
+
+def _carregar(db: Session, programa_id: int, versao: tuple[int, ...]) -> HierarquiaPrograma | None:
+    if db.get(ProgramaCertificacao, programa_id) is None:
+        return None
+    principios = tuple(
+        PrincipioOut.model_validate(item)
+        for item in db.scalars(select(Principio).where(Principio.programa_id == programa_id).order_by(Principio.id))
+    )
+    criterios = tuple(
+        CriterioOut.model_validate(item)
+        for item in db.scalars(select(Criterio).where(Criterio.programa_id == programa_id).order_by(Criterio.id))
+    )
+    indicadores = tuple(
+        IndicadorOut.model_validate(item)
+        for item in db.scalars(select(Indicador).where(Indicador.programa_id == programa_id).order_by(Indicador.id))
+    )
+    posicao_principio = {item.id: posicao for posicao, item in enumerate(principios)}
+    posicao_criterio = {item.id: posicao for posicao, item in enumerate(criterios)}
+    return HierarquiaPrograma(
+        programa_id=programa_id,
+        versao=versao,
+        principios=principios,
+        criterios=criterios,
+        indicadores=indicadores,
+        principio_do_criterio=tuple(posicao_principio.get(item.principio_id, -1) for item in criterios),
+        criterio_do_indicador=tuple(posicao_criterio.get(item.criterio_id, -1) for item in indicadores),
+        posicao_principio=posicao_principio,
+        posicao_criterio=posicao_criterio,
+        posicao_indicador={item.id: posicao for posicao, item in enumerate(indicadores)},
+    )
+
+
+class HierarquiaCache:
+    """Hierarquia de certificação por programa, mantida em memória e versionada pelo banco.
+
+    A versão de uma entrada são os contadores de `versoes_tabelas` das tabelas da hierarquia,
+    incrementados no commit de qualquer escrita nelas. Como o contador fica no banco, todos os
+    workers enxergam a mesma versão: uma entrada só é servida se foi montada na versão corrente,
+    e o ETag dos endpoints que usam o cache nunca aponta para uma árvore antiga.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._entradas: dict[int, HierarquiaPrograma] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def obter(self, db: Session, programa_id: int) -> HierarquiaPrograma | None:
+        """Hierarquia do programa (None se ele não existe); só monta de novo se a versão mudou."""
+        versao = obter_versoes(db, *TABELAS_HIERARQUIA)
+        with self._lock:
+            entrada = self._entradas.get(programa_id)
+            if entrada is not None and entrada.versao == versao:
+                self.hits += 1
+                return entrada
+            self.misses += 1
+            if entrada is not None:
+                self.invalidations += 1
+
+        # Uma escrita durante a carga deixa os dados mais novos que `versao`: a próxima leitura
+        # vê a versão seguinte e monta de novo, nunca o contrário.
+        hierarquia = _carregar(db, programa_id, versao)
+        with self._lock:
+            if hierarquia is None:
+                self._entradas.pop(programa_id, None)
+            else:
+                self._entradas[programa_id] = hierarquia
+        return hierarquia
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'entradas': len(self._entradas),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidacoes': self.invalidations,
+            }
+
+
+hierarquia_cache = HierarquiaCache()
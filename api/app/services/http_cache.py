@@ -0,0 +1,35 @@
+import hashlib
+
+from fastapi import Request, Response, status
+
+# O navegador guarda a resposta, mas revalida sempre (If-None-Match) antes de reutilizá-la.
+CACHE_CONTROL = 'private, no-cache'
+
+
+def etag_fraco(*partes) -> str:
+    digest = hashlib.blake2b(repr(partes).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _corresponde(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # Comparação fraca (RFC 9110, 13.1.2): o prefixo W/ não conta.
+    alvo = etag.removeprefix('W/')
+    return any(candidato.strip().removeprefix('W/') == alvo for candidato in if_none_match.split(','))
+
+
+def responder_com_etag(request: Request, response: Response, *partes) -> Response | None:
+    """Devolve um 304 pronto se o cliente já tem esta versão; senão só grava o ETag na resposta.
+
+    As partes precisam ser obtidas antes dos dados do corpo: uma escrita entre as duas leituras
+    gera no máximo um 200 desnecessário depois, nunca um 304 com dados antigos.
+    """
+    etag = etag_fraco(*partes)
+    cabecalhos = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+    if _corresponde(request.headers.get('if-none-match'), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabecalhos)
+    response.headers.update(cabecalhos)
+    return None
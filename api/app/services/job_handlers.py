@@ -0,0 +1,31 @@
+from collections.abc import Callable
+
+from sqlalchemy.orm import Session
+
+from app.models.fsc import AuditoriaAno
+from app.models.job import Job
+from app.services.avaliacoes import gerar_avaliacoes
+from app.services.jobs import job_runner
+from app.services.tipos_evidencia import gerar_tipos_evidencia_padrao
+
+TIPO_GERAR_AVALIACOES = 'gerar_avaliacoes'
+TIPO_TIPOS_EVIDENCIA_PADRAO = 'tipos_evidencia_padrao'
+
+
+@job_runner.registrar(TIPO_GERAR_AVALIACOES)
+def _gerar_avaliacoes(db: Session, job: Job, progresso: Callable[[int], None]) -> dict:
+    auditoria = db.get(AuditoriaAno, job.parametros['auditoria_id'])
+    if auditoria is None:
+        raise ValueError('Auditoria não encontrada.')
+    criadas = gerar_avaliacoes(db, auditoria, job.created_by)
+    return {
+        'criadas': criadas,
+        'mensagem': f'Avaliações geradas para Auditoria {auditoria.year}. Total de novas avaliações: {criadas}.',
+    }
+
+
+@job_runner.registrar(TIPO_TIPOS_EVIDENCIA_PADRAO)
+def _tipos_evidencia_padrao(db: Session, job: Job, progresso: Callable[[int], None]) -> dict:
+    criados = gerar_tipos_evidencia_padrao(db, programa_id=job.parametros.get('programa_id'))
+    db.commit()
+    return {'criados': criados, 'mensagem': f'Tipos de evidência padrão gerados. Total de novos tipos: {criados}.'}
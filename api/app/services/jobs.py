@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+from threading import Event, Lock, Thread
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.job import Job, JobStatusEnum
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# handler(db, job, progresso) -> resultado serializável em JSON
+JobHandler = Callable[[Session, Job, Callable[[int], None]], dict]
+
+
+class JobRunner:
+    """Executa jobs persistidos na tabela `jobs` em um pool de threads do próprio processo.
+
+    O estado fica no banco: um job só é assumido por quem consegue movê-lo de `pendente`
+    para `executando`, e quem o executa renova `heartbeat_at` periodicamente. Só volta para
+    a fila o job cujo heartbeat expirou: num deploy com sobreposição, a instância nova não
+    retoma o que a antiga ainda está executando.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        max_workers: int,
+        max_tentativas: int,
+        heartbeat_segundos: float,
+        heartbeat_timeout_segundos: float,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self.max_tentativas = max_tentativas
+        self.heartbeat_segundos = heartbeat_segundos
+        self.heartbeat_timeout_segundos = heartbeat_timeout_segundos
+        self.handlers: dict[str, JobHandler] = {}
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = Lock()
+        self._encerrando = Event()
+        self._varredura: Thread | None = None
+
+    def registrar(self, tipo: str) -> Callable[[JobHandler], JobHandler]:
+        def decorator(handler: JobHandler) -> JobHandler:
+            self.handlers[tipo] = handler
+            return handler
+
+        return decorator
+
+    def submeter(self, job_id: int) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='jobs')
+            self._executor.submit(self.executar, job_id)
+
+    def executar(self, job_id: int) -> None:
+        with self.session_factory() as db:
+            agora = datetime.now(UTC)
+            assumido = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatusEnum.pendente)
+                .values(
+                    status=JobStatusEnum.executando,
+                    started_at=agora,
+                    heartbeat_at=agora,
+                    tentativas=Job.tentativas + 1,
+                    progresso=0,
+                )
+            ).rowcount
+            db.commit()
+            if not assumido:
+                return
+
+            concluido = Event()
+            Thread(
+                target=self._manter_heartbeat, args=(job_id, concluido), name=f'job-{job_id}-heartbeat', daemon=True
+            ).start()
+            try:
+                job = db.get(Job, job_id)
+                handler = self.handlers.get(job.tipo)
+                try:
+                    if handler is None:
+                        raise ValueError(f'Tipo de job desconhecido: {job.tipo}.')
+                    resultado = handler(db, job, lambda percentual: self._atualizar_progresso(job_id, percentual))
+                except Exception as exc:
+                    logger.exception('Job %s (%s) falhou.', job_id, job.tipo)
+                    db.rollback()
+                    self._finalizar(db, job_id, JobStatusEnum.falhou, erro=str(exc) or exc.__class__.__name__)
+                    return
+                self._finalizar(db, job_id, JobStatusEnum.concluido, resultado=resultado)
+            finally:
+                concluido.set()
+
+    def recuperar(self) -> int:
+        """Reenfileira jobs pendentes e os em execução cujo heartbeat expirou (processo que os rodava parou)."""
+        limite = datetime.now(UTC) - timedelta(seconds=self.heartbeat_timeout_segundos)
+        with self.session_factory() as db:
+            interrompidos = [
+                job
+                for job in db.scalars(select(Job).where(Job.status == JobStatusEnum.executando)).all()
+                if (sinal := _ultimo_sinal(job)) is None or sinal < limite
+            ]
+            for job in interrompidos:
+                if job.tentativas >= self.max_tentativas:
+                    valores = {
+                        'status': JobStatusEnum.falhou,
+                        'erro': 'Job interrompido (sem heartbeat) e sem tentativas restantes.',
+                        'finished_at': datetime.now(UTC),
+                    }
+                else:
+                    valores = {'status': JobStatusEnum.pendente}
+                # Só se o heartbeat lido ainda é o atual: quem renovou nesse meio-tempo continua dono.
+                db.execute(
+                    update(Job)
+                    .where(
+                        Job.id == job.id,
+                        Job.status == JobStatusEnum.executando,
+                        Job.heartbeat_at.is_(None) if job.heartbeat_at is None else Job.heartbeat_at == job.heartbeat_at,
+                    )
+                    .values(**valores)
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+            pendentes = list(db.scalars(select(Job.id).where(Job.status == JobStatusEnum.pendente).order_by(Job.id)).all())
+
+        for job_id in pendentes:
+            self.submeter(job_id)
+        if interrompidos:
+            logger.info('%s job(s) sem heartbeat recuperado(s).', len(interrompidos))
+        return len(pendentes)
+
+    def iniciar_varredura(self) -> None:
+        """Repete recuperar() a cada expiração do heartbeat, para jobs de instâncias que pararam depois do startup."""
+        with self._lock:
+            if self._varredura is not None:
+                return
+            self._encerrando.clear()
+            self._varredura = Thread(target=self._varrer, name='jobs-varredura', daemon=True)
+            self._varredura.start()
+
+    def encerrar(self) -> None:
+        # Jobs em andamento param de renovar o heartbeat e são retomados por outra instância.
+        self._encerrando.set()
+        with self._lock:
+            self._varredura = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _varrer(self) -> None:
+        while not self._encerrando.wait(self.heartbeat_timeout_segundos):
+            try:
+                self.recuperar()
+            except Exception:
+                logger.exception('Falha na varredura de jobs sem heartbeat.')
+
+    def _manter_heartbeat(self, job_id: int, concluido: Event) -> None:
+        while not concluido.wait(self.heartbeat_segundos):
+            if self._encerrando.is_set():
+                return
+            try:
+                with self.session_factory() as db:
+                    db.execute(
+                        update(Job)
+                        .where(Job.id == job_id, Job.status == JobStatusEnum.executando)
+                        .values(heartbeat_at=datetime.now(UTC))
+                    )
+                    db.commit()
+            except Exception:
+                logger.exception('Falha ao renovar o heartbeat do job %s.', job_id)
+
+    def _atualizar_progresso(self, job_id: int, percentual: int) -> None:
+        with self.session_factory() as db:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(progresso=max(0, min(percentual, 100)), heartbeat_at=datetime.now(UTC))
+            )
+            db.commit()
+
+    def _finalizar(
+        self,
+        db: Session,
+        job_id: int,
+        status_final: JobStatusEnum,
+        resultado: dict | None = None,
+        erro: str | None = None,
+    ) -> None:
+        valores: dict = {'status': status_final, 'finished_at': datetime.now(UTC), 'resultado': resultado, 'erro': erro}
+        if status_final == JobStatusEnum.concluido:
+            valores['progresso'] = 100
+        db.execute(update(Job).where(Job.id == job_id).values(**valores))
+        db.commit()
+
+
+def _ultimo_sinal(job: Job) -> datetime | None:
+    sinal = job.heartbeat_at or job.started_at
+    # O SQLite devolve datetimes sem fuso; os valores gravados aqui são sempre UTC.
+    if sinal is not None and sinal.tzinfo is None:
+        sinal = sinal.replace(tzinfo=UTC)
+    return sinal
+
+
+def enfileirar_job(
+    db: Session,
+    tipo: str,
+    parametros: dict,
+    created_by: int | None,
+    idempotency_key: str | None = None,
+) -> tuple[Job, bool]:
+    """Grava o job e o envia ao pool; com a mesma Idempotency-Key devolve o job já existente."""
+    if idempotency_key:
+        existente = db.scalar(select(Job).where(Job.idempotency_key == idempotency_key))
+        if existente is not None:
+            _validar_reuso_idempotencia(existente, tipo, parametros)
+            return existente, False
+
+    job = Job(tipo=tipo, parametros=parametros, created_by=created_by, idempotency_key=idempotency_key)
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Outra requisição com a mesma chave gravou primeiro.
+        db.rollback()
+        existente = db.scalar(select(Job).where(Job.idempotency_key == idempotency_key))
+        if existente is None:
+            raise
+        _validar_reuso_idempotencia(existente, tipo, parametros)
+        return existente, False
+    db.refresh(job)
+    job_runner.submeter(job.id)
+    return job, True
+
+
+def _validar_reuso_idempotencia(job: Job, tipo: str, parametros: dict) -> None:
+    if job.tipo != tipo or (job.parametros or {}) != parametros:
+        raise ValueError('Idempotency-Key já utilizada para outra operação.')
+
+
+job_runner = JobRunner(
+    SessionLocal,
+    settings.JOBS_MAX_WORKERS,
+    settings.JOBS_MAX_TENTATIVAS,
+    settings.JOBS_HEARTBEAT_SECONDS,
+    settings.JOBS_HEARTBEAT_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable
+from contextlib import contextmanager
+from functools import wraps
+
+# Buckets em segundos, do padrão do cliente oficial do Prometheus.
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_ESPERA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+CONTENT_TYPE_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Metrica(ABC):
+    """Base das métricas: cada thread grava no próprio shard, sem lock no caminho quente.
+
+    O lock só é usado quando uma thread grava pela primeira vez (registro do shard) e na
+    exposição, que soma os shards. Shards de threads encerradas continuam somando, pois
+    os valores são acumulados desde o início do processo.
+    """
+
+    tipo = ''
+
+    def __init__(self, nome: str, descricao: str, rotulos: tuple[str, ...] = ()) -> None:
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = rotulos
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _formatar_rotulos(self, valores: tuple, extra: str = '') -> str:
+        pares = [f'{nome}="{_escapar(str(valor))}"' for nome, valor in zip(self.rotulos, valores)]
+        if extra:
+            pares.append(extra)
+        return '{' + ','.join(pares) + '}' if pares else ''
+
+    @abstractmethod
+    def _somar_shards(self) -> dict:
+        ...
+
+    def expor(self) -> list[str]:
+        linhas = [f'# HELP {self.nome} {self.descricao}', f'# TYPE {self.nome} {self.tipo}']
+        linhas.extend(self._linhas(self._somar_shards()))
+        return linhas
+
+    @abstractmethod
+    def _linhas(self, valores: dict) -> list[str]:
+        ...
+
+    def clear(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def incrementar(self, *rotulos: str, valor: float = 1) -> None:
+        shard = self._shard()
+        shard[rotulos] = shard.get(rotulos, 0) + valor
+
+    def _somar_shards(self) -> dict:
+        with self._lock:
+            shards = [dict(shard) for shard in self._shards]
+        total: dict = {}
+        for shard in shards:
+            for rotulos, valor in shard.items():
+                total[rotulos] = total.get(rotulos, 0) + valor
+        return total
+
+    def _linhas(self, valores: dict) -> list[str]:
+        return [f'{self.nome}{self._formatar_rotulos(rotulos)} {_numero(valor)}' for rotulos, valor in sorted(valores.items())]
+
+    def valor(self, *rotulos: str) -> float:
+        return self._somar_shards().get(rotulos, 0)
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(
+        self, nome: str, descricao: str, rotulos: tuple[str, ...] = (), buckets: tuple[float, ...] = BUCKETS_PADRAO
+    ) -> None:
+        super().__init__(nome, descricao, rotulos)
+        self.buckets = buckets
+
+    def observar(self, valor: float, *rotulos: str) -> None:
+        shard = self._shard()
+        serie = shard.get(rotulos)
+        if serie is None:
+            # Contagem por bucket (não cumulativa; o último é +Inf) e a soma no final.
+            serie = shard[rotulos] = [0] * (len(self.buckets) + 1) + [0.0]
+        serie[bisect_left(self.buckets, valor)] += 1
+        serie[-1] += valor
+
+    @contextmanager
+    def cronometrar(self, *rotulos: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, *rotulos)
+
+    def _somar_shards(self) -> dict:
+        with self._lock:
+            # list(items()) copia o dict numa operação só: outra thread pode estar criando uma série nova.
+            shards = [[(rotulos, list(serie)) for rotulos, serie in list(shard.items())] for shard in self._shards]
+        total: dict = {}
+        for shard in shards:
+            for rotulos, serie in shard:
+                acumulada = total.get(rotulos)
+                if acumulada is None:
+                    total[rotulos] = serie
+                else:
+                    total[rotulos] = [a + b for a, b in zip(acumulada, serie)]
+        return total
+
+    def _linhas(self, valores: dict) -> list[str]:
+        linhas = []
+        for rotulos, serie in sorted(valores.items()):
+            acumulado = 0
+            for limite, contagem in zip((*self.buckets, math.inf), serie):
+                acumulado += contagem
+                le = '+Inf' if limite == math.inf else _numero(limite)
+                rotulos_bucket = self._formatar_rotulos(rotulos, f'le="{le}"')
+                linhas.append(f'{self.nome}_bucket{rotulos_bucket} {acumulado}')
+            linhas.append(f'{self.nome}_sum{self._formatar_rotulos(rotulos)} {_numero(serie[-1])}')
+            linhas.append(f'{self.nome}_count{self._formatar_rotulos(rotulos)} {acumulado}')
+        return linhas
+
+    def contagem(self, *rotulos: str) -> int:
+        serie = self._somar_shards().get(rotulos)
+        return sum(serie[:-1]) if serie else 0
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class RegistroMetricas:
+    def __init__(self) -> None:
+        self._metricas: list[_Metrica] = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def expor(self) -> str:
+        linhas: list[str] = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.expor())
+        return '\n'.join(linhas) + '\n'
+
+    def clear(self) -> None:
+        for metrica in self._metricas:
+            metrica.clear()
+
+
+registro = RegistroMetricas()
+
+DURACAO_REQUISICAO = registro.registrar(
+    Histograma('http_request_duration_seconds', 'Duração das requisições HTTP por rota.', ('metodo', 'rota'))
+)
+REQUISICOES = registro.registrar(
+    Contador('http_requests_total', 'Requisições HTTP por rota e status.', ('metodo', 'rota', 'status'))
+)
+ESPERA_POOL_DB = registro.registrar(
+    Histograma(
+        'db_pool_checkout_wait_seconds', 'Espera para obter uma conexão do pool do banco.', ('pool',), BUCKETS_ESPERA
+    )
+)
+DURACAO_S3 = registro.registrar(
+    Histograma('s3_operation_duration_seconds', 'Duração das operações no S3 por operação.', ('operacao',))
+)
+DURACAO_HASH_SENHA = registro.registrar(
+    Histograma('auth_password_hash_seconds', 'Tempo de verificação do hash de senha no login.')
+)
+LOGS_AUDITORIA = registro.registrar(
+    Contador('audit_log_writes_total', 'Registros de auditoria gravados por entidade.', ('entidade',))
+)
+
+
+def cronometrar_s3(operacao: str) -> Callable:
+    def decorador(funcao: Callable) -> Callable:
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            with DURACAO_S3.cronometrar(operacao):
+                return funcao(*args, **kwargs)
+
+        return medida
+
+    return decorador
+
+
+class MetricasMiddleware:
+    """Latência por template de rota (/api/fsc/avaliacoes/{avaliacao_id}), não por URL concreta."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status_code = 500
+
+        async def enviar(mensagem) -> None:
+            nonlocal status_code
+            if mensagem['type'] == 'http.response.start':
+                status_code = mensagem['status']
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            rota = getattr(scope.get('route'), 'path', None) or 'sem_rota'
+            DURACAO_REQUISICAO.observar(time.perf_counter() - inicio, scope['method'], rota)
+            REQUISICOES.incrementar(scope['method'], rota, str(status_code))
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    from app.core.security import UsuarioAutenticado
+
+settings = get_settings()
+
+
+class PrincipalCache:
+    """Usuários autenticados mantidos em memória para evitar a consulta a `usuarios` a cada request.
+
+    Alterações de usuário (edição, remoção, desbloqueio, bloqueio por tentativas) invalidam a
+    entrada correspondente; o TTL limita a defasagem entre workers, que não compartilham memória.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._entradas: OrderedDict[int, tuple[float, UsuarioAutenticado]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> UsuarioAutenticado | None:
+        if self.ttl_seconds <= 0:
+            return None
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if entrada is None or entrada[0] <= agora:
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(user_id)
+            self.hits += 1
+            return entrada[1]
+
+    def set(self, principal: UsuarioAutenticado) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entradas[principal.id] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entradas.move_to_end(principal.id)
+            while len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entradas.pop(user_id, None)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'entradas': len(self._entradas),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidacoes': self.invalidations,
+                'ttl_segundos': self.ttl_seconds,
+            }
+
+
+principal_cache = PrincipalCache(settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS, settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES)
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from threading import Lock
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Chave em Connection.info com os instantes de início das consultas em andamento.
+INFO_INICIO_CONSULTAS = 'perf_inicio_consultas'
+MAX_PARAMETROS = 500
+
+
+@dataclass
+class PerfilRequisicao:
+    """Consultas executadas durante uma requisição, acumuladas pelos eventos do engine."""
+
+    consultas: int = 0
+    tempo_db: float = 0.0
+    mais_lenta: tuple[float, str, str] | None = None
+    por_statement: Counter = field(default_factory=Counter)
+
+    def registrar(self, statement: str, parameters, duracao: float) -> None:
+        self.consultas += 1
+        self.tempo_db += duracao
+        self.por_statement[statement] += 1
+        if self.mais_lenta is None or duracao > self.mais_lenta[0]:
+            self.mais_lenta = (duracao, statement, _resumir_parametros(parameters))
+
+
+_perfil_atual: ContextVar[PerfilRequisicao | None] = ContextVar('perfil_consultas', default=None)
+
+
+def _resumir_parametros(parameters) -> str:
+    texto = repr(parameters)
+    return texto if len(texto) <= MAX_PARAMETROS else texto[:MAX_PARAMETROS] + '…'
+
+
+def _percentil(valores: list[float], fracao: float) -> float:
+    return valores[min(int(len(valores) * fracao), len(valores) - 1)]
+
+
+class PerfilConsultas:
+    """Amostras recentes por endpoint (duração, tempo de banco, nº de consultas) e as consultas mais lentas.
+
+    Fica na memória do processo, como os demais caches; cada worker reporta só o próprio tráfego.
+    """
+
+    def __init__(self, janela: int, max_lentas: int, limite_consultas: int) -> None:
+        self.janela = janela
+        self.max_lentas = max_lentas
+        self.limite_consultas = limite_consultas
+        self._lock = Lock()
+        self._amostras: dict[str, deque[tuple[float, float, int]]] = {}
+        self._lentas: list[tuple[float, int, dict]] = []
+        self._sequencia = 0
+        self.alertas_n_mais_1 = 0
+
+    def iniciar(self) -> PerfilRequisicao:
+        perfil = PerfilRequisicao()
+        _perfil_atual.set(perfil)
+        return perfil
+
+    def finalizar(self, endpoint: str, perfil: PerfilRequisicao, duracao: float) -> None:
+        _perfil_atual.set(None)
+        n_mais_1 = self.limite_consultas > 0 and perfil.consultas > self.limite_consultas
+        if n_mais_1:
+            statement, repeticoes = perfil.por_statement.most_common(1)[0]
+            logger.warning(
+                'Possível N+1 em %s: %s consultas (limite %s); a mais repetida rodou %sx: %s',
+                endpoint,
+                perfil.consultas,
+                self.limite_consultas,
+                repeticoes,
+                statement[:300],
+            )
+
+        with self._lock:
+            self.alertas_n_mais_1 += n_mais_1
+            amostras = self._amostras.get(endpoint)
+            if amostras is None:
+                amostras = self._amostras[endpoint] = deque(maxlen=self.janela)
+            amostras.append((duracao, perfil.tempo_db, perfil.consultas))
+
+            if perfil.mais_lenta is not None and self.max_lentas > 0:
+                tempo, statement, parametros = perfil.mais_lenta
+                if len(self._lentas) < self.max_lentas or tempo > self._lentas[0][0]:
+                    self._sequencia += 1
+                    entrada = (
+                        tempo,
+                        self._sequencia,
+                        {'endpoint': endpoint, 'ms': round(tempo * 1000, 2), 'statement': statement, 'parametros': parametros},
+                    )
+                    if len(self._lentas) < self.max_lentas:
+                        heapq.heappush(self._lentas, entrada)
+                    else:
+                        heapq.heapreplace(self._lentas, entrada)
+
+    def resumo(self) -> dict:
+        with self._lock:
+            amostras = {endpoint: list(valores) for endpoint, valores in self._amostras.items()}
+            lentas = sorted(self._lentas, reverse=True)
+
+        endpoints = {}
+        for endpoint, valores in sorted(amostras.items()):
+            duracoes = sorted(valor[0] for valor in valores)
+            tempos_db = sorted(valor[1] for valor in valores)
+            consultas = sorted(valor[2] for valor in valores)
+            endpoints[endpoint] = {
+                'amostras': len(valores),
+                'ms': {
+                    'p50': round(_percentil(duracoes, 0.5) * 1000, 2),
+                    'p95': round(_percentil(duracoes, 0.95) * 1000, 2),
+                    'p99': round(_percentil(duracoes, 0.99) * 1000, 2),
+                },
+                'db_ms': {
+                    'p50': round(_percentil(tempos_db, 0.5) * 1000, 2),
+                    'p95': round(_percentil(tempos_db, 0.95) * 1000, 2),
+                },
+                'consultas': {'p50': _percentil(consultas, 0.5), 'max': consultas[-1]},
+            }
+        return {
+            'endpoints': endpoints,
+            'consultas_lentas': [entrada[2] for entrada in lentas],
+            'alertas_n_mais_1': self.alertas_n_mais_1,
+            'limite_consultas': self.limite_consultas,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._amostras.clear()
+            self._lentas.clear()
+            self.alertas_n_mais_1 = 0
+
+
+perfil_consultas = PerfilConsultas(
+    settings.PERF_JANELA_AMOSTRAS,
+    settings.PERF_MAX_CONSULTAS_LENTAS,
+    settings.PERF_LIMITE_CONSULTAS_REQUISICAO,
+)
+
+
+# Ouvintes na classe Engine: cobrem o primário, a réplica e o sync_engine dos engines async.
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_da_consulta(conn, _cursor, _statement, _parameters, _context, _executemany) -> None:
+    if _perfil_atual.get() is not None:
+        conn.info.setdefault(INFO_INICIO_CONSULTAS, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _depois_da_consulta(conn, _cursor, statement, parameters, _context, _executemany) -> None:
+    perfil = _perfil_atual.get()
+    inicios = conn.info.get(INFO_INICIO_CONSULTAS)
+    if perfil is None or not inicios:
+        return
+    perfil.registrar(statement, parameters, time.perf_counter() - inicios.pop())
+
+
+class PerfilConsultasMiddleware:
+    """Mede cada requisição HTTP e devolve o tempo de banco no cabeçalho Server-Timing."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http' or not settings.PERF_PROFILER_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        perfil = perfil_consultas.iniciar()
+
+        async def enviar(mensagem) -> None:
+            if mensagem['type'] == 'http.response.start':
+                total_ms = (time.perf_counter() - inicio) * 1000
+                valor = (
+                    f'db;dur={perfil.tempo_db * 1000:.1f};desc="{perfil.consultas} consultas", '
+                    f'app;dur={total_ms:.1f}'
+                )
+                mensagem['headers'] = [*mensagem.get('headers', []), (b'server-timing', valor.encode('latin-1'))]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            rota = scope.get('route')
+            caminho = getattr(rota, 'path', None) or 'sem_rota'
+            perfil_consultas.finalizar(f"{scope['method']} {caminho}", perfil, time.perf_counter() - inicio)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import time
+from collections.abc import AsyncGenerator, Generator
+from threading import Lock
+
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.core.config import get_settings
+from app.core.security import UsuarioAutenticado, get_current_principal
+from app.db import session as db_session
+from app.db.session import INFO_USUARIO_ID, get_async_db, get_db
+
+settings = get_settings()
+
+# Chave em Session.info marcando que a transação corrente gravou algo.
+INFO_ESCREVEU = 'escreveu'
+
+
+class EscritasRecentes:
+    """Momento da última escrita confirmada de cada usuário, para ler do primário logo depois dela.
+
+    Fica na memória do processo: com vários workers, a requisição seguinte pode cair em outro
+    worker e ir para a réplica; o atraso de replicação costuma ser bem menor que a janela.
+    """
+
+    def __init__(self, janela_seconds: float) -> None:
+        self.janela_seconds = janela_seconds
+        self._lock = Lock()
+        self._expira_em: dict[int, float] = {}
+
+    def marcar(self, user_id: int) -> None:
+        if self.janela_seconds <= 0:
+            return
+        agora = time.monotonic()
+        with self._lock:
+            self._expira_em[user_id] = agora + self.janela_seconds
+            # Limpeza preguiçosa para o dicionário não crescer com usuários inativos.
+            if len(self._expira_em) > 1024:
+                self._expira_em = {uid: expira for uid, expira in self._expira_em.items() if expira > agora}
+
+    def recente(self, user_id: int) -> bool:
+        with self._lock:
+            expira = self._expira_em.get(user_id)
+        return expira is not None and expira > time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expira_em.clear()
+
+
+escritas_recentes = EscritasRecentes(settings.DB_READ_STICKY_SECONDS)
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_flush(session: Session, _flush_context) -> None:
+    session.info[INFO_ESCREVEU] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _registrar_dml(estado: ORMExecuteState) -> None:
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        estado.session.info[INFO_ESCREVEU] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _marcar_escrita_confirmada(session: Session) -> None:
+    escreveu = session.info.pop(INFO_ESCREVEU, False)
+    user_id = session.info.get(INFO_USUARIO_ID)
+    if escreveu and user_id is not None:
+        escritas_recentes.marcar(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_escrita(session: Session) -> None:
+    session.info.pop(INFO_ESCREVEU, None)
+
+
+def _ler_do_primario(current_user: UsuarioAutenticado) -> bool:
+    return not db_session.replica_configurada() or escritas_recentes.recente(current_user.id)
+
+
+def get_read_db(
+    db: Session = Depends(get_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
+) -> Generator[Session, None, None]:
+    """Sessão para relatórios e listagens: réplica quando configurada, primário logo após escrita do usuário."""
+    if _ler_do_primario(current_user):
+        yield db
+        return
+    leitura = db_session.ReadSessionLocal()
+    try:
+        yield leitura
+    finally:
+        leitura.close()
+
+
+async def get_async_read_db(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UsuarioAutenticado = Depends(get_current_principal),
+) -> AsyncGenerator[AsyncSession, None]:
+    if _ler_do_primario(current_user):
+        yield db
+        return
+    async with db_session.AsyncReadSessionLocal() as leitura:
+        yield leitura
@@ -1,22 +1,58 @@
-﻿from pathlib import Path
+﻿import hashlib
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO
+from urllib.parse import quote
 
 from botocore.client import Config
 import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
+from fastapi import HTTPException, Response, status
+from fastapi.responses import RedirectResponse, StreamingResponse
 
 from app.core.config import get_settings
+from app.services.metrics import DURACAO_S3, cronometrar_s3
 
 settings = get_settings()
 
+# Tamanho de cada parte do multipart upload (o S3 exige no mínimo 5 MiB, exceto na última).
+UPLOAD_PART_SIZE = 8 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class ArquivoEnviado:
+    uri: str
+    tamanho: int
+    sha256: str
+
+
+@dataclass(frozen=True)
+class ObjetoArmazenado:
+    tamanho: int
+    content_type: str | None
+    etag: str | None
+
+
+def _max_upload_bytes() -> int:
+    return settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+
+def _erro_tamanho_maximo() -> ValueError:
+    return ValueError(f"Arquivo excede o tamanho máximo permitido de {settings.MAX_UPLOAD_SIZE_MB} MB.")
+
 
 def validate_upload(filename: str, size_bytes: int, content_type: str | None = None) -> None:
     """Valida extensão e tamanho de arquivo antes do upload. Lança ValueError se inválido."""
-    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
-    if size_bytes > max_bytes:
-        raise ValueError(
-            f"Arquivo excede o tamanho máximo permitido de {settings.MAX_UPLOAD_SIZE_MB} MB."
-        )
+    if size_bytes > _max_upload_bytes():
+        raise _erro_tamanho_maximo()
+    validate_upload_extension(filename)
+
 
+def validate_upload_extension(filename: str) -> None:
+    """Valida apenas a extensão; o tamanho é conferido durante o envio por upload_stream."""
     ext = Path(filename).suffix.lstrip('.').lower()
     if ext not in settings.allowed_extensions_set():
         raise ValueError(
@@ -25,17 +61,70 @@ def validate_upload(filename: str, size_bytes: int, content_type: str | None = N
         )
 
 
-def get_s3_client():
-    return boto3.client(
-        's3',
-        endpoint_url=settings.S3_ENDPOINT,
-        aws_access_key_id=settings.S3_ACCESS_KEY,
-        aws_secret_access_key=settings.S3_SECRET_KEY,
-        region_name=settings.S3_REGION,
-        config=Config(s3={'addressing_style': 'path'}),
+# Clientes boto3 são thread-safe depois de criados; a criação em si não é, por isso o lock.
+_clientes_lock = Lock()
+_clientes: dict[str, tuple[tuple, object]] = {}
+_estatisticas_clientes = {'criados': 0, 'reutilizados': 0}
+
+
+def _configuracao_cliente(endpoint: str) -> tuple:
+    return (
+        endpoint,
+        settings.S3_ACCESS_KEY,
+        settings.S3_SECRET_KEY,
+        settings.S3_REGION,
+        settings.S3_MAX_POOL_CONNECTIONS,
+        settings.S3_CONNECT_TIMEOUT_SECONDS,
+        settings.S3_READ_TIMEOUT_SECONDS,
+        settings.S3_MAX_ATTEMPTS,
     )
 
 
+def _obter_cliente(endpoint: str):
+    """Reaproveita um cliente por endpoint, recriando-o se credenciais ou ajustes mudarem."""
+    configuracao = _configuracao_cliente(endpoint)
+    with _clientes_lock:
+        existente = _clientes.get(endpoint)
+        if existente is not None and existente[0] == configuracao:
+            _estatisticas_clientes['reutilizados'] += 1
+            return existente[1]
+
+        client = boto3.session.Session().client(
+            's3',
+            endpoint_url=endpoint,
+            aws_access_key_id=settings.S3_ACCESS_KEY,
+            aws_secret_access_key=settings.S3_SECRET_KEY,
+            region_name=settings.S3_REGION,
+            config=Config(
+                s3={'addressing_style': 'path'},
+                signature_version='s3v4',
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                connect_timeout=settings.S3_CONNECT_TIMEOUT_SECONDS,
+                read_timeout=settings.S3_READ_TIMEOUT_SECONDS,
+                retries={'max_attempts': settings.S3_MAX_ATTEMPTS, 'mode': 'standard'},
+            ),
+        )
+        _clientes[endpoint] = (configuracao, client)
+        _estatisticas_clientes['criados'] += 1
+        return client
+
+
+def get_s3_client():
+    return _obter_cliente(settings.S3_ENDPOINT)
+
+
+def get_s3_presign_client():
+    """Cliente usado apenas para assinar URLs entregues ao navegador."""
+    if not settings.S3_PUBLIC_ENDPOINT:
+        return get_s3_client()
+    return _obter_cliente(settings.S3_PUBLIC_ENDPOINT)
+
+
+def estatisticas_clientes_s3() -> dict[str, int]:
+    with _clientes_lock:
+        return {**_estatisticas_clientes, 'ativos': len(_clientes)}
+
+
 def ensure_bucket_exists() -> None:
     client = get_s3_client()
     try:
@@ -50,13 +139,65 @@ def ensure_bucket_exists() -> None:
         raise
 
 
-def upload_fileobj(file_obj, key: str, content_type: str | None = None) -> str:
+@cronometrar_s3('upload_stream')
+def upload_stream(
+    file_obj: BinaryIO,
+    key: str,
+    content_type: str | None = None,
+    max_bytes: int | None = None,
+    part_size: int = UPLOAD_PART_SIZE,
+) -> ArquivoEnviado:
+    """Envia o arquivo em partes, sem carregá-lo inteiro na memória.
+
+    O limite de tamanho é verificado a cada parte lida (ValueError ao ultrapassar, com o
+    multipart abortado) e o SHA-256 é calculado incrementalmente. Arquivos menores que uma
+    parte vão em um único put_object.
+    """
+    limite = _max_upload_bytes() if max_bytes is None else max_bytes
     client = get_s3_client()
-    extra_args = {}
-    if content_type:
-        extra_args['ContentType'] = content_type
-    client.upload_fileobj(file_obj, settings.S3_BUCKET, key, ExtraArgs=extra_args)
-    return f's3://{settings.S3_BUCKET}/{key}'
+    extra_args = {'ContentType': content_type} if content_type else {}
+    digest = hashlib.sha256()
+    tamanho = 0
+
+    def ler_parte() -> bytes:
+        nonlocal tamanho
+        parte = file_obj.read(part_size)
+        tamanho += len(parte)
+        if tamanho > limite:
+            raise _erro_tamanho_maximo()
+        digest.update(parte)
+        return parte
+
+    parte = ler_parte()
+    if len(parte) < part_size:
+        client.put_object(Bucket=settings.S3_BUCKET, Key=key, Body=parte, **extra_args)
+        return ArquivoEnviado(f's3://{settings.S3_BUCKET}/{key}', tamanho, digest.hexdigest())
+
+    upload_id = client.create_multipart_upload(Bucket=settings.S3_BUCKET, Key=key, **extra_args)['UploadId']
+    partes: list[dict] = []
+    try:
+        while parte:
+            resposta = client.upload_part(
+                Bucket=settings.S3_BUCKET,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=len(partes) + 1,
+                Body=parte,
+            )
+            partes.append({'ETag': resposta['ETag'], 'PartNumber': len(partes) + 1})
+            # Libera a parte enviada antes de ler a próxima: o pico fica em uma parte.
+            parte = b''
+            parte = ler_parte()
+        client.complete_multipart_upload(
+            Bucket=settings.S3_BUCKET,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': partes},
+        )
+    except BaseException:
+        client.abort_multipart_upload(Bucket=settings.S3_BUCKET, Key=key, UploadId=upload_id)
+        raise
+    return ArquivoEnviado(f's3://{settings.S3_BUCKET}/{key}', tamanho, digest.hexdigest())
 
 
 def _parse_s3_uri(s3_uri: str) -> tuple[str, str] | None:
@@ -71,33 +212,153 @@ def _parse_s3_uri(s3_uri: str) -> tuple[str, str] | None:
     return bucket, key
 
 
-def gerar_url_pre_assinada(s3_uri: str | None, expires_in: int = 3600) -> str | None:
-    if not s3_uri:
-        return None
+@cronometrar_s3('presign_get')
+def gerar_url_pre_assinada(s3_uri: str, expires_in: int = 3600, nome_arquivo: str | None = None) -> str:
     parseado = _parse_s3_uri(s3_uri)
     if not parseado:
-        return s3_uri
+        raise ValueError('URI S3 inválida.')
 
     bucket, key = parseado
+    params = {'Bucket': bucket, 'Key': key}
+    if nome_arquivo:
+        params['ResponseContentDisposition'] = f"attachment; filename*=UTF-8''{quote(nome_arquivo)}"
+    client = get_s3_presign_client()
+    return client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires_in)
+
+
+def redirecionar_download(s3_uri: str, nome_arquivo: str | None = None) -> RedirectResponse:
+    """Redireciona (307) para a URL pré-assinada do objeto.
+
+    Nunca redireciona para o valor armazenado: 404 se ele não for um objeto do S3 e 502 se a
+    assinatura falhar.
+    """
+    if not _parse_s3_uri(s3_uri):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Arquivo não encontrado no armazenamento.')
+    try:
+        url = gerar_url_pre_assinada(s3_uri, settings.S3_PRESIGN_EXPIRES_SECONDS, nome_arquivo)
+    except (BotoCoreError, ClientError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY, detail=f'Erro ao gerar link de download: {exc}'
+        ) from exc
+    return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+
+@cronometrar_s3('presign_post')
+def gerar_upload_pre_assinado(key: str, content_type: str | None = None, max_bytes: int | None = None) -> dict:
+    """Gera um POST policy para o navegador enviar o arquivo direto ao S3.
+
+    A policy limita o tamanho (content-length-range) e fixa o Content-Type declarado;
+    o registro só é criado depois, na finalização, conferindo o objeto com head_object.
+    """
+    limite = _max_upload_bytes() if max_bytes is None else max_bytes
+    fields: dict[str, str] = {}
+    conditions: list = [['content-length-range', 1, limite]]
+    if content_type:
+        fields['Content-Type'] = content_type
+        conditions.append({'Content-Type': content_type})
+
+    client = get_s3_presign_client()
+    return client.generate_presigned_post(
+        Bucket=settings.S3_BUCKET,
+        Key=key,
+        Fields=fields,
+        Conditions=conditions,
+        ExpiresIn=settings.S3_PRESIGN_EXPIRES_SECONDS,
+    )
+
+
+@cronometrar_s3('head_object')
+def consultar_objeto(key: str) -> ObjetoArmazenado | None:
     client = get_s3_client()
     try:
-        return client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': bucket, 'Key': key},
-            ExpiresIn=expires_in,
-        )
-    except Exception:
-        return s3_uri
+        resposta = client.head_object(Bucket=settings.S3_BUCKET, Key=key)
+    except ClientError as exc:
+        codigo = str(exc.response.get('Error', {}).get('Code', ''))
+        if codigo in {'404', 'NoSuchKey', 'NotFound'}:
+            return None
+        raise
+    return ObjetoArmazenado(
+        tamanho=int(resposta['ContentLength']),
+        content_type=resposta.get('ContentType'),
+        etag=resposta.get('ETag'),
+    )
+
 
+@cronometrar_s3('delete_object')
+def remover_objeto(key: str) -> None:
+    get_s3_client().delete_object(Bucket=settings.S3_BUCKET, Key=key)
 
-def baixar_arquivo_s3(s3_uri: str) -> tuple[bytes, str | None]:
+
+def consultar_upload_direto(key: str) -> ObjetoArmazenado:
+    """Confere, na finalização, o objeto enviado pelo navegador com a URL pré-assinada.
+
+    Responde 404 se o objeto não existe e 502 se o S3 falhar, em vez de deixar o erro virar 500.
+    """
+    try:
+        objeto = consultar_objeto(key)
+    except (BotoCoreError, ClientError) as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f'Erro ao verificar upload: {exc}') from exc
+    if objeto is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Arquivo não encontrado no armazenamento.')
+    return objeto
+
+
+def _iterar_corpo(corpo) -> Iterator[bytes]:
+    try:
+        yield from corpo.iter_chunks(DOWNLOAD_CHUNK_SIZE)
+    finally:
+        corpo.close()
+
+
+def resposta_streaming_s3(
+    s3_uri: str,
+    range_header: str | None = None,
+    if_none_match: str | None = None,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """Devolve o objeto em streaming, repassando Range e If-None-Match ao get_object.
+
+    Responde 206 para ranges, 304 quando o ETag confere e 416 para range inválido.
+    Demais erros do S3 (ex.: NoSuchKey) são propagados para o chamador tratar.
+    """
     parseado = _parse_s3_uri(s3_uri)
     if not parseado:
         raise ValueError('URI S3 inválida.')
 
     bucket, key = parseado
+    params = {'Bucket': bucket, 'Key': key}
+    if range_header and range_header.strip().lower().startswith('bytes='):
+        params['Range'] = range_header.strip()
+    if if_none_match:
+        params['IfNoneMatch'] = if_none_match
+
+    cabecalhos = {'Accept-Ranges': 'bytes', **(headers or {})}
     client = get_s3_client()
-    resposta = client.get_object(Bucket=bucket, Key=key)
-    conteudo = resposta['Body'].read()
-    content_type = resposta.get('ContentType')
-    return conteudo, content_type
+    try:
+        # Mede só a chamada: o corpo é lido depois, no ritmo em que o cliente consome a resposta.
+        with DURACAO_S3.cronometrar('get_object'):
+            resposta = client.get_object(**params)
+    except ClientError as exc:
+        status_code = exc.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        codigo = str(exc.response.get('Error', {}).get('Code', ''))
+        if status_code == 304 or codigo in {'304', 'NotModified'}:
+            return Response(status_code=304, headers={**cabecalhos, 'ETag': if_none_match or ''})
+        if status_code == 416 or codigo == 'InvalidRange':
+            return Response(status_code=416, headers=cabecalhos)
+        raise
+
+    if resposta.get('ETag'):
+        cabecalhos['ETag'] = resposta['ETag']
+    if resposta.get('ContentLength') is not None:
+        cabecalhos['Content-Length'] = str(resposta['ContentLength'])
+    if resposta.get('ContentRange'):
+        cabecalhos['Content-Range'] = resposta['ContentRange']
+    if resposta.get('LastModified'):
+        cabecalhos['Last-Modified'] = resposta['LastModified'].strftime('%a, %d %b %Y %H:%M:%S GMT')
+
+    return StreamingResponse(
+        _iterar_corpo(resposta['Body']),
+        status_code=206 if resposta.get('ContentRange') else 200,
+        media_type=resposta.get('ContentType') or 'application/octet-stream',
+        headers=cabecalhos,
+    )
@@ -0,0 +1,139 @@
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import date
+
+from sqlalchemy import case, func, literal, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import get_settings
+from app.core.security import hash_password
+from app.db.bulk import insert_ignorando_conflitos
+from app.models.fsc import AuditoriaAno, ConfiguracaoSistema, ProgramaCertificacao
+from app.models.seed import SeedVersao
+from app.models.user import RoleEnum, User
+from app.services.tipos_evidencia import gerar_tipos_evidencia_padrao
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Incrementar sempre que os dados padrão abaixo mudarem, para que rodem de novo no próximo startup.
+SEED_VERSAO = 1
+
+PROGRAMAS_PADRAO = {
+    'FSC': ('FSC', 'Forest Stewardship Council'),
+    'PEFC': ('PEFC', 'Programme for the Endorsement of Forest Certification'),
+    'ONCA_PINTADA': ('Onça Pintada', 'Certificação e monitoramento para onça pintada'),
+    'CARBONO': ('Carbono', 'Programas e auditorias para carbono florestal'),
+}
+
+
+@contextmanager
+def medir_fase(fase: str) -> Iterator[None]:
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.info('Startup: %s em %.1f ms.', fase, (time.perf_counter() - inicio) * 1000)
+
+
+def executar_seeds(db: Session) -> bool:
+    """Aplica os dados padrão em uma única transação; retorna False se a versão atual já estava aplicada."""
+    with medir_fase('seed admin'):
+        _seed_admin_user(db)
+
+    versao_aplicada = db.scalar(select(func.max(SeedVersao.versao)))
+    if versao_aplicada is not None and versao_aplicada >= SEED_VERSAO:
+        db.commit()
+        logger.info('Seeds na versão %s já aplicados; etapa ignorada.', versao_aplicada)
+        return False
+
+    with medir_fase('seed programas'):
+        _seed_programas_certificacao(db)
+    with medir_fase('seed auditorias'):
+        _seed_auditorias_iniciais(db)
+    with medir_fase('seed tipos de evidência'):
+        criados = gerar_tipos_evidencia_padrao(db)
+        logger.info('Seeds: %s tipo(s) de evidência padrão criado(s).', criados)
+    with medir_fase('seed configurações'):
+        _seed_configuracao_sistema(db)
+
+    db.execute(insert_ignorando_conflitos(db, SeedVersao.__table__).values(versao=SEED_VERSAO))
+    db.commit()
+    return True
+
+
+def _seed_programas_certificacao(db: Session) -> None:
+    # O código legado PFC vira PEFC quando ainda não existe PEFC; se ambos existem, o legado é mantido.
+    pefc = aliased(ProgramaCertificacao)
+    db.execute(
+        update(ProgramaCertificacao)
+        .where(
+            ProgramaCertificacao.codigo == 'PFC',
+            ~select(pefc.id).where(pefc.codigo == 'PEFC').exists(),
+        )
+        .values(codigo='PEFC')
+    )
+    db.execute(
+        insert_ignorando_conflitos(db, ProgramaCertificacao.__table__).values(
+            [
+                {'codigo': codigo, 'nome': nome, 'descricao': descricao}
+                for codigo, (nome, descricao) in PROGRAMAS_PADRAO.items()
+            ]
+        )
+    )
+    db.execute(
+        update(ProgramaCertificacao)
+        .where(ProgramaCertificacao.codigo.in_(PROGRAMAS_PADRAO))
+        .values(
+            nome=case({codigo: nome for codigo, (nome, _) in PROGRAMAS_PADRAO.items()}, value=ProgramaCertificacao.codigo),
+            descricao=case(
+                {codigo: descricao for codigo, (_, descricao) in PROGRAMAS_PADRAO.items()},
+                value=ProgramaCertificacao.codigo,
+            ),
+        )
+    )
+
+
+def _seed_auditorias_iniciais(db: Session) -> None:
+    programas_sem_auditoria = select(
+        ProgramaCertificacao.id,
+        literal(date.today().year),
+        literal('Certificação'),
+    ).where(~select(AuditoriaAno.id).where(AuditoriaAno.programa_id == ProgramaCertificacao.id).exists())
+    db.execute(
+        insert_ignorando_conflitos(db, AuditoriaAno.__table__).from_select(
+            ['programa_id', 'year', 'tipo'],
+            programas_sem_auditoria,
+        )
+    )
+
+
+def _seed_admin_user(db: Session) -> None:
+    admin = db.scalar(select(User).where(User.email == 'admin@local'))
+    if admin:
+        if admin.needs_password_change:
+            admin.password_hash = hash_password(settings.ADMIN_INITIAL_PASSWORD)
+            admin.is_locked = False
+            admin.failed_login_attempts = 0
+        return
+    db.add(
+        User(
+            nome='Administrador',
+            email='admin@local',
+            role=RoleEnum.ADMIN,
+            password_hash=hash_password(settings.ADMIN_INITIAL_PASSWORD),
+            needs_password_change=True,
+        )
+    )
+    db.flush()
+
+
+def _seed_configuracao_sistema(db: Session) -> None:
+    db.execute(
+        insert_ignorando_conflitos(db, ConfiguracaoSistema.__table__).from_select(
+            ['nome_empresa'],
+            select(literal('Empresa')).where(~select(ConfiguracaoSistema.id).exists()),
+        )
+    )
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+from datetime import UTC, datetime
+from threading import Event, Lock, Thread
+
+from fastapi import HTTPException, status
+
+from app.core.config import get_settings
+from app.services.s3_storage import ensure_bucket_exists
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class StorageStatus:
+    """Estado da verificação do bucket, feita fora do startup para não atrasar a API."""
+
+    VERIFICANDO = 'verificando'
+    PRONTO = 'pronto'
+    INDISPONIVEL = 'indisponivel'
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._parar = Event()
+        self._thread: Thread | None = None
+        self.estado = self.VERIFICANDO
+        self.tentativas = 0
+        self.ultimo_erro: str | None = None
+        self.verificado_em: datetime | None = None
+
+    @property
+    def pronto(self) -> bool:
+        return self.estado == self.PRONTO
+
+    def verificar(self) -> bool:
+        """Uma tentativa de validar/criar o bucket; atualiza o estado e retorna se ficou pronto."""
+        try:
+            ensure_bucket_exists()
+        except Exception as exc:
+            with self._lock:
+                self.tentativas += 1
+                self.ultimo_erro = str(exc) or exc.__class__.__name__
+                self.estado = self.INDISPONIVEL
+            return False
+        with self._lock:
+            self.tentativas += 1
+            self.ultimo_erro = None
+            self.estado = self.PRONTO
+            self.verificado_em = datetime.now(UTC)
+        return True
+
+    def verificar_com_backoff(self, max_tentativas: int | None = None) -> bool:
+        espera = settings.S3_BOOTSTRAP_BACKOFF_INICIAL_SECONDS
+        tentativa = 0
+        while not self._parar.is_set():
+            tentativa += 1
+            if self.verificar():
+                logger.info('Storage verificado após %s tentativa(s).', tentativa)
+                return True
+            if max_tentativas is not None and tentativa >= max_tentativas:
+                return False
+            logger.warning(
+                'Storage indisponível (tentativa %s): %s. Nova tentativa em %.0f s.',
+                tentativa,
+                self.ultimo_erro,
+                espera,
+            )
+            self._parar.wait(espera)
+            espera = min(espera * 2, settings.S3_BOOTSTRAP_BACKOFF_MAX_SECONDS)
+        return False
+
+    def iniciar_em_segundo_plano(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = Thread(target=self.verificar_com_backoff, name='storage-bootstrap', daemon=True)
+            self._thread.start()
+
+    def encerrar(self) -> None:
+        self._parar.set()
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {
+                'estado': self.estado,
+                'tentativas': self.tentativas,
+                'ultimo_erro': self.ultimo_erro,
+                'verificado_em': self.verificado_em,
+            }
+
+
+storage_status = StorageStatus()
+
+
+def exigir_storage_pronto() -> None:
+    """Dependência das rotas de upload: responde 503 imediatamente enquanto o bucket não foi verificado."""
+    if storage_status.pronto:
+        return
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail='Armazenamento de arquivos ainda não verificado. Tente novamente em instantes.',
+        headers={'Retry-After': str(int(settings.S3_BOOTSTRAP_BACKOFF_INICIAL_SECONDS) or 1)},
+    )
@@ -0,0 +1,58 @@
+from sqlalchemy import func, literal, select, true, union_all
+from sqlalchemy.orm import Session
+
+from app.db.bulk import insert_ignorando_conflitos
+from app.models.fsc import EvidenceType, Indicador, StatusConformidadeEnum
+
+TIPOS_EVIDENCIA_PADRAO = [
+    ('Foto', 'Registro fotográfico de campo.'),
+    ('Mapa', 'Mapas temáticos e georreferenciados.'),
+    ('Licença/Autorização', 'Licenças, autorizações e documentos legais.'),
+    ('Procedimento', 'Procedimentos operacionais e instruções de trabalho.'),
+    ('Relatório', 'Relatórios técnicos e de auditoria.'),
+    ('Registro', 'Registros operacionais e evidências documentais.'),
+    ('Ata/Consulta', 'Atas de reunião e consultas a partes interessadas.'),
+    ('Monitoramento', 'Dados e relatórios de monitoramento.'),
+]
+
+
+def gerar_tipos_evidencia_padrao(db: Session, programa_id: int | None = None) -> int:
+    """Cria, em um único INSERT ... SELECT, os tipos padrão que faltam para cada indicador.
+
+    Não faz commit; retorna quantos tipos foram criados.
+    """
+    padrao = union_all(
+        *[
+            select(literal(nome).label('nome'), literal(descricao).label('descricao'))
+            for nome, descricao in TIPOS_EVIDENCIA_PADRAO
+        ]
+    ).subquery('padrao')
+    existente = (
+        select(EvidenceType.id)
+        .where(
+            EvidenceType.programa_id == Indicador.programa_id,
+            EvidenceType.criterio_id == Indicador.criterio_id,
+            EvidenceType.indicador_id == Indicador.id,
+            func.lower(EvidenceType.nome) == func.lower(padrao.c.nome),
+        )
+        .exists()
+    )
+    faltantes = select(
+        Indicador.programa_id,
+        Indicador.criterio_id,
+        Indicador.id,
+        padrao.c.nome,
+        padrao.c.descricao,
+        literal(StatusConformidadeEnum.conforme, EvidenceType.__table__.c.status_conformidade.type),
+    ).select_from(
+        # Produto cartesiano intencional: cada indicador recebe todos os tipos padrão.
+        Indicador.__table__.join(padrao, true())
+    ).where(~existente)
+    if programa_id is not None:
+        faltantes = faltantes.where(Indicador.programa_id == programa_id)
+
+    stmt = insert_ignorando_conflitos(db, EvidenceType.__table__).from_select(
+        ['programa_id', 'criterio_id', 'indicador_id', 'nome', 'descricao', 'status_conformidade'],
+        faltantes,
+    )
+    return db.execute(stmt).rowcount or 0
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from itertools import chain
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.db.bulk import insert_ignorando_conflitos
+from app.models.versao_tabela import VersaoTabela
+
+# Tabelas cujas alterações incrementam o contador em versoes_tabelas: só catálogos, que
+# raramente mudam. Tabelas de escrita frequente (usuarios a cada login, evidencias,
+# demandas_fsc, audit_logs, jobs) serializariam os commits na linha do contador e
+# invalidariam todos os ETags; os detalhes que as exibem usam versões restritas ao registro.
+TABELAS_VERSIONADAS = frozenset(
+    {
+        'programas_certificacao',
+        'principios',
+        'criterios',
+        'indicadores',
+        'atividades_setores_config',
+        'atividades_subatividades_config',
+    }
+)
+
+# Chave em Session.info com as tabelas versionadas alteradas na transação corrente.
+INFO_TABELAS_ALTERADAS = 'tabelas_alteradas'
+
+
+def _marcar(session: Session, tabela: str | None) -> None:
+    if tabela in TABELAS_VERSIONADAS:
+        session.info.setdefault(INFO_TABELAS_ALTERADAS, set()).add(tabela)
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_flush(session: Session, _flush_context) -> None:
+    for objeto in chain(session.new, session.dirty, session.deleted):
+        _marcar(session, getattr(objeto, '__tablename__', None))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _registrar_dml(estado: ORMExecuteState) -> None:
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        _marcar(estado.session, getattr(estado.statement.table, 'name', None))
+
+
+@event.listens_for(Session, 'before_commit')
+def _incrementar_versoes(session: Session) -> None:
+    # before_commit roda antes do flush final do commit; o flush aqui captura os pendentes.
+    session.flush()
+    tabelas = sorted(session.info.pop(INFO_TABELAS_ALTERADAS, ()))
+    if not tabelas:
+        return
+    # Mesma transação das alterações: quem lê a versão nova também enxerga os dados novos.
+    session.execute(
+        insert_ignorando_conflitos(session, VersaoTabela.__table__).values([{'tabela': tabela} for tabela in tabelas])
+    )
+    session.execute(
+        update(VersaoTabela).where(VersaoTabela.tabela.in_(tabelas)).values(versao=VersaoTabela.versao + 1)
+    )
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_alteracoes(session: Session) -> None:
+    session.info.pop(INFO_TABELAS_ALTERADAS, None)
+
+
+def obter_versoes(db: Session, *tabelas: str) -> tuple[int, ...]:
+    """Versões atuais das tabelas, na ordem pedida; tabela nunca alterada vale 0."""
+    versoes = dict(db.execute(select(VersaoTabela.tabela, VersaoTabela.versao).where(VersaoTabela.tabela.in_(tabelas))).all())
+    return tuple(versoes.get(tabela, 0) for tabela in tabelas)
@@ -1,27 +1,41 @@
-from collections.abc import Generator
+import asyncio
+import hashlib
+import io
+import re
+from collections.abc import AsyncGenerator, Generator
+from pathlib import Path
 
 import pytest
+from botocore.exceptions import ClientError
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy.pool import StaticPool
 
-from app.core.security import get_current_user
-from app.db.session import get_db
+from app.core.security import UsuarioAutenticado, get_current_principal, get_current_user
+from app.db.session import get_async_db, get_db
 from app.models import Base
 from app.models.demanda_gestao import Demanda, DemandaPrioridade, DemandaStatus
 from app.models.user import RoleEnum, User
-from app.routers import demanda_analises, demanda_gestao
+from app.routers import demanda_analises, demanda_gestao, fsc, jobs, reports
+from app.services import s3_storage
+from app.services.dashboard_cache import dashboard_cache
+from app.services.hierarquia_cache import hierarquia_cache
+from app.services.jobs import job_runner
+from app.services.principal_cache import principal_cache
+from app.services.storage_bootstrap import storage_status
 
 
 @pytest.fixture()
-def db_session() -> Generator[Session, None, None]:
-    engine = create_engine(
-        'sqlite://',
-        connect_args={'check_same_thread': False},
-        poolclass=StaticPool,
-    )
+def db_path(tmp_path: Path) -> Path:
+    # Arquivo em vez de memória para que os engines sync e async (aiosqlite) vejam o mesmo banco.
+    return tmp_path / 'test.db'
+
+
+@pytest.fixture()
+def db_session(db_path: Path) -> Generator[Session, None, None]:
+    engine = create_engine(f'sqlite:///{db_path}', connect_args={'check_same_thread': False})
     TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
     Base.metadata.create_all(bind=engine)
 
@@ -82,19 +96,129 @@ def seed_data(db_session: Session) -> dict[str, object]:
 
 
 @pytest.fixture()
-def client(db_session: Session, seed_data: dict[str, object]) -> Generator[TestClient, None, None]:
+def async_session_factory(db_path: Path) -> Generator[async_sessionmaker[AsyncSession], None, None]:
+    engine = create_async_engine(f'sqlite+aiosqlite:///{db_path}')
+    yield async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture()
+def client(
+    db_session: Session,
+    async_session_factory: async_sessionmaker[AsyncSession],
+    seed_data: dict[str, object],
+    monkeypatch: pytest.MonkeyPatch,
+) -> Generator[TestClient, None, None]:
     app = FastAPI()
     app.include_router(demanda_analises.router)
     app.include_router(demanda_gestao.router)
+    app.include_router(fsc.router)
+    app.include_router(jobs.router)
+    app.include_router(reports.router)
 
     def override_get_db() -> Generator[Session, None, None]:
         yield db_session
 
+    async def override_get_async_db() -> AsyncGenerator[AsyncSession, None]:
+        async with async_session_factory() as session:
+            yield session
+
     def override_get_current_user() -> User:
         return seed_data['admin']  # type: ignore[return-value]
 
+    def override_get_current_principal() -> UsuarioAutenticado:
+        return UsuarioAutenticado.from_user(seed_data['admin'])  # type: ignore[arg-type]
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     app.dependency_overrides[get_current_user] = override_get_current_user
+    app.dependency_overrides[get_current_principal] = override_get_current_principal
+    dashboard_cache.clear()
+    hierarquia_cache.clear()
+    principal_cache.clear()
+    monkeypatch.setattr(storage_status, 'estado', storage_status.PRONTO)
+    # Jobs rodam na própria thread do teste, com sessões ligadas ao mesmo banco SQLite em arquivo.
+    monkeypatch.setattr(job_runner, 'session_factory', sessionmaker(bind=db_session.get_bind(), expire_on_commit=False))
+    monkeypatch.setattr(job_runner, 'submeter', job_runner.executar)
 
     with TestClient(app) as test_client:
         yield test_client
+
+
+class FakeS3Client:
+    def __init__(self) -> None:
+        self.objetos: dict[str, bytes] = {}
+        self.partes: dict[str, list[bytes]] = {}
+        self.abortados: list[str] = []
+        self.politicas: dict[str, list] = {}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> dict:
+        self.objetos[Key] = bytes(Body)
+        return {'ETag': '"etag"'}
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kwargs) -> dict:
+        self.partes[Key] = []
+        return {'UploadId': f'upload-{Key}'}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes) -> dict:
+        self.partes[Key].append(bytes(Body))
+        return {'ETag': f'"parte-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict) -> dict:
+        assert [parte['PartNumber'] for parte in MultipartUpload['Parts']] == list(
+            range(1, len(self.partes[Key]) + 1)
+        )
+        self.objetos[Key] = b''.join(self.partes.pop(Key))
+        return {}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str) -> dict:
+        self.partes.pop(Key, None)
+        self.abortados.append(Key)
+        return {}
+
+    def get_object(self, Bucket: str, Key: str, Range: str | None = None, IfNoneMatch: str | None = None) -> dict:
+        conteudo = self.objetos[Key]
+        etag = f'"{hashlib.md5(conteudo).hexdigest()}"'
+        if IfNoneMatch == etag:
+            raise ClientError(
+                {'Error': {'Code': '304', 'Message': 'Not Modified'}, 'ResponseMetadata': {'HTTPStatusCode': 304}},
+                'GetObject',
+            )
+        resposta = {'ETag': etag, 'ContentType': 'application/octet-stream'}
+        if Range:
+            inicio, fim = (int(valor) for valor in re.fullmatch(r'bytes=(\d+)-(\d+)', Range).groups())
+            resposta['ContentRange'] = f'bytes {inicio}-{fim}/{len(conteudo)}'
+            conteudo = conteudo[inicio : fim + 1]
+        resposta['ContentLength'] = len(conteudo)
+        resposta['Body'] = FakeStreamingBody(conteudo)
+        return resposta
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        if Key not in self.objetos:
+            raise ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, 'HeadObject')
+        conteudo = self.objetos[Key]
+        return {'ContentLength': len(conteudo), 'ContentType': 'application/pdf', 'ETag': '"etag"'}
+
+    def delete_object(self, Bucket: str, Key: str) -> dict:
+        self.objetos.pop(Key, None)
+        return {}
+
+    def generate_presigned_post(self, Bucket: str, Key: str, Fields: dict, Conditions: list, ExpiresIn: int) -> dict:
+        self.politicas[Key] = Conditions
+        return {'url': f'http://s3.local/{Bucket}', 'fields': {**Fields, 'key': Key, 'policy': 'assinada'}}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: dict, ExpiresIn: int) -> str:
+        return f"http://s3.local/{Params['Bucket']}/{Params['Key']}?assinatura=ok"
+
+
+class FakeStreamingBody(io.BytesIO):
+    def iter_chunks(self, chunk_size: int):
+        while chunk := self.read(chunk_size):
+            yield chunk
+
+
+@pytest.fixture()
+def fake_s3(monkeypatch: pytest.MonkeyPatch) -> FakeS3Client:
+    client = FakeS3Client()
+    monkeypatch.setattr(s3_storage, 'get_s3_client', lambda: client)
+    return client
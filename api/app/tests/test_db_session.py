@@ -0,0 +1,66 @@
+from unittest.mock import MagicMock
+
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
+
+from app.db import session as db_session_module
+from app.db.session import (
+    _aplicar_timeouts,
+    _aplicar_timeouts_na_transacao,
+    _opcoes_pool,
+    criar_engine,
+    estatisticas_pool,
+)
+
+
+def test_criar_engine_aplica_configuracoes_do_pool(monkeypatch):
+    monkeypatch.setattr(db_session_module.settings, 'DB_POOL_SIZE', 3)
+    monkeypatch.setattr(db_session_module.settings, 'DB_MAX_OVERFLOW', 2)
+
+    engine = criar_engine('postgresql+psycopg://u:p@localhost:5432/db')
+
+    assert estatisticas_pool(engine) == {
+        'tipo': 'QueuePool',
+        'tamanho': 3,
+        'max_overflow': 2,
+        'em_uso': 0,
+        'ociosas': 0,
+        'overflow': -3,
+        'timeout_segundos': db_session_module.settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
+
+def test_criar_engine_com_nullpool(monkeypatch):
+    monkeypatch.setattr(db_session_module.settings, 'DB_USE_NULLPOOL', True)
+
+    engine = criar_engine('postgresql+psycopg://u:p@localhost:5432/db')
+
+    assert estatisticas_pool(engine) == {'tipo': 'NullPool'}
+    assert _opcoes_pool(NullPool)['connect_args'] == {'prepare_threshold': None}
+    # Atrás do pooler em modo transação os timeouts são por transação, nunca SET de sessão.
+    assert event.contains(engine, 'begin', _aplicar_timeouts_na_transacao)
+    assert not event.contains(engine, 'connect', _aplicar_timeouts)
+
+
+def test_timeouts_sao_aplicados_em_cada_conexao_nova(monkeypatch):
+    monkeypatch.setattr(db_session_module.settings, 'DB_STATEMENT_TIMEOUT_MS', 5000)
+    monkeypatch.setattr(db_session_module.settings, 'DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', 0)
+    conexao = MagicMock()
+
+    _aplicar_timeouts(conexao, None)
+
+    conexao.cursor.return_value.execute.assert_called_once_with('SET statement_timeout = 5000')
+    conexao.commit.assert_called_once()
+
+
+def test_timeouts_por_transacao_usam_set_config_local(monkeypatch):
+    monkeypatch.setattr(db_session_module.settings, 'DB_STATEMENT_TIMEOUT_MS', 5000)
+    monkeypatch.setattr(db_session_module.settings, 'DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', 60000)
+    conexao = MagicMock()
+
+    _aplicar_timeouts_na_transacao(conexao)
+
+    conexao.exec_driver_sql.assert_called_once_with(
+        "SELECT set_config('statement_timeout', '5000', true), "
+        "set_config('idle_in_transaction_session_timeout', '60000', true)"
+    )
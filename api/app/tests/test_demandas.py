@@ -1,8 +1,23 @@
+import hashlib
+from datetime import date, datetime, timedelta
+
 import pytest
+from botocore.exceptions import ClientError
 from fastapi.testclient import TestClient
 from pydantic import ValidationError
-
-from app.models.demanda_gestao import DemandaAnaliseMetodo, DemandaAnaliseStatus
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.models.demanda_gestao import (
+    Demanda,
+    DemandaAnaliseMetodo,
+    DemandaAnaliseStatus,
+    DemandaPrioridade,
+    DemandaStatus,
+)
+from app.routers import demanda_gestao
+from app.routers.demanda_gestao import _aplicar_busca
 from app.schemas.demanda_gestao import DemandaAnaliseCreate
 from app.services.demand_analysis import (
     calculate_gut_score,
@@ -11,6 +26,8 @@ from app.services.demand_analysis import (
     enrich_field_map,
     validate_analysis_payload,
 )
+from app.services.storage_bootstrap import storage_status
+from app.tests.conftest import FakeS3Client
 
 
 def test_criar_analise_schema_aceita_gut():
@@ -237,3 +254,354 @@ def test_criar_subdemanda_vinculada_e_listar_na_demanda_pai(client: TestClient,
     subdemandas = subdemands_response.json()
     assert len(subdemandas) == 1
     assert subdemandas[0]['parent_demanda_id'] == demanda_pai.id
+
+
+def test_listar_demandas_paginacao_por_cursor(
+    client: TestClient, db_session: Session, seed_data: dict[str, object]
+):
+    base = datetime(2026, 1, 1, 8, 0, 0)
+    seed_data['demanda'].criado_em = base - timedelta(days=1)
+    for indice in range(4):
+        db_session.add(
+            Demanda(
+                codigo=f'DEM-PAG-{indice}',
+                titulo=f'Demanda paginada {indice}',
+                criado_em=base + timedelta(hours=indice),
+            )
+        )
+    db_session.commit()
+
+    primeira = client.get('/api/gestao-demandas', params={'limit': 2})
+    assert primeira.status_code == 200
+    primeira_body = primeira.json()
+    assert [item['codigo'] for item in primeira_body['itens']] == ['DEM-PAG-3', 'DEM-PAG-2']
+    assert primeira_body['next_cursor']
+
+    segunda = client.get('/api/gestao-demandas', params={'limit': 2, 'cursor': primeira_body['next_cursor']})
+    segunda_body = segunda.json()
+    assert [item['codigo'] for item in segunda_body['itens']] == ['DEM-PAG-1', 'DEM-PAG-0']
+
+    terceira = client.get('/api/gestao-demandas', params={'limit': 2, 'cursor': segunda_body['next_cursor']})
+    terceira_body = terceira.json()
+    assert [item['codigo'] for item in terceira_body['itens']] == ['DEM-TESTE']
+    assert terceira_body['next_cursor'] is None
+
+    invalido = client.get('/api/gestao-demandas', params={'cursor': 'nao-e-um-cursor'})
+    assert invalido.status_code == 400
+
+
+def test_busca_no_sqlite_usa_ilike_com_curingas_escapados(client: TestClient, db_session: Session):
+    db_session.add_all(
+        [
+            Demanda(codigo='DEM-BUSCA-1', titulo='Reduzir perdas em 50%'),
+            Demanda(codigo='DEM-BUSCA-2', titulo='Reduzir perdas em 500 unidades'),
+            Demanda(codigo='DEM-BUSCA-3', titulo='Outra', descricao='Inventario de perdas'),
+        ]
+    )
+    db_session.commit()
+
+    response = client.get('/api/gestao-demandas', params={'busca': '50%'})
+    assert [item['codigo'] for item in response.json()] == ['DEM-BUSCA-1']
+
+    response = client.get('/api/gestao-demandas', params={'busca': 'PERDAS'})
+    assert {item['codigo'] for item in response.json()} == {'DEM-BUSCA-1', 'DEM-BUSCA-2', 'DEM-BUSCA-3'}
+
+
+def test_busca_no_postgresql_usa_tsvector_e_ranking():
+    query, relevancia = _aplicar_busca(select(Demanda.id), 'manutenção', 'postgresql')
+    sql = str(query.add_columns(relevancia).compile(dialect=postgresql.dialect()))
+
+    assert 'demandas.busca_vetor @@ websearch_to_tsquery' in sql
+    assert 'ts_rank_cd(demandas.busca_vetor' in sql
+    assert 'demandas.descricao' not in sql
+
+
+def test_dashboard_resumo_agrega_metricas_em_uma_consulta(
+    client: TestClient, db_session: Session, seed_data: dict[str, object]
+):
+    hoje = date.today()
+    responsavel = seed_data['responsavel']
+    db_session.add_all(
+        [
+            Demanda(
+                codigo='DEM-ATRASO',
+                titulo='Atrasada',
+                responsavel_id=responsavel.id,
+                prioridade=DemandaPrioridade.alta,
+                status=DemandaStatus.em_execucao,
+                prazo=hoje - timedelta(days=3),
+            ),
+            Demanda(
+                codigo='DEM-OK',
+                titulo='Concluida no prazo',
+                responsavel_id=responsavel.id,
+                status=DemandaStatus.concluida,
+                data_abertura=hoje - timedelta(days=4),
+                data_conclusao=hoje,
+                prazo=hoje + timedelta(days=1),
+            ),
+            Demanda(
+                codigo='DEM-LATE',
+                titulo='Concluida fora do prazo',
+                status=DemandaStatus.concluida,
+                data_abertura=hoje - timedelta(days=2),
+                data_conclusao=hoje,
+                prazo=hoje - timedelta(days=1),
+            ),
+        ]
+    )
+    db_session.commit()
+
+    response = client.get('/api/gestao-demandas/dashboard/resumo')
+    assert response.status_code == 200
+    body = response.json()
+    assert body['total_abertas'] == 2
+    assert body['total_atrasadas'] == 1
+    assert body['total_concluidas_mes'] == 2
+    assert body['sla_cumprido_percentual'] == 50.0
+    assert body['tempo_medio_conclusao'] == 3.0
+    assert {item['label']: item['valor'] for item in body['total_por_status']} == {
+        'nova': 1,
+        'em_execucao': 1,
+        'concluida': 2,
+    }
+    assert {item['label']: item['valor'] for item in body['total_por_prioridade']} == {'media': 3, 'alta': 1}
+    assert body['total_por_responsavel'] == [{'label': 'Responsavel', 'valor': 3}]
+
+
+def test_dashboard_resumo_usa_snapshot_ate_alteracao_de_demanda(client: TestClient):
+    primeira = client.get('/api/gestao-demandas/dashboard/resumo')
+    assert primeira.json()['total_abertas'] == 1
+
+    repetida = client.get('/api/gestao-demandas/dashboard/resumo')
+    assert repetida.json() == primeira.json()
+
+    stats = client.get('/api/gestao-demandas/dashboard/cache').json()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+    criada = client.post('/api/gestao-demandas', json={'titulo': 'Nova demanda'})
+    assert criada.status_code == 201
+
+    apos_criacao = client.get('/api/gestao-demandas/dashboard/resumo')
+    assert apos_criacao.json()['total_abertas'] == 2
+    assert client.get('/api/gestao-demandas/dashboard/cache').json()['invalidacoes'] == 1
+
+
+def test_home_consulta_pelo_caminho_async(client: TestClient, db_session: Session, seed_data: dict[str, object]):
+    db_session.add(
+        Demanda(
+            codigo='DEM-HOME',
+            titulo='Atrasada do admin',
+            responsavel_id=seed_data['admin'].id,
+            status=DemandaStatus.em_execucao,
+            prazo=date.today() - timedelta(days=2),
+        )
+    )
+    db_session.commit()
+
+    response = client.get('/api/gestao-demandas/dashboard/home')
+    assert response.status_code == 200
+    body = response.json()
+    assert body['resumo']['total_atrasadas'] == 1
+    assert [item['codigo'] for item in body['atrasadas']] == ['DEM-HOME']
+    assert body['atrasadas'][0]['atraso'] == 2
+    assert [item['codigo'] for item in body['minhas_demandas']] == ['DEM-HOME']
+    assert body['minhas_demandas'][0]['responsavel_nome'] == 'Administrador'
+    assert {item['codigo'] for item in body['recentes']} == {'DEM-HOME', 'DEM-TESTE'}
+
+
+def test_upload_anexo_envia_em_streaming_e_registra_checksum(
+    client: TestClient, fake_s3: FakeS3Client, seed_data: dict[str, object]
+):
+    demanda = seed_data['demanda']
+    conteudo = b'%PDF-1.4 conteudo do anexo'
+
+    response = client.post(
+        f'/api/gestao-demandas/{demanda.id}/anexos',
+        files={'file': ('relatorio.pdf', conteudo, 'application/pdf')},
+        data={'observacoes': 'Versao final'},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body['tamanho'] == len(conteudo)
+    assert body['checksum_sha256'] == hashlib.sha256(conteudo).hexdigest()
+    assert fake_s3.objetos[body['storage_key']] == conteudo
+
+    bloqueado = client.post(
+        f'/api/gestao-demandas/{demanda.id}/anexos',
+        files={'file': ('script.exe', b'MZ', 'application/octet-stream')},
+    )
+    assert bloqueado.status_code == 400
+
+
+def test_upload_anexo_responde_503_enquanto_storage_nao_verificado(
+    client: TestClient,
+    fake_s3: FakeS3Client,
+    seed_data: dict[str, object],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(storage_status, 'estado', storage_status.VERIFICANDO)
+
+    response = client.post(
+        f"/api/gestao-demandas/{seed_data['demanda'].id}/anexos",
+        files={'file': ('relatorio.pdf', b'%PDF-1.4', 'application/pdf')},
+    )
+
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+    assert fake_s3.objetos == {}
+
+
+def test_download_anexo_em_streaming_com_range_e_etag(
+    client: TestClient, fake_s3: FakeS3Client, seed_data: dict[str, object]
+):
+    demanda = seed_data['demanda']
+    conteudo = b'0123456789' * 10
+    anexo = client.post(
+        f'/api/gestao-demandas/{demanda.id}/anexos',
+        files={'file': ('video.mp4', conteudo, 'video/mp4')},
+    ).json()
+    url = f"/api/gestao-demandas/{demanda.id}/anexos/{anexo['id']}/download"
+
+    completo = client.get(url)
+    assert completo.status_code == 200
+    assert completo.content == conteudo
+    assert completo.headers['content-length'] == str(len(conteudo))
+    assert completo.headers['accept-ranges'] == 'bytes'
+    etag = completo.headers['etag']
+
+    parcial = client.get(url, headers={'Range': 'bytes=10-19'})
+    assert parcial.status_code == 206
+    assert parcial.content == conteudo[10:20]
+    assert parcial.headers['content-range'] == f'bytes 10-19/{len(conteudo)}'
+
+    nao_modificado = client.get(url, headers={'If-None-Match': etag})
+    assert nao_modificado.status_code == 304
+    assert nao_modificado.content == b''
+
+
+def test_upload_direto_s3_com_url_pre_assinada_e_finalizacao(
+    client: TestClient, fake_s3: FakeS3Client, seed_data: dict[str, object]
+):
+    demanda = seed_data['demanda']
+
+    presign = client.post(
+        f'/api/gestao-demandas/{demanda.id}/anexos/presign',
+        json={'nome_arquivo': 'laudo.pdf', 'content_type': 'application/pdf', 'tamanho': 2048},
+    )
+    assert presign.status_code == 200
+    presign_body = presign.json()
+    storage_key = presign_body['storage_key']
+    assert presign_body['fields']['key'] == storage_key
+    assert ['content-length-range', 1, 50 * 1024 * 1024] in fake_s3.politicas[storage_key]
+
+    sem_arquivo = client.post(
+        f'/api/gestao-demandas/{demanda.id}/anexos/finalizar',
+        json={'storage_key': storage_key, 'nome_arquivo': 'laudo.pdf'},
+    )
+    assert sem_arquivo.status_code == 404
+
+    fake_s3.objetos[storage_key] = b'x' * 2048
+    finalizado = client.post(
+        f'/api/gestao-demandas/{demanda.id}/anexos/finalizar',
+        json={'storage_key': storage_key, 'nome_arquivo': 'laudo.pdf', 'observacoes': 'Direto no S3'},
+    )
+    assert finalizado.status_code == 200
+    anexo = finalizado.json()
+    assert anexo['tamanho'] == 2048
+    assert anexo['storage_key'] == storage_key
+
+    duplicado = client.post(
+        f'/api/gestao-demandas/{demanda.id}/anexos/finalizar',
+        json={'storage_key': storage_key, 'nome_arquivo': 'laudo.pdf'},
+    )
+    assert duplicado.status_code == 409
+
+    outra_demanda = client.post(
+        f'/api/gestao-demandas/{demanda.id}/anexos/finalizar',
+        json={'storage_key': 'demandas/999/arquivo.pdf', 'nome_arquivo': 'arquivo.pdf'},
+    )
+    assert outra_demanda.status_code == 400
+
+    download = client.get(
+        f"/api/gestao-demandas/{demanda.id}/anexos/{anexo['id']}/download-url", follow_redirects=False
+    )
+    assert download.status_code == 307
+    assert download.headers['location'].startswith(f'http://s3.local/demandas-anexos/{storage_key}')
+
+
+def test_finalizar_upload_anexo_valida_a_extensao_do_objeto_gravado(
+    client: TestClient, fake_s3: FakeS3Client, seed_data: dict[str, object]
+):
+    demanda = seed_data['demanda']
+    storage_key = f'demandas/{demanda.id}/1_script.exe'
+    fake_s3.objetos[storage_key] = b'MZ'
+
+    response = client.post(
+        f'/api/gestao-demandas/{demanda.id}/anexos/finalizar',
+        json={'storage_key': storage_key, 'nome_arquivo': 'laudo.pdf'},
+    )
+
+    assert response.status_code == 400
+    assert storage_key not in fake_s3.objetos
+
+
+def test_finalizar_upload_anexo_responde_502_quando_o_s3_falha(
+    client: TestClient, fake_s3: FakeS3Client, seed_data: dict[str, object], monkeypatch: pytest.MonkeyPatch
+):
+    def head_indisponivel(Bucket: str, Key: str) -> dict:
+        raise ClientError({'Error': {'Code': '500', 'Message': 'Internal Error'}}, 'HeadObject')
+
+    monkeypatch.setattr(fake_s3, 'head_object', head_indisponivel)
+    demanda = seed_data['demanda']
+    response = client.post(
+        f'/api/gestao-demandas/{demanda.id}/anexos/finalizar',
+        json={'storage_key': f'demandas/{demanda.id}/1_laudo.pdf', 'nome_arquivo': 'laudo.pdf'},
+    )
+
+    assert response.status_code == 502
+
+
+def test_detalhe_da_demanda_responde_304_ate_mudar_subdemanda_ou_usuario(
+    client: TestClient, db_session: Session, seed_data: dict[str, object]
+):
+    demanda_pai = seed_data['demanda']
+    url = f'/api/gestao-demandas/{demanda_pai.id}'
+
+    primeira = client.get(url)
+    etag = primeira.headers['etag']
+    assert etag.startswith('W/"')
+
+    nao_modificada = client.get(url, headers={'If-None-Match': etag})
+    assert nao_modificada.status_code == 304
+    assert nao_modificada.content == b''
+
+    criada = client.post('/api/gestao-demandas', json={'titulo': 'Subdemanda nova', 'parent_demanda_id': demanda_pai.id})
+    assert criada.status_code == 201
+    # O client de teste reaproveita a mesma sessão entre requisições; em produção cada uma abre a sua.
+    db_session.expire_all()
+    com_subdemanda = client.get(url, headers={'If-None-Match': etag})
+    assert com_subdemanda.status_code == 200
+    assert len(com_subdemanda.json()['subdemandas']) == 1
+
+    seed_data['responsavel'].nome = 'Responsavel Renomeado'
+    db_session.commit()
+    renomeada = client.get(url, headers={'If-None-Match': com_subdemanda.headers['etag']})
+    assert renomeada.status_code == 200
+    assert renomeada.json()['responsavel_nome'] == 'Responsavel Renomeado'
+
+
+def test_etag_do_detalhe_da_demanda_muda_com_o_dia(
+    client: TestClient, seed_data: dict[str, object], monkeypatch: pytest.MonkeyPatch
+):
+    url = f"/api/gestao-demandas/{seed_data['demanda'].id}"
+    etag = client.get(url).headers['etag']
+
+    class Amanha(date):
+        @classmethod
+        def today(cls) -> date:
+            return date.fromordinal(date.today().toordinal() + 1)
+
+    monkeypatch.setattr(demanda_gestao, 'date', Amanha)
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
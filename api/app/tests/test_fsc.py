@@ -0,0 +1,406 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from botocore.exceptions import ClientError
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.busca import sanitizar_trecho
+from app.models.auditlog import AuditLog
+from app.models.fsc import (
+    AuditoriaAno,
+    AvaliacaoIndicador,
+    Criterio,
+    DocumentoEvidencia,
+    Evidencia,
+    EvidenciaKindEnum,
+    Indicador,
+    Principio,
+    ProgramaCertificacao,
+    StatusConformidadeEnum,
+)
+from app.models.job import Job, JobStatusEnum
+from app.models.versao_tabela import VersaoTabela
+from app.services.hierarquia_cache import hierarquia_cache
+from app.services.job_handlers import TIPO_GERAR_AVALIACOES
+from app.services.jobs import job_runner
+from app.tests.conftest import FakeS3Client
+
+
+def _criar_auditoria_com_indicadores(db_session: Session, total: int) -> AuditoriaAno:
+    programa = ProgramaCertificacao(codigo='FSC', nome='FSC')
+    db_session.add(programa)
+    db_session.flush()
+    principio = Principio(programa_id=programa.id, codigo='P1', titulo='Principio 1')
+    db_session.add(principio)
+    db_session.flush()
+    criterio = Criterio(programa_id=programa.id, principio_id=principio.id, codigo='C1.1', titulo='Criterio 1.1')
+    db_session.add(criterio)
+    db_session.flush()
+    db_session.add_all(
+        [
+            Indicador(programa_id=programa.id, criterio_id=criterio.id, codigo=f'I1.1.{n}', titulo=f'Indicador {n}')
+            for n in range(1, total + 1)
+        ]
+    )
+    auditoria = AuditoriaAno(programa_id=programa.id, year=2026)
+    db_session.add(auditoria)
+    db_session.commit()
+    return auditoria
+
+
+def _criar_avaliacao(db_session: Session) -> AvaliacaoIndicador:
+    auditoria = _criar_auditoria_com_indicadores(db_session, total=1)
+    avaliacao = AvaliacaoIndicador(
+        programa_id=auditoria.programa_id,
+        indicator_id=db_session.scalar(select(Indicador.id)),
+        auditoria_ano_id=auditoria.id,
+        status_conformidade=StatusConformidadeEnum.conforme,
+    )
+    db_session.add(avaliacao)
+    db_session.commit()
+    return avaliacao
+
+
+def test_gerar_avaliacoes_cria_apenas_faltantes_com_log_em_lote(client: TestClient, db_session: Session):
+    auditoria = _criar_auditoria_com_indicadores(db_session, total=5)
+    indicador = db_session.scalar(select(Indicador).order_by(Indicador.id))
+
+    db_session.add(
+        AvaliacaoIndicador(
+            programa_id=auditoria.programa_id,
+            indicator_id=indicador.id,
+            auditoria_ano_id=auditoria.id,
+            status_conformidade=StatusConformidadeEnum.nc_menor,
+        )
+    )
+    db_session.commit()
+
+    response = client.post(f'/api/auditorias/{auditoria.id}/gerar-avaliacoes')
+    assert response.status_code == 202
+    job = client.get(f"/api/jobs/{response.json()['id']}").json()
+    assert job['status'] == 'concluido'
+    assert job['progresso'] == 100
+    assert job['resultado']['criadas'] == 4
+
+    avaliacoes = db_session.scalars(
+        select(AvaliacaoIndicador).where(AvaliacaoIndicador.auditoria_ano_id == auditoria.id)
+    ).all()
+    assert len(avaliacoes) == 5
+    logs = db_session.scalars(select(AuditLog).where(AuditLog.entidade == 'avaliacao')).all()
+    assert len(logs) == 4
+    assert {log.entidade_id for log in logs} == {a.id for a in avaliacoes if a.indicator_id != indicador.id}
+    assert all(log.new_value['status_conformidade'] == 'conforme' for log in logs)
+
+    repetida = client.post(f'/api/auditorias/{auditoria.id}/gerar-avaliacoes')
+    assert client.get(f"/api/jobs/{repetida.json()['id']}").json()['resultado']['criadas'] == 0
+    assert db_session.scalar(select(func.count()).select_from(AvaliacaoIndicador)) == 5
+
+
+def test_gerar_avaliacoes_reaproveita_job_com_mesma_idempotency_key(client: TestClient, db_session: Session):
+    auditoria = _criar_auditoria_com_indicadores(db_session, total=2)
+    headers = {'Idempotency-Key': 'gerar-2026'}
+
+    primeira = client.post(f'/api/auditorias/{auditoria.id}/gerar-avaliacoes', headers=headers)
+    segunda = client.post(f'/api/auditorias/{auditoria.id}/gerar-avaliacoes', headers=headers)
+
+    assert primeira.status_code == segunda.status_code == 202
+    assert primeira.json()['id'] == segunda.json()['id']
+    assert db_session.scalar(select(func.count()).select_from(Job)) == 1
+
+    conflito = client.post('/api/tipos-evidencia/gerar-padrao', headers=headers)
+    assert conflito.status_code == 409
+
+
+def test_recuperar_reenfileira_jobs_interrompidos(client: TestClient, db_session: Session):
+    auditoria = _criar_auditoria_com_indicadores(db_session, total=3)
+    interrompido = Job(
+        tipo=TIPO_GERAR_AVALIACOES,
+        parametros={'auditoria_id': auditoria.id},
+        status=JobStatusEnum.executando,
+        tentativas=1,
+    )
+    esgotado = Job(
+        tipo=TIPO_GERAR_AVALIACOES,
+        parametros={'auditoria_id': auditoria.id},
+        status=JobStatusEnum.executando,
+        tentativas=job_runner.max_tentativas,
+        heartbeat_at=datetime.now(timezone.utc) - timedelta(seconds=job_runner.heartbeat_timeout_segundos + 1),
+    )
+    # Heartbeat recente: outra instância (deploy com sobreposição) ainda está executando.
+    em_andamento = Job(
+        tipo=TIPO_GERAR_AVALIACOES,
+        parametros={'auditoria_id': auditoria.id},
+        status=JobStatusEnum.executando,
+        tentativas=1,
+        started_at=datetime.now(timezone.utc) - timedelta(hours=1),
+        heartbeat_at=datetime.now(timezone.utc),
+    )
+    db_session.add_all([interrompido, esgotado, em_andamento])
+    db_session.commit()
+
+    assert job_runner.recuperar() == 1
+
+    db_session.expire_all()
+    assert interrompido.status == JobStatusEnum.concluido
+    assert interrompido.resultado['criadas'] == 3
+    assert esgotado.status == JobStatusEnum.falhou
+    assert em_andamento.status == JobStatusEnum.executando
+    assert em_andamento.tentativas == 1
+
+
+def test_busca_documentos_evidencia_retorna_trecho_destacado_e_escapado(
+    client: TestClient, db_session: Session, seed_data: dict[str, object]
+):
+    auditoria = _criar_auditoria_com_indicadores(db_session, total=1)
+    indicador = db_session.scalar(select(Indicador))
+    avaliacao = AvaliacaoIndicador(
+        programa_id=auditoria.programa_id,
+        indicator_id=indicador.id,
+        auditoria_ano_id=auditoria.id,
+        status_conformidade=StatusConformidadeEnum.conforme,
+    )
+    db_session.add(avaliacao)
+    db_session.flush()
+    evidencia = Evidencia(
+        programa_id=auditoria.programa_id,
+        avaliacao_id=avaliacao.id,
+        kind=EvidenciaKindEnum.texto,
+        url_or_path='-',
+        created_by=seed_data['admin'].id,
+    )
+    db_session.add(evidencia)
+    db_session.flush()
+    comum = {
+        'programa_id': auditoria.programa_id,
+        'auditoria_ano_id': auditoria.id,
+        'evidencia_id': evidencia.id,
+        'created_by': seed_data['admin'].id,
+    }
+    db_session.add_all(
+        [
+            DocumentoEvidencia(titulo='Plano de manejo', conteudo='Registro <b>anual</b> do monitoramento 100%', **comum),
+            DocumentoEvidencia(titulo='Relatorio de fauna', conteudo='Sem relacao', **comum),
+        ]
+    )
+    db_session.commit()
+
+    response = client.get('/api/documentos-evidencia', params={'q': 'MONITORAMENTO'})
+    assert response.status_code == 200
+    documentos = response.json()
+    assert [doc['titulo'] for doc in documentos] == ['Plano de manejo']
+    assert documentos[0]['trecho'] == 'Registro &lt;b&gt;anual&lt;/b&gt; do <mark>monitoramento</mark> 100%'
+
+    assert [doc['titulo'] for doc in client.get('/api/documentos-evidencia', params={'q': '0%'}).json()] == [
+        'Plano de manejo'
+    ]
+    assert all(doc['trecho'] is None for doc in client.get('/api/documentos-evidencia').json())
+
+    # A busca é paginada: o trecho só é montado para os documentos da página.
+    pagina = [client.get('/api/documentos-evidencia', params={'q': ' de ', 'limit': 1, 'offset': n}).json() for n in (0, 1, 2)]
+    assert [len(documentos) for documentos in pagina] == [1, 1, 0]
+    assert pagina[0][0]['id'] != pagina[1][0]['id']
+
+
+def test_trecho_do_postgresql_mantem_so_as_marcas_de_destaque():
+    assert sanitizar_trecho('<script>x</script> do <mark>manejo</mark>') == (
+        '&lt;script&gt;x&lt;/script&gt; do <mark>manejo</mark>'
+    )
+    assert sanitizar_trecho('') is None
+
+
+def test_catalogo_de_principios_usa_etag_versionado(client: TestClient, db_session: Session):
+    programa = ProgramaCertificacao(codigo='FSC', nome='FSC')
+    db_session.add(programa)
+    db_session.commit()
+
+    primeira = client.get('/api/principios')
+    etag = primeira.headers['etag']
+    assert primeira.json() == []
+    assert primeira.headers['cache-control'] == 'private, no-cache'
+    assert client.get('/api/principios', headers={'If-None-Match': f'"outro", {etag}'}).status_code == 304
+
+    criado = client.post('/api/principios', json={'programa_id': programa.id, 'codigo': 'P1', 'titulo': 'Principio 1'})
+    assert criado.status_code == 201
+
+    depois = client.get('/api/principios', headers={'If-None-Match': etag})
+    assert depois.status_code == 200
+    assert [item['codigo'] for item in depois.json()] == ['P1']
+    assert depois.headers['etag'] != etag
+    # Outro catálogo não é afetado pela escrita em princípios.
+    programas = client.get('/api/programas-certificacao')
+    assert client.get('/api/programas-certificacao', headers={'If-None-Match': programas.headers['etag']}).status_code == 304
+
+
+def test_hierarquia_do_programa_vem_do_cache_ate_mudar_indicador(client: TestClient, db_session: Session):
+    auditoria = _criar_auditoria_com_indicadores(db_session, 2)
+    programa_id = auditoria.programa_id
+    criterio = db_session.scalar(select(Criterio))
+    indicador = db_session.scalar(select(Indicador).order_by(Indicador.id))
+    avaliacao = AvaliacaoIndicador(
+        programa_id=programa_id,
+        indicator_id=indicador.id,
+        auditoria_ano_id=auditoria.id,
+        status_conformidade=StatusConformidadeEnum.nc_menor,
+    )
+    db_session.add(avaliacao)
+    db_session.commit()
+
+    arvore = client.get(f'/api/programas-certificacao/{programa_id}/hierarquia').json()
+    [principio] = arvore['principios']
+    assert principio['principio']['codigo'] == 'P1'
+    assert [item['codigo'] for item in principio['criterios'][0]['indicadores']] == ['I1.1.1', 'I1.1.2']
+
+    detalhe = client.get(f'/api/avaliacoes/{avaliacao.id}/detalhe').json()
+    assert (detalhe['indicador']['codigo'], detalhe['criterio']['codigo'], detalhe['principio']['codigo']) == (
+        'I1.1.1',
+        'C1.1',
+        'P1',
+    )
+    assert client.get(f'/api/indicadores?programa_id={programa_id}&criterio_id={criterio.id}').status_code == 200
+    assert hierarquia_cache.stats()['misses'] == 1
+    assert hierarquia_cache.stats()['hits'] == 2
+
+    criado = client.post(
+        '/api/indicadores',
+        json={'programa_id': programa_id, 'criterio_id': criterio.id, 'codigo': 'I1.1.3', 'titulo': 'Indicador 3'},
+    )
+    assert criado.status_code == 201
+    indicadores = client.get(f'/api/indicadores?programa_id={programa_id}').json()
+    assert [item['codigo'] for item in indicadores] == ['I1.1.1', 'I1.1.2', 'I1.1.3']
+    assert hierarquia_cache.stats()['invalidacoes'] == 1
+    assert client.get('/api/programas-certificacao/999/hierarquia').status_code == 404
+
+
+def test_caminho_do_indicador_ignora_pai_de_outro_programa(db_session: Session):
+    hierarquia_cache.clear()
+    auditoria = _criar_auditoria_com_indicadores(db_session, 1)
+    outro = ProgramaCertificacao(codigo='PEFC', nome='PEFC')
+    db_session.add(outro)
+    db_session.flush()
+    criterio = db_session.scalar(select(Criterio))
+    orfao = Indicador(programa_id=outro.id, criterio_id=criterio.id, codigo='X', titulo='Indicador cruzado')
+    db_session.add(orfao)
+    db_session.commit()
+
+    hierarquia = hierarquia_cache.obter(db_session, outro.id)
+    assert hierarquia.indicador(orfao.id).codigo == 'X'
+    assert hierarquia.caminho_indicador(orfao.id) is None
+    assert hierarquia.arvore() == []
+    assert hierarquia_cache.obter(db_session, auditoria.programa_id).caminho_indicador(orfao.id) is None
+
+    # Escrita fora dos endpoints (outro worker, script): a versão no banco muda e o cache remonta.
+    orfao.programa_id = auditoria.programa_id
+    db_session.commit()
+    assert hierarquia_cache.obter(db_session, auditoria.programa_id).caminho_indicador(orfao.id) is not None
+
+
+def test_etag_do_detalhe_da_avaliacao_so_muda_com_os_proprios_registros(
+    client: TestClient, db_session: Session, seed_data: dict[str, object]
+):
+    auditoria = _criar_auditoria_com_indicadores(db_session, 2)
+    avaliacoes = [
+        AvaliacaoIndicador(
+            programa_id=auditoria.programa_id,
+            indicator_id=indicador.id,
+            auditoria_ano_id=auditoria.id,
+            status_conformidade=StatusConformidadeEnum.conforme,
+        )
+        for indicador in db_session.scalars(select(Indicador).order_by(Indicador.id))
+    ]
+    db_session.add_all(avaliacoes)
+    db_session.commit()
+    url = f'/api/avaliacoes/{avaliacoes[0].id}/detalhe'
+    etag = client.get(url).headers['etag']
+
+    # Evidência de outra avaliação e escrita em usuarios (login) não mexem neste ETag nem no contador.
+    db_session.add(
+        Evidencia(
+            programa_id=auditoria.programa_id,
+            avaliacao_id=avaliacoes[1].id,
+            kind=EvidenciaKindEnum.link,
+            url_or_path='https://exemplo.org',
+            created_by=seed_data['admin'].id,
+        )
+    )
+    seed_data['admin'].failed_login_attempts = 0
+    seed_data['admin'].last_login = datetime.now(timezone.utc)
+    db_session.commit()
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert db_session.get(VersaoTabela, 'usuarios') is None
+
+    db_session.add(
+        Evidencia(
+            programa_id=auditoria.programa_id,
+            avaliacao_id=avaliacoes[0].id,
+            kind=EvidenciaKindEnum.link,
+            url_or_path='https://exemplo.org',
+            created_by=seed_data['admin'].id,
+        )
+    )
+    db_session.commit()
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_finalizar_upload_de_evidencia_responde_502_quando_o_s3_falha(
+    client: TestClient, db_session: Session, fake_s3: FakeS3Client, monkeypatch: pytest.MonkeyPatch
+):
+    avaliacao = _criar_avaliacao(db_session)
+    presign = client.post(
+        '/api/evidencias/presign',
+        json={'avaliacao_id': avaliacao.id, 'nome_arquivo': 'laudo.pdf', 'content_type': 'application/pdf', 'tamanho': 16},
+    ).json()
+    payload = {'avaliacao_id': avaliacao.id, 'storage_key': presign['storage_key']}
+
+    assert client.post('/api/evidencias/finalizar', json=payload).status_code == 404
+
+    def head_negado(Bucket: str, Key: str) -> dict:
+        raise ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'Access Denied'}}, 'HeadObject')
+
+    monkeypatch.setattr(fake_s3, 'head_object', head_negado)
+    assert client.post('/api/evidencias/finalizar', json=payload).status_code == 502
+    assert db_session.scalar(select(func.count()).select_from(Evidencia)) == 0
+
+
+def test_download_url_de_evidencia_so_redireciona_para_arquivo_no_s3(
+    client: TestClient,
+    db_session: Session,
+    seed_data: dict[str, object],
+    fake_s3: FakeS3Client,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    avaliacao = _criar_avaliacao(db_session)
+    evidencias = {
+        kind: Evidencia(
+            programa_id=avaliacao.programa_id,
+            avaliacao_id=avaliacao.id,
+            kind=kind,
+            url_or_path=url_or_path,
+            created_by=seed_data['admin'].id,
+        )
+        for kind, url_or_path in (
+            (EvidenciaKindEnum.link, 'https://externo.exemplo/phishing'),
+            (EvidenciaKindEnum.texto, 'Texto livre da evidência'),
+            (EvidenciaKindEnum.arquivo, 's3://evidencias/auditoria_1/avaliacao_1/laudo.pdf'),
+        )
+    }
+    db_session.add_all(evidencias.values())
+    db_session.commit()
+
+    def url(kind: EvidenciaKindEnum) -> str:
+        return f'/api/evidencias/{evidencias[kind].id}/download-url'
+
+    assert client.get(url(EvidenciaKindEnum.link), follow_redirects=False).status_code == 404
+    assert client.get(url(EvidenciaKindEnum.texto), follow_redirects=False).status_code == 404
+    arquivo = client.get(url(EvidenciaKindEnum.arquivo), follow_redirects=False)
+    assert arquivo.status_code == 307
+    assert arquivo.headers['location'].startswith('http://s3.local/evidencias/auditoria_1/avaliacao_1/laudo.pdf')
+
+    def assinatura_falha(ClientMethod: str, Params: dict, ExpiresIn: int) -> str:
+        raise ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'Access Denied'}}, 'GetObject')
+
+    monkeypatch.setattr(fake_s3, 'generate_presigned_url', assinatura_falha)
+    sem_assinatura = client.get(url(EvidenciaKindEnum.arquivo), follow_redirects=False)
+    assert sem_assinatura.status_code == 502
+    assert 'location' not in sem_assinatura.headers
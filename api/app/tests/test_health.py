@@ -0,0 +1,43 @@
+import time
+from threading import Event
+
+from app.services.health import HealthChecker
+
+
+def test_probe_lenta_estoura_timeout_sem_atrasar_as_demais():
+    liberar = Event()
+    checker = HealthChecker(
+        {'db': lambda: None, 's3': lambda: liberar.wait(5)},
+        ttl_seconds=0,
+        timeout_seconds=0.2,
+    )
+
+    inicio = time.perf_counter()
+    resultado = checker.verificar()
+    liberar.set()
+
+    assert time.perf_counter() - inicio < 1
+    assert resultado['db']['status'] == 'ok'
+    assert resultado['db']['latencia_ms'] < 200
+    assert resultado['s3']['status'] == 'timeout'
+
+
+def test_resultado_fica_em_cache_durante_o_ttl():
+    chamadas: list[str] = []
+
+    def probe_com_falha():
+        chamadas.append('s3')
+        raise RuntimeError('bucket inacessivel')
+
+    checker = HealthChecker({'s3': probe_com_falha}, ttl_seconds=60, timeout_seconds=1)
+
+    primeiro = checker.verificar()
+    segundo = checker.verificar()
+
+    assert primeiro is segundo
+    assert primeiro['s3'] == {'status': 'error', 'latencia_ms': primeiro['s3']['latencia_ms'], 'erro': 'bucket inacessivel'}
+    assert chamadas == ['s3']
+
+    checker.limpar_cache()
+    checker.verificar()
+    assert chamadas == ['s3', 's3']
@@ -0,0 +1,135 @@
+import sys
+from pathlib import Path
+from threading import Thread
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.session import QueuePoolMedido
+from app.models.auditlog import AcaoAuditEnum
+from app.services.audit_logger import registrar_log, registrar_logs_em_lote
+from app.services.metrics import (
+    DURACAO_REQUISICAO,
+    DURACAO_S3,
+    ESPERA_POOL_DB,
+    LOGS_AUDITORIA,
+    Contador,
+    Histograma,
+    MetricasMiddleware,
+)
+from app.tests.conftest import FakeS3Client
+
+
+def test_histograma_soma_os_shards_de_cada_thread_no_formato_prometheus():
+    histograma = Histograma('teste_seconds', 'Histograma de teste.', ('rota',), buckets=(0.1, 1.0))
+
+    def observar() -> None:
+        for _ in range(100):
+            histograma.observar(0.05, '/a')
+        histograma.observar(5.0, '/a')
+
+    threads = [Thread(target=observar) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    linhas = histograma.expor()
+    assert linhas[:2] == ['# HELP teste_seconds Histograma de teste.', '# TYPE teste_seconds histogram']
+    assert 'teste_seconds_bucket{rota="/a",le="0.1"} 400' in linhas
+    assert 'teste_seconds_bucket{rota="/a",le="1.0"} 400' in linhas
+    assert 'teste_seconds_bucket{rota="/a",le="+Inf"} 404' in linhas
+    assert 'teste_seconds_count{rota="/a"} 404' in linhas
+
+
+def test_contador_escapa_rotulos():
+    contador = Contador('teste_total', 'Contador de teste.', ('entidade',))
+    contador.incrementar('com "aspas"', valor=3)
+
+    assert contador.expor()[-1] == 'teste_total{entidade="com \\"aspas\\""} 3'
+
+
+def test_latencia_por_template_de_rota(client: TestClient, seed_data: dict[str, object]):
+    demanda_id = seed_data['demanda'].id
+    antes = DURACAO_REQUISICAO.contagem('GET', '/api/gestao-demandas/{demanda_id}')
+
+    medido = TestClient(MetricasMiddleware(client.app))
+    assert medido.get(f'/api/gestao-demandas/{demanda_id}').status_code == 200
+
+    assert DURACAO_REQUISICAO.contagem('GET', '/api/gestao-demandas/{demanda_id}') == antes + 1
+
+
+def test_operacoes_s3_das_rotas_de_anexo_sao_medidas(
+    client: TestClient, fake_s3: FakeS3Client, seed_data: dict[str, object]
+):
+    operacoes = ('upload_stream', 'get_object', 'presign_post', 'head_object', 'presign_get')
+    antes = {operacao: DURACAO_S3.contagem(operacao) for operacao in operacoes}
+    base = f"/api/gestao-demandas/{seed_data['demanda'].id}/anexos"
+
+    anexo = client.post(base, files={'file': ('relatorio.pdf', b'%PDF-1.4', 'application/pdf')}).json()
+    assert client.get(f"{base}/{anexo['id']}/download").content == b'%PDF-1.4'
+
+    presign = client.post(
+        f'{base}/presign', json={'nome_arquivo': 'laudo.pdf', 'content_type': 'application/pdf', 'tamanho': 16}
+    ).json()
+    fake_s3.objetos[presign['storage_key']] = b'x' * 16
+    direto = client.post(f'{base}/finalizar', json={'storage_key': presign['storage_key'], 'nome_arquivo': 'laudo.pdf'})
+    assert direto.status_code == 200
+    assert client.get(f"{base}/{direto.json()['id']}/download-url", follow_redirects=False).status_code == 307
+
+    assert {operacao: DURACAO_S3.contagem(operacao) - antes[operacao] for operacao in operacoes} == {
+        'upload_stream': 1,
+        'get_object': 1,
+        'presign_post': 1,
+        'head_object': 1,
+        'presign_get': 1,
+    }
+
+
+def test_logs_de_auditoria_so_contam_no_commit(db_session: Session):
+    antes = LOGS_AUDITORIA.valor('metricas')
+
+    registrar_log(db_session, 'metricas', 1, AcaoAuditEnum.CREATE, None)
+    db_session.rollback()
+    registrar_log(db_session, 'metricas', 2, AcaoAuditEnum.CREATE, None)
+    db_session.close()
+    assert LOGS_AUDITORIA.valor('metricas') == antes
+
+    registrar_log(db_session, 'metricas', 3, AcaoAuditEnum.CREATE, None)
+    registrar_logs_em_lote(db_session, 'metricas', AcaoAuditEnum.CREATE, None, [{'id': 4}, {'id': 5}])
+    db_session.commit()
+    assert LOGS_AUDITORIA.valor('metricas') == antes + 3
+
+
+def test_espera_do_pool_e_medida_no_checkout(tmp_path: Path):
+    antes = ESPERA_POOL_DB.contagem('sync')
+    engine = create_engine(f'sqlite:///{tmp_path / "pool.db"}', poolclass=QueuePoolMedido)
+
+    with engine.connect():
+        pass
+    engine.dispose()
+
+    assert ESPERA_POOL_DB.contagem('sync') == antes + 1
+
+
+def test_soma_concorrente_com_series_novas():
+    # Troca de thread frequente para a soma dos shards pegar o dict no meio de uma inserção.
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    histograma = Histograma('concorrente_seconds', 'Histograma de teste.', ('rota',))
+
+    def observar() -> None:
+        for rota in range(20000):
+            histograma.observar(0.01, f'/r{rota}')
+
+    thread = Thread(target=observar)
+    thread.start()
+    try:
+        while thread.is_alive():
+            histograma.contagem('/r0')
+    finally:
+        thread.join()
+        sys.setswitchinterval(intervalo)
+
+    assert histograma.contagem('/r19999') == 1
@@ -0,0 +1,73 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.security import UsuarioAutenticado, get_current_principal
+
+# Varredura completa da tabela de demandas, inclusive pelos aliases das subconsultas
+# (demandas_1); "SCAN demandas USING INDEX ..." é aceitável.
+SCAN_SEQUENCIAL = re.compile(r'\bSCAN demandas(?:_\d+)?\b(?! USING)')
+
+ROTAS_QUENTES = (
+    '/api/gestao-demandas?limit=20',
+    '/api/gestao-demandas?limit=20&atrasadas=true',
+    '/api/gestao-demandas/dashboard/home',
+)
+
+
+def _capturar_consultas(client: TestClient, async_session_factory: async_sessionmaker[AsyncSession]) -> list:
+    engine = async_session_factory.kw['bind'].sync_engine
+    consultas: list[tuple[str, object]] = []
+
+    def registrar(_conn, _cursor, statement, parameters, _context, _executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM demandas' in statement:
+            consultas.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', registrar)
+    try:
+        for rota in ROTAS_QUENTES:
+            assert client.get(rota).status_code == 200, rota
+    finally:
+        event.remove(engine, 'before_cursor_execute', registrar)
+    return consultas
+
+
+def _varreduras_sequenciais(db_session: Session, consultas: list) -> tuple[list[str], list[str]]:
+    conexao = db_session.connection().connection.driver_connection
+    verificadas = []
+    encontradas = []
+    for statement, parameters in consultas:
+        # O agregado do dashboard (GROUPING SETS, coluna `conjunto`) percorre a tabela de propósito.
+        if ' AS conjunto' in statement:
+            continue
+        verificadas.append(statement)
+        plano = conexao.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+        detalhes = ' | '.join(linha[-1] for linha in plano)
+        if SCAN_SEQUENCIAL.search(detalhes):
+            encontradas.append(f'{detalhes}\n  {statement}')
+    return verificadas, encontradas
+
+
+@pytest.mark.parametrize('papel', ['admin', 'responsavel', 'solicitante'])
+def test_consultas_quentes_de_demandas_usam_indice(
+    client: TestClient,
+    db_session: Session,
+    seed_data: dict[str, object],
+    async_session_factory: async_sessionmaker[AsyncSession],
+    papel: str,
+):
+    usuario = UsuarioAutenticado.from_user(seed_data[papel])  # type: ignore[arg-type]
+    client.app.dependency_overrides[get_current_principal] = lambda: usuario
+
+    consultas = _capturar_consultas(client, async_session_factory)
+
+    verificadas, encontradas = _varreduras_sequenciais(db_session, consultas)
+
+    assert encontradas == []
+    # As duas listagens de /api/gestao-demandas (com a subconsulta de total de subdemandas) e as da home.
+    assert len([statement for statement in verificadas if 'AS total_subdemandas' in statement]) == 2
+    assert len(verificadas) == len(consultas) - 1
@@ -0,0 +1,54 @@
+import logging
+from collections.abc import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.query_profiler import PerfilConsultas, PerfilConsultasMiddleware, perfil_consultas
+
+
+@pytest.fixture()
+def perf_client(client: TestClient) -> Generator[TestClient, None, None]:
+    perfil_consultas.clear()
+    yield TestClient(PerfilConsultasMiddleware(client.app))
+    perfil_consultas.clear()
+
+
+def test_server_timing_e_amostras_por_rota_sync_e_async(perf_client: TestClient):
+    resposta_async = perf_client.get('/api/gestao-demandas')
+    resposta_sync = perf_client.get('/api/principios')
+
+    assert resposta_async.status_code == 200
+    assert resposta_sync.status_code == 200
+    for resposta in (resposta_async, resposta_sync):
+        timing = resposta.headers['server-timing']
+        assert timing.startswith('db;dur=')
+        assert 'app;dur=' in timing
+        assert '"0 consultas"' not in timing
+
+    resumo = perfil_consultas.resumo()
+    assert resumo['endpoints']['GET /api/gestao-demandas']['consultas']['max'] >= 1
+    assert resumo['endpoints']['GET /api/principios']['amostras'] == 1
+    assert resumo['consultas_lentas'][0]['statement'].lstrip().upper().startswith('SELECT')
+
+
+def test_alerta_de_n_mais_1_acima_do_limite(perf_client: TestClient, caplog: pytest.LogCaptureFixture, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(perfil_consultas, 'limite_consultas', 1)
+
+    with caplog.at_level(logging.WARNING, logger='app.services.query_profiler'):
+        assert perf_client.get('/api/gestao-demandas').status_code == 200
+
+    assert perfil_consultas.resumo()['alertas_n_mais_1'] == 1
+    assert 'Possível N+1 em GET /api/gestao-demandas' in caplog.text
+
+
+def test_mantem_so_as_consultas_mais_lentas():
+    perfil = PerfilConsultas(janela=10, max_lentas=2, limite_consultas=0)
+    for duracao in (0.01, 0.05, 0.02, 0.03):
+        requisicao = perfil.iniciar()
+        requisicao.registrar(f'SELECT {duracao}', (), duracao)
+        perfil.finalizar('GET /x', requisicao, duracao)
+
+    resumo = perfil.resumo()
+    assert [entrada['statement'] for entrada in resumo['consultas_lentas']] == ['SELECT 0.05', 'SELECT 0.03']
+    assert resumo['endpoints']['GET /x']['amostras'] == 4
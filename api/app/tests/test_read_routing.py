@@ -0,0 +1,74 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.security import create_access_token, get_current_principal
+from app.db import session as db_session_module
+from app.models.demanda_gestao import Demanda
+from app.services.principal_cache import principal_cache
+from app.services.read_routing import escritas_recentes
+
+
+@pytest.fixture(autouse=True)
+def limpar_escritas():
+    escritas_recentes.clear()
+    yield
+    escritas_recentes.clear()
+
+
+def test_commit_com_escrita_marca_usuario_da_sessao(db_session: Session, seed_data: dict[str, object]):
+    principal_cache.clear()
+    admin = seed_data['admin']
+    get_current_principal(create_access_token(admin.id), db_session)
+
+    db_session.get(Demanda, seed_data['demanda'].id)
+    db_session.commit()
+    assert not escritas_recentes.recente(admin.id)
+
+    db_session.add(Demanda(codigo='DEM-ESCRITA', titulo='Nova'))
+    db_session.commit()
+    assert escritas_recentes.recente(admin.id)
+
+
+def test_rollback_descarta_escrita_pendente(db_session: Session, seed_data: dict[str, object]):
+    principal_cache.clear()
+    admin = seed_data['admin']
+    get_current_principal(create_access_token(admin.id), db_session)
+
+    db_session.add(Demanda(codigo='DEM-DESCARTADA', titulo='Descartada'))
+    db_session.flush()
+    db_session.rollback()
+    db_session.commit()
+
+    assert not escritas_recentes.recente(admin.id)
+
+
+def test_listagem_usa_replica_exceto_logo_apos_escrita_do_usuario(
+    client: TestClient,
+    seed_data: dict[str, object],
+    async_session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    sessoes_replica: list[AsyncSession] = []
+
+    def replica() -> AsyncSession:
+        sessao = async_session_factory()
+        sessoes_replica.append(sessao)
+        return sessao
+
+    monkeypatch.setattr(db_session_module, 'replica_configurada', lambda: True)
+    monkeypatch.setattr(db_session_module, 'AsyncReadSessionLocal', replica)
+
+    assert client.get('/api/gestao-demandas').status_code == 200
+    assert len(sessoes_replica) == 1
+
+    escritas_recentes.marcar(seed_data['admin'].id)
+    assert client.get('/api/gestao-demandas').status_code == 200
+    assert len(sessoes_replica) == 1
+
+
+def test_janela_zero_desativa_leitura_no_primario(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(escritas_recentes, 'janela_seconds', 0)
+    escritas_recentes.marcar(1)
+    assert not escritas_recentes.recente(1)
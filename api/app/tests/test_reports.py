@@ -0,0 +1,253 @@
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.models.fsc import (
+    AuditoriaAno,
+    AvaliacaoIndicador,
+    Criterio,
+    DemandaFSC,
+    Evidencia,
+    EvidenciaKindEnum,
+    Indicador,
+    Principio,
+    ProgramaCertificacao,
+    StatusConformidadeEnum,
+)
+from app.services.hierarquia_cache import hierarquia_cache
+
+# Os relatórios rodam pelo caminho async (AsyncSession sobre aiosqlite); estes testes pegam
+# await esquecido ou lazy load (MissingGreenlet) que o caminho síncrono não acusaria.
+AVALIADO_EM = datetime(2026, 3, 10, tzinfo=timezone.utc)
+
+
+def _criar_auditoria_avaliada(db_session: Session, seed_data: dict[str, object]) -> AuditoriaAno:
+    programa = ProgramaCertificacao(codigo='FSC', nome='FSC')
+    db_session.add(programa)
+    db_session.flush()
+    principio = Principio(programa_id=programa.id, codigo='P1', titulo='Principio 1')
+    db_session.add(principio)
+    db_session.flush()
+    criterio = Criterio(programa_id=programa.id, principio_id=principio.id, codigo='C1.1', titulo='Criterio 1.1')
+    db_session.add(criterio)
+    db_session.flush()
+    conforme = Indicador(programa_id=programa.id, criterio_id=criterio.id, codigo='I1.1.1', titulo='Indicador conforme')
+    nc = Indicador(programa_id=programa.id, criterio_id=criterio.id, codigo='I1.1.2', titulo='Indicador com NC')
+    auditoria = AuditoriaAno(programa_id=programa.id, year=2026, data_inicio=date(2026, 1, 1), data_fim=date(2026, 12, 31))
+    db_session.add_all([conforme, nc, auditoria])
+    db_session.flush()
+
+    avaliacao_conforme = AvaliacaoIndicador(
+        programa_id=programa.id,
+        indicator_id=conforme.id,
+        auditoria_ano_id=auditoria.id,
+        status_conformidade=StatusConformidadeEnum.conforme,
+        assessed_at=AVALIADO_EM,
+    )
+    avaliacao_nc = AvaliacaoIndicador(
+        programa_id=programa.id,
+        indicator_id=nc.id,
+        auditoria_ano_id=auditoria.id,
+        status_conformidade=StatusConformidadeEnum.nc_menor,
+        assessed_at=AVALIADO_EM,
+    )
+    db_session.add_all([avaliacao_conforme, avaliacao_nc])
+    db_session.flush()
+    db_session.add_all(
+        [
+            Evidencia(
+                programa_id=programa.id,
+                avaliacao_id=avaliacao_conforme.id,
+                kind=EvidenciaKindEnum.link,
+                url_or_path='https://exemplo.local/evidencia',
+                created_by=seed_data['admin'].id,
+                created_at=AVALIADO_EM,
+            ),
+            DemandaFSC(
+                programa_id=programa.id,
+                avaliacao_id=avaliacao_nc.id,
+                titulo='Corrigir NC',
+                responsavel_id=seed_data['responsavel'].id,
+                start_date=date.today() - timedelta(days=10),
+                due_date=date.today() - timedelta(days=1),
+            ),
+        ]
+    )
+    db_session.commit()
+    return auditoria
+
+
+def test_resumo_status(client: TestClient, db_session: Session, seed_data: dict[str, object]):
+    auditoria = _criar_auditoria_avaliada(db_session, seed_data)
+
+    response = client.get('/api/reports/resumo-status', params={'auditoria_id': auditoria.id})
+    assert response.status_code == 200
+    quantidades = {item['status_conformidade']: item['quantidade'] for item in response.json()}
+    assert quantidades['conforme'] == 1
+    assert quantidades['nc_menor'] == 1
+    assert quantidades['nc_maior'] == 0
+    assert client.get('/api/reports/resumo-status', params={'auditoria_id': 999}).status_code == 404
+
+
+def test_avaliacoes_sem_evidencias(client: TestClient, db_session: Session, seed_data: dict[str, object]):
+    auditoria = _criar_auditoria_avaliada(db_session, seed_data)
+
+    response = client.get('/api/reports/avaliacoes-sem-evidencias', params={'auditoria_id': auditoria.id})
+    assert response.status_code == 200
+    assert [item['indicador_titulo'] for item in response.json()] == ['Indicador com NC']
+
+
+def test_demandas_atrasadas(client: TestClient, db_session: Session, seed_data: dict[str, object]):
+    auditoria = _criar_auditoria_avaliada(db_session, seed_data)
+
+    response = client.get('/api/reports/demandas-atrasadas', params={'auditoria_id': auditoria.id})
+    assert response.status_code == 200
+    assert [item['titulo'] for item in response.json()] == ['Corrigir NC']
+
+
+def test_nc_por_principio(client: TestClient, db_session: Session, seed_data: dict[str, object]):
+    auditoria = _criar_auditoria_avaliada(db_session, seed_data)
+
+    response = client.get('/api/reports/nc-por-principio', params={'auditoria_id': auditoria.id})
+    assert response.status_code == 200
+    [item] = response.json()
+    assert item['principio_titulo'] == 'Principio 1'
+    assert (item['nc_menor'], item['nc_maior'], item['total_nc']) == (1, 0, 1)
+
+
+def _nc_por_principio_em_um_join(db_session: Session, auditoria_id: int) -> list[dict]:
+    """Consulta original do relatório, antes da hierarquia em cache, usada como referência."""
+    nc_menor = func.sum(case((AvaliacaoIndicador.status_conformidade == StatusConformidadeEnum.nc_menor, 1), else_=0))
+    nc_maior = func.sum(case((AvaliacaoIndicador.status_conformidade == StatusConformidadeEnum.nc_maior, 1), else_=0))
+    rows = db_session.execute(
+        select(Principio.id, Principio.titulo, nc_menor, nc_maior)
+        .join(Criterio, Criterio.principio_id == Principio.id)
+        .join(Indicador, Indicador.criterio_id == Criterio.id)
+        .join(AvaliacaoIndicador, AvaliacaoIndicador.indicator_id == Indicador.id)
+        .where(
+            AvaliacaoIndicador.auditoria_ano_id == auditoria_id,
+            AvaliacaoIndicador.status_conformidade.in_(
+                (StatusConformidadeEnum.nc_menor, StatusConformidadeEnum.nc_maior)
+            ),
+        )
+        .group_by(Principio.id, Principio.titulo)
+        .order_by(Principio.titulo)
+    ).all()
+    return [
+        {
+            'principio_id': principio_id,
+            'principio_titulo': titulo,
+            'nc_menor': menor,
+            'nc_maior': maior,
+            'total_nc': menor + maior,
+        }
+        for principio_id, titulo, menor, maior in rows
+    ]
+
+
+def test_nc_por_principio_pela_hierarquia_confere_com_o_join(client: TestClient, db_session: Session):
+    programa = ProgramaCertificacao(codigo='FSC', nome='FSC')
+    outro = ProgramaCertificacao(codigo='PEFC', nome='PEFC')
+    db_session.add_all([programa, outro])
+    db_session.flush()
+    # Títulos fora da ordem de criação, para a ordenação por título ser de fato verificada.
+    zeta = Principio(programa_id=programa.id, codigo='P1', titulo='Zeta')
+    alfa = Principio(programa_id=programa.id, codigo='P2', titulo='Alfa')
+    externo = Principio(programa_id=outro.id, codigo='P1', titulo='Meio externo')
+    db_session.add_all([zeta, alfa, externo])
+    db_session.flush()
+    criterios = {
+        principio.titulo: Criterio(
+            programa_id=principio.programa_id,
+            principio_id=principio.id,
+            codigo=f'C{principio.codigo}',
+            titulo=principio.titulo,
+        )
+        for principio in (zeta, alfa, externo)
+    }
+    db_session.add_all(criterios.values())
+    db_session.flush()
+    # O último indicador é do programa auditado, mas seu critério pertence ao outro programa.
+    avaliacoes = [
+        ('Zeta', StatusConformidadeEnum.nc_menor),
+        ('Zeta', StatusConformidadeEnum.nc_maior),
+        ('Zeta', StatusConformidadeEnum.nc_menor),
+        ('Alfa', StatusConformidadeEnum.nc_maior),
+        ('Alfa', StatusConformidadeEnum.conforme),
+        ('Meio externo', StatusConformidadeEnum.nc_menor),
+    ]
+    indicadores = [
+        Indicador(programa_id=programa.id, criterio_id=criterios[titulo].id, codigo=f'I{n}', titulo=f'Indicador {n}')
+        for n, (titulo, _) in enumerate(avaliacoes, start=1)
+    ]
+    auditoria = AuditoriaAno(programa_id=programa.id, year=2026)
+    db_session.add_all([*indicadores, auditoria])
+    db_session.flush()
+    db_session.add_all(
+        [
+            AvaliacaoIndicador(
+                programa_id=programa.id,
+                indicator_id=indicador.id,
+                auditoria_ano_id=auditoria.id,
+                status_conformidade=status_conformidade,
+            )
+            for indicador, (_, status_conformidade) in zip(indicadores, avaliacoes)
+        ]
+    )
+    db_session.commit()
+
+    esperado = _nc_por_principio_em_um_join(db_session, auditoria.id)
+    assert [(item['principio_titulo'], item['nc_menor'], item['nc_maior']) for item in esperado] == [
+        ('Alfa', 0, 1),
+        ('Meio externo', 1, 0),
+        ('Zeta', 2, 1),
+    ]
+
+    url = '/api/reports/nc-por-principio'
+    assert client.get(url, params={'auditoria_id': auditoria.id}).json() == esperado
+    # Segunda chamada com a hierarquia já em cache.
+    assert client.get(url, params={'auditoria_id': auditoria.id}).json() == esperado
+    assert hierarquia_cache.stats()['hits'] >= 1
+
+
+def test_resumo_conformidade_por_certificacao(client: TestClient, db_session: Session, seed_data: dict[str, object]):
+    auditoria = _criar_auditoria_avaliada(db_session, seed_data)
+
+    response = client.get('/api/reports/resumo-conformidade-por-certificacao', params={'year': 2026})
+    assert response.status_code == 200
+    [resumo] = response.json()
+    assert resumo['programa_id'] == auditoria.programa_id
+    assert (resumo['conformes'], resumo['nao_conformes'], resumo['total_avaliacoes']) == (1, 1, 2)
+
+
+def test_cronograma_nc(client: TestClient, db_session: Session, seed_data: dict[str, object]):
+    auditoria = _criar_auditoria_avaliada(db_session, seed_data)
+    params = {'programa_id': auditoria.programa_id, 'auditoria_id': auditoria.id}
+
+    response = client.get('/api/reports/cronograma-nc', params=params)
+    assert response.status_code == 200
+    [item] = response.json()
+    assert item['titulo'] == 'Corrigir NC'
+    assert item['indicador_titulo'] == 'Indicador com NC'
+    assert item['responsavel_nome'] == 'Responsavel'
+    assert client.get('/api/reports/cronograma-nc', params={**params, 'programa_id': 999}).status_code == 400
+
+
+def test_monitoramento_mensal(client: TestClient, db_session: Session, seed_data: dict[str, object]):
+    auditoria = _criar_auditoria_avaliada(db_session, seed_data)
+
+    response = client.get(
+        '/api/reports/monitoramento-mensal',
+        params={'programa_id': auditoria.programa_id, 'auditoria_id': auditoria.id},
+    )
+    assert response.status_code == 200
+    meses = response.json()
+    assert len(meses) == 12
+    marco = meses[2]
+    assert marco['mes_nome'] == 'Março'
+    assert (marco['principios_cadastrados'], marco['principios_monitorados']) == (1, 1)
+    assert (marco['criterios_cadastrados'], marco['criterios_monitorados']) == (1, 1)
+    assert (marco['avaliacoes_registradas'], marco['evidencias_registradas']) == (2, 1)
+    assert meses[3]['avaliacoes_registradas'] == 0
@@ -0,0 +1,73 @@
+import hashlib
+import io
+
+import pytest
+
+from app.services import s3_storage, storage_bootstrap
+from app.services.storage_bootstrap import StorageStatus
+from app.tests.conftest import FakeS3Client
+
+
+def test_upload_stream_arquivo_pequeno_usa_put_object(fake_s3: FakeS3Client):
+    conteudo = b'conteudo pequeno'
+    enviado = s3_storage.upload_stream(io.BytesIO(conteudo), 'a/pequeno.txt', 'text/plain', part_size=64)
+
+    assert fake_s3.objetos['a/pequeno.txt'] == conteudo
+    assert enviado.tamanho == len(conteudo)
+    assert enviado.sha256 == hashlib.sha256(conteudo).hexdigest()
+    assert enviado.uri.endswith('/a/pequeno.txt')
+
+
+def test_upload_stream_envia_em_partes(fake_s3: FakeS3Client):
+    conteudo = bytes(range(256)) * 5
+    enviado = s3_storage.upload_stream(io.BytesIO(conteudo), 'a/grande.bin', part_size=300)
+
+    assert fake_s3.objetos['a/grande.bin'] == conteudo
+    assert enviado.tamanho == len(conteudo)
+    assert enviado.sha256 == hashlib.sha256(conteudo).hexdigest()
+
+
+def test_upload_stream_aborta_ao_exceder_limite(fake_s3: FakeS3Client):
+    with pytest.raises(ValueError, match='tamanho máximo'):
+        s3_storage.upload_stream(io.BytesIO(b'x' * 1000), 'a/excesso.bin', max_bytes=700, part_size=300)
+
+    assert fake_s3.abortados == ['a/excesso.bin']
+    assert 'a/excesso.bin' not in fake_s3.objetos
+
+
+def test_get_s3_client_reutiliza_cliente_e_recria_ao_trocar_credenciais(monkeypatch):
+    monkeypatch.setattr(s3_storage, '_clientes', {})
+    monkeypatch.setattr(s3_storage, '_estatisticas_clientes', {'criados': 0, 'reutilizados': 0})
+
+    primeiro = s3_storage.get_s3_client()
+    assert s3_storage.get_s3_client() is primeiro
+    assert s3_storage.estatisticas_clientes_s3() == {'criados': 1, 'reutilizados': 1, 'ativos': 1}
+    assert primeiro.meta.config.max_pool_connections == s3_storage.settings.S3_MAX_POOL_CONNECTIONS
+
+    monkeypatch.setattr(s3_storage.settings, 'S3_ACCESS_KEY', 'outra-chave')
+    recriado = s3_storage.get_s3_client()
+
+    assert recriado is not primeiro
+    assert s3_storage.estatisticas_clientes_s3()['criados'] == 2
+
+
+def test_storage_status_tenta_com_backoff_ate_verificar(monkeypatch):
+    falhas = iter([RuntimeError('minio fora'), RuntimeError('minio fora')])
+
+    def ensure_bucket_exists():
+        erro = next(falhas, None)
+        if erro:
+            raise erro
+
+    esperas: list[float] = []
+    status = StorageStatus()
+    monkeypatch.setattr(storage_bootstrap, 'ensure_bucket_exists', ensure_bucket_exists)
+    monkeypatch.setattr(status._parar, 'wait', esperas.append)
+
+    assert status.verificar_com_backoff() is True
+    assert status.pronto
+    assert status.tentativas == 3
+    assert esperas == [
+        storage_bootstrap.settings.S3_BOOTSTRAP_BACKOFF_INICIAL_SECONDS,
+        storage_bootstrap.settings.S3_BOOTSTRAP_BACKOFF_INICIAL_SECONDS * 2,
+    ]
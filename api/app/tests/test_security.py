@@ -0,0 +1,54 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.security import (
+    authenticate_user,
+    create_access_token,
+    get_current_principal,
+    hash_password,
+)
+from app.models.user import RoleEnum, User
+from app.services.principal_cache import principal_cache
+
+
+@pytest.fixture()
+def usuario(db_session: Session) -> User:
+    principal_cache.clear()
+    user = User(nome='Gestor', email='gestor@local', role=RoleEnum.GESTOR, password_hash=hash_password('segredo'))
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def _contar_consultas(db_session: Session) -> list[str]:
+    consultas: list[str] = []
+    event.listen(db_session.get_bind(), 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+    return consultas
+
+
+def test_principal_em_cache_dispensa_consulta_a_usuarios(db_session: Session, usuario: User):
+    token = create_access_token(usuario.id)
+    consultas = _contar_consultas(db_session)
+
+    primeiro = get_current_principal(token, db_session)
+    segundo = get_current_principal(token, db_session)
+
+    assert segundo is primeiro
+    assert (primeiro.id, primeiro.nome, primeiro.role) == (usuario.id, 'Gestor', RoleEnum.GESTOR)
+    assert len([sql for sql in consultas if 'usuarios' in sql]) == 1
+    assert principal_cache.stats()['hits'] == 1
+
+
+def test_bloqueio_por_tentativas_invalida_principal(db_session: Session, usuario: User):
+    token = create_access_token(usuario.id)
+    get_current_principal(token, db_session)
+
+    for _ in range(5):
+        with pytest.raises(HTTPException):
+            authenticate_user(db_session, 'gestor@local', 'errada')
+
+    with pytest.raises(HTTPException) as exc:
+        get_current_principal(token, db_session)
+    assert exc.value.status_code == 403
@@ -0,0 +1,57 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.fsc import (
+    AuditoriaAno,
+    ConfiguracaoSistema,
+    Criterio,
+    EvidenceType,
+    Indicador,
+    Principio,
+    ProgramaCertificacao,
+)
+from app.models.seed import SeedVersao
+from app.models.user import User
+from app.services.seeds import SEED_VERSAO, executar_seeds
+from app.services.tipos_evidencia import TIPOS_EVIDENCIA_PADRAO
+
+
+def _contar(db_session: Session, modelo) -> int:
+    return db_session.scalar(select(func.count()).select_from(modelo))
+
+
+def test_executar_seeds_aplica_dados_padrao_uma_unica_vez(db_session: Session):
+    legado = ProgramaCertificacao(codigo='PFC', nome='PFC', descricao='legado')
+    db_session.add(legado)
+    db_session.flush()
+    principio = Principio(programa_id=legado.id, codigo='P1', titulo='Principio 1')
+    db_session.add(principio)
+    db_session.flush()
+    criterio = Criterio(programa_id=legado.id, principio_id=principio.id, codigo='C1', titulo='Criterio 1')
+    db_session.add(criterio)
+    db_session.flush()
+    db_session.add_all(
+        [
+            Indicador(programa_id=legado.id, criterio_id=criterio.id, codigo='I1', titulo='Indicador 1'),
+            Indicador(programa_id=legado.id, criterio_id=criterio.id, codigo='I2', titulo='Indicador 2'),
+        ]
+    )
+    db_session.commit()
+
+    assert executar_seeds(db_session) is True
+
+    codigos = set(db_session.scalars(select(ProgramaCertificacao.codigo)).all())
+    assert codigos == {'FSC', 'PEFC', 'ONCA_PINTADA', 'CARBONO'}
+    db_session.refresh(legado)
+    assert (legado.codigo, legado.nome) == ('PEFC', 'PEFC')
+    assert _contar(db_session, AuditoriaAno) == 4
+    assert _contar(db_session, EvidenceType) == 2 * len(TIPOS_EVIDENCIA_PADRAO)
+    assert _contar(db_session, ConfiguracaoSistema) == 1
+    assert db_session.scalar(select(User).where(User.email == 'admin@local')) is not None
+    assert db_session.scalar(select(SeedVersao.versao)) == SEED_VERSAO
+
+    db_session.add(ProgramaCertificacao(codigo='NOVO', nome='Novo'))
+    db_session.commit()
+
+    assert executar_seeds(db_session) is False
+    assert _contar(db_session, AuditoriaAno) == 4
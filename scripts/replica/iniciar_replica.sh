@@ -0,0 +1,24 @@
+#!/usr/bin/env bash
+# Réplica de streaming para o docker-compose: na primeira subida copia o primário com
+# pg_basebackup (-R grava standby.signal e primary_conninfo) e depois sobe em hot standby.
+# Variáveis: PRIMARY_HOST, PRIMARY_USER, PRIMARY_PASSWORD.
+
+set -euo pipefail
+
+PGDATA="${PGDATA:-/var/lib/postgresql/data}"
+
+if [[ ! -s "$PGDATA/PG_VERSION" ]]; then
+  echo "Réplica vazia; copiando $PRIMARY_HOST com pg_basebackup."
+  until pg_basebackup \
+    --dbname="host=$PRIMARY_HOST user=$PRIMARY_USER password=$PRIMARY_PASSWORD" \
+    --pgdata="$PGDATA" \
+    --wal-method=stream \
+    --write-recovery-conf; do
+    echo "Primário indisponível; nova tentativa em 2 s."
+    rm -rf "${PGDATA:?}"/*
+    sleep 2
+  done
+  chmod 0700 "$PGDATA"
+fi
+
+exec postgres -D "$PGDATA" -c hot_standby=on
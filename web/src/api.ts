@@ -231,6 +231,9 @@ export interface DocumentoEvidencia {
   created_by: number;
   created_at: string;
   updated_at: string;
+  // Só na busca por q: trecho com os termos entre <mark> (HTML já escapado) e relevância.
+  trecho?: string | null;
+  relevancia?: number | null;
 }
 
 export type StatusMonitoramentoCriterio = 'sem_dados' | 'conforme' | 'alerta' | 'critico';
@@ -834,3 +837,39 @@ export interface HomeData {
 }
 
 export const fetchHome = () => api.get<HomeData>('/gestao-demandas/dashboard/home').then((r) => r.data);
+
+export type JobStatus = 'pendente' | 'executando' | 'concluido' | 'falhou';
+
+export interface Job {
+  id: number;
+  tipo: string;
+  status: JobStatus;
+  progresso: number;
+  parametros: Record<string, unknown> | null;
+  resultado: ({ mensagem?: string } & Record<string, unknown>) | null;
+  erro: string | null;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+}
+
+export class TempoEsgotadoJobError extends Error {
+  readonly jobId: number;
+
+  constructor(jobId: number) {
+    super('O processamento está demorando mais que o esperado. Consulte o resultado mais tarde.');
+    this.name = 'TempoEsgotadoJobError';
+    this.jobId = jobId;
+  }
+}
+
+// Sem limite, um job que nunca sai de pendente/executando (worker parado) prenderia a tela para sempre.
+export async function aguardarJob(jobId: number, intervaloMs = 1000, tempoMaximoMs = 10 * 60 * 1000): Promise<Job> {
+  const limite = Date.now() + tempoMaximoMs;
+  for (;;) {
+    const { data } = await api.get<Job>(`/jobs/${jobId}`);
+    if (data.status === 'concluido' || data.status === 'falhou') return data;
+    if (Date.now() + intervaloMs > limite) throw new TempoEsgotadoJobError(jobId);
+    await new Promise((resolve) => setTimeout(resolve, intervaloMs));
+  }
+}
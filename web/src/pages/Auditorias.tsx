@@ -1,6 +1,6 @@
 ﻿import { FormEvent, useState } from 'react';
 
-import { api, Auditoria } from '../api';
+import { aguardarJob, api, Auditoria, Job, TempoEsgotadoJobError } from '../api';
 import Modal from '../components/Modal';
 import Table from '../components/Table';
 
@@ -67,9 +67,21 @@ export default function Auditorias({
     setErro('');
     setMensagem('');
     try {
-      const { data } = await api.post<{ mensagem: string }>(`/auditorias/${auditoriaId}/gerar-avaliacoes`);
-      setMensagem(data.mensagem);
+      const { data } = await api.post<Job>(`/auditorias/${auditoriaId}/gerar-avaliacoes`);
+      setMensagem('Gerando avaliações...');
+      const job = await aguardarJob(data.id);
+      if (job.status === 'falhou') {
+        setMensagem('');
+        setErro(job.erro || 'Falha ao gerar avaliações.');
+        return;
+      }
+      setMensagem(job.resultado?.mensagem || 'Avaliações geradas.');
     } catch (err: any) {
+      setMensagem('');
+      if (err instanceof TempoEsgotadoJobError) {
+        setErro(err.message);
+        return;
+      }
       setErro(err?.response?.data?.detail || 'Falha ao gerar avaliações.');
     }
   };